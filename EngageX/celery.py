@@ -0,0 +1,21 @@
+"""
+Celery application for post-session background jobs (video compilation, report
+generation, S3 cleanup), so heavy work runs on worker processes instead of the
+WebSocket nodes and survives deploys.
+
+Start a worker with:  celery -A EngageX worker --loglevel=info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "EngageX.settings")
+
+app = Celery("EngageX")
+
+# All CELERY_* Django settings configure the app
+app.config_from_object("django.conf:settings", namespace="CELERY")
+
+# Picks up tasks.py in every installed app
+app.autodiscover_tasks()
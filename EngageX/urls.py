@@ -10,6 +10,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from streaming.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="EngageX",
@@ -70,6 +72,7 @@ urlpatterns = [
     path('users/', include('users.urls')),
     path('payments/', include('payments.urls')),
     path('sessions/', include('practice_sessions.urls')),
+    path('metrics/', metrics_view, name='metrics'),  # Prometheus scrape target for the live pipeline
 
 ]
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SessionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'practice_sessions'
+
+    def ready(self):
+        import practice_sessions.signals  # Ensure signals are loaded when the app is ready
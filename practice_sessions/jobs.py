@@ -0,0 +1,98 @@
+"""
+Durable background jobs for sessions (video compilation, report generation, S3 cleanup).
+
+Jobs are Celery tasks (see EngageX/celery.py) tracked by a SessionJob row:
+
+- `enqueue_job(task, session_id, ...)` creates the row under an idempotency key and sends
+  the task. Enqueueing a key whose job is queued, running or has succeeded does nothing,
+  so a reconnecting client or a repeated request cannot start the same work twice; a
+  failed job is sent again.
+- Tasks use SessionJobTask as their base and take the SessionJob ID as first argument.
+  `claim()` marks the job running and skips work already done (a task redelivered after a
+  worker was lost). Failures are retried with exponential backoff and jitter, up to
+  JOB_MAX_RETRIES times; the row records every state change and the last error.
+"""
+
+import os
+
+from celery import Task
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SessionJob
+
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", 5))
+JOB_RETRY_BACKOFF_MAX = int(os.getenv("JOB_RETRY_BACKOFF_MAX", 600))  # seconds
+
+
+class JobEnqueueError(Exception):
+    """Raised when a job's task could not be sent to the broker. The job is marked failed."""
+
+    def __init__(self, job, error):
+        super().__init__(f"could not enqueue {job.key}: {error}")
+        self.job = job
+
+
+class SessionJobTask(Task):
+    autoretry_for = (Exception,)
+    retry_backoff = True
+    retry_backoff_max = JOB_RETRY_BACKOFF_MAX
+    retry_jitter = True
+    max_retries = JOB_MAX_RETRIES
+    acks_late = True
+
+    def claim(self, job_id):
+        """Marks the job running. Returns False if it does not exist or has already succeeded."""
+        with transaction.atomic():
+            job = SessionJob.objects.select_for_update().filter(id=job_id).first()
+            if job is None or job.status == "succeeded":
+                print(f"Jobs: skipping job {job_id} ({job.status if job else 'not found'})")
+                return False
+            job.status = "running"
+            job.attempts += 1
+            job.task_id = self.request.id
+            job.save(update_fields=["status", "attempts", "task_id", "updated_at"])
+        return True
+
+    def _update(self, job_id, **fields):
+        SessionJob.objects.filter(id=job_id).exclude(status="succeeded").update(updated_at=timezone.now(), **fields)
+
+    def on_success(self, retval, task_id, args, kwargs):
+        self._update(args[0], status="succeeded", error=None)
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        print(f"Jobs: {self.name} for job {args[0]} failed, retrying: {exc!r}")
+        self._update(args[0], status="retrying", error=repr(exc))
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        print(f"Jobs: {self.name} for job {args[0]} failed: {exc!r}")
+        self._update(args[0], status="failed", error=repr(exc))
+
+
+def enqueue_job(task, session_id, *args, key=None):
+    """
+    Sends `task(job_id, session_id, *args)` once per idempotency key (by default
+    "<task name>:<session id>") and returns its SessionJob. Raises JobEnqueueError if the
+    broker cannot be reached.
+    """
+    key = key or f"{task.name}:{session_id}"
+    with transaction.atomic():
+        job, created = SessionJob.objects.select_for_update().get_or_create(
+            key=key, defaults={"task": task.name, "session_id": session_id})
+        if not created and job.status != "failed":
+            print(f"Jobs: {key} is already {job.status}; not enqueueing it again")
+            return job
+        if not created:
+            job.status = "queued"
+            job.error = None
+            job.save(update_fields=["status", "error", "updated_at"])
+
+    try:
+        result = task.apply_async(args=(job.id, session_id, *args))
+    except Exception as e:
+        SessionJob.objects.filter(id=job.id).update(status="failed", error=f"enqueue failed: {e!r}",
+                                                    updated_at=timezone.now())
+        raise JobEnqueueError(job, e) from e
+    print(f"Jobs: enqueued {key} as task {result.id}")
+    job.refresh_from_db()
+    return job
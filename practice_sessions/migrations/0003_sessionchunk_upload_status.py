@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('practice_sessions', '0002_slidepreview_practicesession_slide_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionchunk',
+            name='upload_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploaded', 'Uploaded'), ('failed', 'Failed')],
+                                   default='uploaded',
+                                   help_text='Whether video_file has reached S3; chunks are saved before their upload completes',
+                                   max_length=10),
+        ),
+    ]
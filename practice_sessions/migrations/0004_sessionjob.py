@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('practice_sessions', '0003_sessionchunk_upload_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Idempotency key, e.g. compile:<session id>:<chunks>', max_length=255,
+                                         unique=True)),
+                ('task', models.CharField(help_text='Celery task name', max_length=255)),
+                ('session_id', models.BigIntegerField(db_index=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'),
+                                                     ('retrying', 'Retrying'), ('succeeded', 'Succeeded'),
+                                                     ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('task_id', models.CharField(blank=True, help_text='Celery task ID of the last attempt', max_length=255,
+                                             null=True)),
+                ('error', models.TextField(blank=True, help_text='Error of the last failed attempt', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
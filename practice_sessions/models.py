@@ -319,6 +319,17 @@ class SessionChunk(models.Model):
         null=True,
         help_text="Path to the audio file for this chunk",
     )
+    UPLOAD_STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("uploaded", "Uploaded"),
+        ("failed", "Failed"),
+    ]
+    upload_status = models.CharField(
+        max_length=10,
+        choices=UPLOAD_STATUS_CHOICES,
+        default="uploaded",
+        help_text="Whether video_file has reached S3; chunks are saved before their upload completes",
+    )
     created_at = models.DateTimeField(
         default=timezone.now,
         help_text="When this chunk was created",
@@ -416,4 +427,33 @@ class ChunkSentimentAnalysis(models.Model):
     def __str__(self):
         return f"Sentiment Analysis for Chunk {self.chunk.start_time}-{self.chunk.end_time} of {self.chunk.session.session_name}"
 
+class SessionJob(models.Model):
+    """
+    A background job for a session (video compilation, report generation, S3 cleanup).
+    The idempotency key makes enqueueing the same work twice (e.g. after a reconnect) a no-op.
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("retrying", "Retrying"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+    key = models.CharField(max_length=255, unique=True, help_text="Idempotency key, e.g. compile:<session id>:<chunks>")
+    task = models.CharField(max_length=255, help_text="Celery task name")
+    # Plain ID rather than a foreign key, so cleanup jobs outlive the session they clean up after
+    session_id = models.BigIntegerField(db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    task_id = models.CharField(max_length=255, blank=True, null=True, help_text="Celery task ID of the last attempt")
+    error = models.TextField(blank=True, null=True, help_text="Error of the last failed attempt")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
 # Remember to run makemigrations and migrate after changing the model.
@@ -146,6 +146,7 @@ class SessionChunkSerializer(serializers.ModelSerializer):
             "chunk_number",
             "transcript",
             "audio_path",
+            "upload_status",
             "start_time",
             "end_time",
             "created_at",
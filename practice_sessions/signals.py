@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .jobs import enqueue_job, JobEnqueueError
+from .models import PracticeSession
+
+
+# Delete a session's recordings from S3 once the session itself is gone
+@receiver(post_delete, sender=PracticeSession)
+def cleanup_session_media_on_delete(sender, instance, **kwargs):
+    from streaming.tasks import cleanup_session_media
+    # Read now: the instance's ID is cleared once the delete completes
+    session_id, user_id = instance.id, instance.user_id
+
+    def enqueue():
+        try:
+            enqueue_job(cleanup_session_media, session_id, user_id)
+        except JobEnqueueError as e:
+            print(f"Could not enqueue S3 cleanup for session {session_id}: {e}")
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,25 @@
+"""
+Background jobs for practice sessions, run by Celery workers (see jobs.py).
+"""
+
+from celery import shared_task
+
+from .jobs import SessionJobTask
+from .models import PracticeSession
+
+
+@shared_task(base=SessionJobTask, bind=True, name="practice_sessions.generate_session_report")
+def generate_session_report(self, job_id, session_id):
+    """Aggregates the session's analysis and generates its summary, as SessionReportView.post does."""
+    if not self.claim(job_id):
+        return None
+    # Imported here: the views module enqueues this task
+    from .views import SessionReportView
+
+    session = PracticeSession.objects.select_related("user__user_profile").filter(id=session_id).first()
+    if session is None:
+        print(f"Jobs: PracticeSession {session_id} not found; no report to generate.")
+        return None
+    company = getattr(getattr(session.user, "user_profile", None), "company", None)
+    SessionReportView().build_report(session, company)
+    return session_id
@@ -34,6 +34,8 @@ from datetime import timedelta
 from datetime import datetime, timedelta
 from collections import Counter
 from openai import OpenAI
+from streaming.clients import get_clients
+from streaming.llm_cache import get_llm_cache
 from drf_yasg.utils import swagger_auto_schema
 from collections import defaultdict
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
@@ -55,6 +57,8 @@ from .serializers import (
     SessionReportSerializer,
     SlidePreviewSerializer
 )
+from .jobs import enqueue_job, JobEnqueueError
+from .tasks import generate_session_report
 
 User = get_user_model()
 
@@ -146,7 +150,8 @@ Take into account what came before each entry but prioritize the most recent ent
 
 
 def generate_slide_summary(pdf_path):
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    # Shared keep-alive client rather than a new connection pool per upload
+    client = get_clients().openai()
     base64_pdf = None
     # STEP 2: Read and encode the PDF as Base64
     if isinstance(pdf_path, (str, bytes, os.PathLike)):
@@ -170,7 +175,8 @@ def generate_slide_summary(pdf_path):
         """
 
     # STEP 4: Make the completion call using the file and structured JSON schema
-    response = openai.chat.completions.create(
+    # (a re-upload of the same deck is answered from the response cache, see streaming/llm_cache.py)
+    response = get_llm_cache().complete(client, dict(
         model="gpt-4o",
         messages=[
             {
@@ -209,10 +215,10 @@ def generate_slide_summary(pdf_path):
                 }
             }
         }
-    )
+    ), validate=json.loads)
 
     # STEP 5: Unpack and print the response
-    result = json.loads(response.choices[0].message.content)
+    result = json.loads(response)
 
     print("\n✅ Evaluation Results:")
     print(f"Slide Efficiency: {result['SlideEfficiency']}/100")
@@ -844,7 +850,7 @@ class SessionReportView(APIView):
 
     def generate_full_summary(self, session_id, metrics_string):
         """Creates a cohesive summary for Strengths, Improvements, and Feedback using OpenAI."""
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_clients().openai()
 
         goals = PracticeSession.objects.filter(id=session_id).values_list("goals", flat=True).first()
 
@@ -902,7 +908,8 @@ class SessionReportView(APIView):
 
         try:
             print("Calling OpenAI for summary generation...")
-            completion = client.chat.completions.create(
+            # Regenerating a report for unchanged chunk feedback is answered from the response cache
+            refined_summary = get_llm_cache().complete(client, dict(
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={
@@ -922,10 +929,9 @@ class SessionReportView(APIView):
                 },
                 temperature=0.7,  # Adjust temperature as needed
                 max_tokens=2400  # Limit tokens to control response length
-            )
+            ), validate=json.loads)
             print(f"prompt: {prompt}")
 
-            refined_summary = completion.choices[0].message.content
             print(f"OpenAI raw response: {refined_summary}")
             parsed_summary = json.loads(refined_summary)
             print(f"Parsed summary: {parsed_summary}")
@@ -987,6 +993,236 @@ class SessionReportView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    def build_report(self, session, company):
+        """
+        Aggregates the session's chunk sentiment analysis, generates the full summary, saves both
+        to the PracticeSession and returns the report data. Also run as a background job
+        (practice_sessions.tasks.generate_session_report).
+        """
+        # --- Aggregate Chunk Sentiment Analysis Data ---
+        print("Aggregating chunk sentiment analysis data...")
+        # Get chunks with sentiment analysis data
+        chunks_with_sentiment = session.chunks.filter(
+            sentiment_analysis__isnull=False
+        )
+        print(f"Number of chunks with sentiment analysis found: {chunks_with_sentiment.count()}")
+
+        # If no chunks with sentiment analysis, return a basic report
+        if not chunks_with_sentiment.exists():
+            print("No chunks with sentiment analysis found. Returning basic report.")
+
+            return {
+                "session_id": session.id,
+                "session_name": session.session_name,
+                "company":company,
+                "duration": str(session.duration) if session.duration else None,
+                "aggregated_scores": {},  # Empty or default values
+                "derived_scores": {},  # Empty or default values
+                "full_summary": {
+                    "Strength": "No analysis data available for summary.",
+                    "Area of Improvement": "N/A - No analysis data available for summary.",
+                    "General Feedback Summary": "No analysis data was generated for this session's chunks.",
+                },
+                "gestures_percentage": 0.0
+                # No graph_data if you removed it from the response
+            }
+
+        # performamce analytics
+        latest_session_chunk = ChunkSentimentAnalysis.objects.filter(
+            chunk__session=session
+        )
+        performance_analytics_over_time = []
+
+        for chunk in latest_session_chunk:
+            performance_analytics_over_time.append({
+                "chunk_number": chunk.chunk_number if chunk.chunk_number is not None else 0,
+                "start_time": chunk.chunk.start_time if chunk.chunk.start_time is not None else 0,
+                "end_time": chunk.chunk.end_time if chunk.chunk.end_time is not None else 0,
+                "impact": chunk.impact if chunk.impact is not None else 0,
+                "trigger_response": chunk.trigger_response if chunk.trigger_response is not None else 0,
+                "conviction": chunk.conviction if chunk.conviction is not None else 0,
+            })
+        print(performance_analytics_over_time)
+        aggregation_results = chunks_with_sentiment.aggregate(
+            # Aggregate individual metrics
+            avg_volume=Round(Avg("sentiment_analysis__volume"), output_field=IntegerField()),
+            avg_pitch_variability=Round(Avg("sentiment_analysis__pitch_variability"), output_field=IntegerField()),
+            avg_pace=Round(Avg("sentiment_analysis__pace"), output_field=IntegerField()),
+            avg_conviction=Round(Avg("sentiment_analysis__conviction"), output_field=IntegerField()),
+            avg_clarity=Round(Avg("sentiment_analysis__clarity"), output_field=IntegerField()),
+            avg_impact=Round(Avg("sentiment_analysis__impact"), output_field=IntegerField()),
+            avg_brevity=Round(Avg("sentiment_analysis__brevity"), output_field=IntegerField()),
+            avg_trigger_response=Round(Avg("sentiment_analysis__trigger_response"), output_field=IntegerField()),
+            avg_filler_words=Round(Avg("sentiment_analysis__filler_words"), output_field=IntegerField()),
+            avg_grammar=Round(Avg("sentiment_analysis__grammar"), output_field=IntegerField()),
+            avg_posture=Round(Avg("sentiment_analysis__posture"), output_field=IntegerField()),
+            avg_motion=Round(Avg("sentiment_analysis__motion"), output_field=IntegerField()),
+            avg_pauses=Round(Avg("sentiment_analysis__pauses"), output_field=IntegerField()),
+            total_true_gestures=Round(Sum(Cast('sentiment_analysis__gestures', output_field=IntegerField()))),
+            # Count the number of chunks considered for aggregation
+            total_chunks_for_aggregation=Count('sentiment_analysis__conviction'),
+            # Use Count on a non-nullable field
+            avg_transformative_potential=Round(Avg("sentiment_analysis__transformative_potential"),
+                                               output_field=IntegerField()),
+        )
+
+        print(f"Raw aggregation results: {aggregation_results}")
+
+        # --- Calculate Derived Fields and Prepare Data for Saving/Response ---
+        # Use .get with a default value (0 or 0.0) and check for None explicitly
+        def get_agg_value(key, default):
+            value = aggregation_results.get(key, default)
+            return value if value is not None else default
+
+        volume = get_agg_value("avg_volume", 0.0)
+        pitch_variability = get_agg_value("avg_pitch_variability", 0.0)
+        pace = get_agg_value("avg_pace", 0.0)
+        pauses_average = get_agg_value("avg_pauses", 0.0)  # <-- Get the average pauses (expected to be over 100)
+        conviction = get_agg_value("avg_conviction", 0.0)
+        clarity = get_agg_value("avg_clarity", 0.0)
+        impact = get_agg_value("avg_impact", 0.0)
+        brevity = get_agg_value("avg_brevity", 0.0)
+        trigger_response = get_agg_value("avg_trigger_response", 0.0)
+        filler_words = get_agg_value("avg_filler_words", 0.0)
+        grammar = get_agg_value("avg_grammar", 0.0)
+        posture = get_agg_value("avg_posture", 0.0)
+        motion = get_agg_value("avg_motion", 0.0)
+
+        # Calculate gestures proportion manually after fetching sum and count
+        total_true_gestures = get_agg_value("total_true_gestures", 0)
+        total_chunks_for_aggregation = get_agg_value("total_chunks_for_aggregation", 0)
+        gestures_proportion = (
+                total_true_gestures / total_chunks_for_aggregation) if total_chunks_for_aggregation > 0 else 0.0
+
+        transformative_potential = get_agg_value("avg_transformative_potential", 0.0)
+
+        # Calculate derived fields as per PracticeSession model help text and common interpretations
+        # Use helper function to avoid division by zero
+        def safe_division(numerator, denominator):
+            return (numerator / denominator) if denominator > 0 else 0.0
+
+        audience_engagement = safe_division((impact + trigger_response + conviction),
+                                            3.0)  # Use 3.0 for float division
+        overall_captured_impact = impact  # Same as impact
+        vocal_variety = safe_division((volume + pitch_variability + pace + pauses_average),
+                                      4.0)  # <-- Use the average here
+
+        emotional_impact = trigger_response  # Same as trigger response
+        # Body language score calculation - Example: simple average of posture, motion, and gestures (represented as 0 or 100)
+        gestures_score_for_body_language = gestures_proportion * 100
+        body_language = safe_division((posture + motion + gestures_score_for_body_language),
+                                      3.0)  # Use 3.0 for float division
+        transformative_communication = transformative_potential  # Same as transformative potential
+        structure_and_clarity = clarity  # Same as clarity
+        language_and_word_choice = safe_division((brevity + filler_words + grammar),
+                                                 3.0)  # Use 3.0 for float division
+
+        # --- Save Calculated Data and Summary to PracticeSession ---
+        print("Saving aggregated and summary data to PracticeSession...")
+        session.volume = round(volume if volume is not None else 0)  # Ensure not saving None
+        session.pitch_variability = round(pitch_variability if pitch_variability is not None else 0)
+        session.pace = round(pace if pace is not None else 0)
+        session.pauses = round(pauses_average if pauses_average is not None else 0)  # Save the AVERAGE here
+        session.conviction = round(conviction if conviction is not None else 0)
+        session.clarity = round(clarity if clarity is not None else 0)
+        session.impact = round(impact if impact is not None else 0)
+        session.brevity = round(brevity if brevity is not None else 0)
+        session.trigger_response = round(trigger_response if trigger_response is not None else 0)
+        session.filler_words = round(filler_words if filler_words is not None else 0)
+        session.grammar = round(grammar if grammar is not None else 0)
+        session.posture = round(posture if posture is not None else 0)
+        session.motion = round(motion if motion is not None else 0)
+        session.transformative_potential = round(
+            transformative_potential if transformative_potential is not None else 0)
+
+        # Save derived fields (FloatFields in PracticeSession)
+        session.audience_engagement = round(audience_engagement if audience_engagement is not None else 0.0)
+        session.overall_captured_impact = round(
+            overall_captured_impact if overall_captured_impact is not None else 0.0)
+        session.vocal_variety = round(vocal_variety if vocal_variety is not None else 0.0)
+        session.emotional_impact = round(emotional_impact if emotional_impact is not None else 0.0)
+        session.body_language = round(body_language if body_language is not None else 0.0)
+        session.transformative_communication = round(
+            transformative_communication if transformative_communication is not None else 0.0)
+        session.structure_and_clarity = round(structure_and_clarity if structure_and_clarity is not None else 0.0)
+        session.language_and_word_choice = round(
+            language_and_word_choice if language_and_word_choice is not None else 0.0)
+        session.gestures_score_for_body_language = round(
+            gestures_score_for_body_language if gestures_score_for_body_language is not None else 0.0)
+        # Save boolean gestures field (True if any positive gestures were recorded)
+        session.gestures = total_true_gestures > 0  # True if sum > 0
+
+        metrics_string = f"Final Scores: volume score: {session.volume}, pitch variability score: {session.pitch_variability}, pace score: {session.pace}, pauses score: {session.pauses}, conviction score: {session.conviction}, clarity score: {session.clarity}, impact score: {session.impact}, brevity score: {session.brevity}, trigger response score: {session.trigger_response}, filler words score: {session.filler_words}, grammar score: {session.grammar}, posture score: {session.posture}, motion score: {session.motion}, transformative potential score: {session.transformative_potential}, gestures score: {session.gestures_score_for_body_language}"
+
+        # --- Generate Full Summary using OpenAI ---
+        print("Generating full summary...")
+        full_summary_data = self.generate_full_summary(session.id, metrics_string)
+        strength_summary = full_summary_data.get("Strength", "N/A")
+        improvement_summary = full_summary_data.get("Area of Improvement", "N/A")
+        general_feedback = full_summary_data.get("General Feedback Summary", "N/A")
+
+        # Save the text summaries
+        session.strength = strength_summary
+        session.area_of_improvement = improvement_summary
+        session.general_feedback_summary = general_feedback
+
+        session.save()
+        print(f"session.strength: {session.strength}")
+        print(f"session.area_of_improvement: {session.area_of_improvement}")
+        print(f"PracticeSession {session.id} updated with report data and summary.")
+
+        # --- Prepare Response ---
+        # You can include the calculated aggregated data and summary in the response
+        report_response_data = {
+            "session_id": session.id,
+            "session_name": session.session_name,
+            "company": company,
+            "duration": str(session.duration) if session.duration else None,
+            "slide_specific_timing": session.slide_specific_timing if session.slide_specific_timing else {},
+            "aggregated_scores": {
+                "volume": round(session.volume or 0),
+                "pitch_variability": round(session.pitch_variability or 0),
+                "pace": round(session.pace or 0),
+                "pauses": round(session.pauses or 0),  # Return the AVERAGE here (stored in session.pauses)
+                "conviction": round(session.conviction or 0),
+                "clarity": round(session.clarity or 0),
+                "impact": round(session.impact or 0),
+                "brevity": round(session.brevity or 0),
+                "trigger_response": round(session.trigger_response or 0),
+                "filler_words": round(session.filler_words or 0),
+                "grammar": round(session.grammar or 0),
+                "posture": round(session.posture or 0),
+                "motion": round(session.motion or 0),
+                "transformative_potential": round(session.transformative_potential or 0),
+                "gestures_present": session.gestures,  # Boolean from session model
+                "slide_efficiency": session.slide_efficiency,
+                "text_economy": session.text_economy,
+                "visual_communication": session.visual_communication
+            },
+            "derived_scores": {
+                "audience_engagement": round(session.audience_engagement or 0),
+                "overall_captured_impact": round(session.overall_captured_impact or 0),
+                "vocal_variety": round(session.vocal_variety or 0),
+                "emotional_impact": round(session.emotional_impact or 0),
+                "gestures_score_for_body_language": round(session.gestures_score_for_body_language or 0),
+                "body_language": round(session.body_language or 0),
+                "transformative_communication": round(session.transformative_communication or 0),
+                "structure_and_clarity": round(session.structure_and_clarity or 0),
+                "language_and_word_choice": round(session.language_and_word_choice or 0),
+            },
+            "full_summary": {
+                "Strength": session.strength,
+                "Area of Improvement": session.area_of_improvement,
+                "General Feedback Summary": session.general_feedback_summary,
+            },
+            "performance_analytics": list(performance_analytics_over_time)
+            # Include graph_data if you still need it in the response, you would need to fetch it separately here
+            # "graph_data": ... (Perhaps fetch chunks_with_sentiment and serialize minimal data)
+        }
+
+        print(f"Report generation and summary complete for session ID: {session.id}")
+        return report_response_data
+
     @swagger_auto_schema(
         operation_description="update the session duration, calculate report, and generate summary",
         request_body=SessionReportSerializer,
@@ -1030,228 +1266,21 @@ class SessionReportView(APIView):
                 session.save()
                 print(f"Session Slide updated to: {session.slide_specific_timing}")
 
-            # --- Aggregate Chunk Sentiment Analysis Data ---
-            print("Aggregating chunk sentiment analysis data...")
-            # Get chunks with sentiment analysis data
-            chunks_with_sentiment = session.chunks.filter(
-                sentiment_analysis__isnull=False
-            )
-            print(f"Number of chunks with sentiment analysis found: {chunks_with_sentiment.count()}")
-
-            # If no chunks with sentiment analysis, return a basic report
-            if not chunks_with_sentiment.exists():
-                print("No chunks with sentiment analysis found. Returning basic report.")
-
-                return Response({
-                    "session_id": session.id,
-                    "session_name": session.session_name,
-                    "company":company,
-                    "duration": str(session.duration) if session.duration else None,
-                    "aggregated_scores": {},  # Empty or default values
-                    "derived_scores": {},  # Empty or default values
-                    "full_summary": {
-                        "Strength": "No analysis data available for summary.",
-                        "Area of Improvement": "N/A - No analysis data available for summary.",
-                        "General Feedback Summary": "No analysis data was generated for this session's chunks.",
-                    },
-                    "gestures_percentage": 0.0
-                    # No graph_data if you removed it from the response
-                }, status=status.HTTP_200_OK)
-
-            # performamce analytics
-            latest_session_chunk = ChunkSentimentAnalysis.objects.filter(
-                chunk__session=session
-            )
-            performance_analytics_over_time = []
-
-            for chunk in latest_session_chunk:
-                performance_analytics_over_time.append({
-                    "chunk_number": chunk.chunk_number if chunk.chunk_number is not None else 0,
-                    "start_time": chunk.chunk.start_time if chunk.chunk.start_time is not None else 0,
-                    "end_time": chunk.chunk.end_time if chunk.chunk.end_time is not None else 0,
-                    "impact": chunk.impact if chunk.impact is not None else 0,
-                    "trigger_response": chunk.trigger_response if chunk.trigger_response is not None else 0,
-                    "conviction": chunk.conviction if chunk.conviction is not None else 0,
-                })
-            print(performance_analytics_over_time)
-            aggregation_results = chunks_with_sentiment.aggregate(
-                # Aggregate individual metrics
-                avg_volume=Round(Avg("sentiment_analysis__volume"), output_field=IntegerField()),
-                avg_pitch_variability=Round(Avg("sentiment_analysis__pitch_variability"), output_field=IntegerField()),
-                avg_pace=Round(Avg("sentiment_analysis__pace"), output_field=IntegerField()),
-                avg_conviction=Round(Avg("sentiment_analysis__conviction"), output_field=IntegerField()),
-                avg_clarity=Round(Avg("sentiment_analysis__clarity"), output_field=IntegerField()),
-                avg_impact=Round(Avg("sentiment_analysis__impact"), output_field=IntegerField()),
-                avg_brevity=Round(Avg("sentiment_analysis__brevity"), output_field=IntegerField()),
-                avg_trigger_response=Round(Avg("sentiment_analysis__trigger_response"), output_field=IntegerField()),
-                avg_filler_words=Round(Avg("sentiment_analysis__filler_words"), output_field=IntegerField()),
-                avg_grammar=Round(Avg("sentiment_analysis__grammar"), output_field=IntegerField()),
-                avg_posture=Round(Avg("sentiment_analysis__posture"), output_field=IntegerField()),
-                avg_motion=Round(Avg("sentiment_analysis__motion"), output_field=IntegerField()),
-                avg_pauses=Round(Avg("sentiment_analysis__pauses"), output_field=IntegerField()),
-                total_true_gestures=Round(Sum(Cast('sentiment_analysis__gestures', output_field=IntegerField()))),
-                # Count the number of chunks considered for aggregation
-                total_chunks_for_aggregation=Count('sentiment_analysis__conviction'),
-                # Use Count on a non-nullable field
-                avg_transformative_potential=Round(Avg("sentiment_analysis__transformative_potential"),
-                                                   output_field=IntegerField()),
-            )
-
-            print(f"Raw aggregation results: {aggregation_results}")
-
-            # --- Calculate Derived Fields and Prepare Data for Saving/Response ---
-            # Use .get with a default value (0 or 0.0) and check for None explicitly
-            def get_agg_value(key, default):
-                value = aggregation_results.get(key, default)
-                return value if value is not None else default
-
-            volume = get_agg_value("avg_volume", 0.0)
-            pitch_variability = get_agg_value("avg_pitch_variability", 0.0)
-            pace = get_agg_value("avg_pace", 0.0)
-            pauses_average = get_agg_value("avg_pauses", 0.0)  # <-- Get the average pauses (expected to be over 100)
-            conviction = get_agg_value("avg_conviction", 0.0)
-            clarity = get_agg_value("avg_clarity", 0.0)
-            impact = get_agg_value("avg_impact", 0.0)
-            brevity = get_agg_value("avg_brevity", 0.0)
-            trigger_response = get_agg_value("avg_trigger_response", 0.0)
-            filler_words = get_agg_value("avg_filler_words", 0.0)
-            grammar = get_agg_value("avg_grammar", 0.0)
-            posture = get_agg_value("avg_posture", 0.0)
-            motion = get_agg_value("avg_motion", 0.0)
-
-            # Calculate gestures proportion manually after fetching sum and count
-            total_true_gestures = get_agg_value("total_true_gestures", 0)
-            total_chunks_for_aggregation = get_agg_value("total_chunks_for_aggregation", 0)
-            gestures_proportion = (
-                    total_true_gestures / total_chunks_for_aggregation) if total_chunks_for_aggregation > 0 else 0.0
-
-            transformative_potential = get_agg_value("avg_transformative_potential", 0.0)
-
-            # Calculate derived fields as per PracticeSession model help text and common interpretations
-            # Use helper function to avoid division by zero
-            def safe_division(numerator, denominator):
-                return (numerator / denominator) if denominator > 0 else 0.0
-
-            audience_engagement = safe_division((impact + trigger_response + conviction),
-                                                3.0)  # Use 3.0 for float division
-            overall_captured_impact = impact  # Same as impact
-            vocal_variety = safe_division((volume + pitch_variability + pace + pauses_average),
-                                          4.0)  # <-- Use the average here
-
-            emotional_impact = trigger_response  # Same as trigger response
-            # Body language score calculation - Example: simple average of posture, motion, and gestures (represented as 0 or 100)
-            gestures_score_for_body_language = gestures_proportion * 100
-            body_language = safe_division((posture + motion + gestures_score_for_body_language),
-                                          3.0)  # Use 3.0 for float division
-            transformative_communication = transformative_potential  # Same as transformative potential
-            structure_and_clarity = clarity  # Same as clarity
-            language_and_word_choice = safe_division((brevity + filler_words + grammar),
-                                                     3.0)  # Use 3.0 for float division
-
-            # --- Save Calculated Data and Summary to PracticeSession ---
-            print("Saving aggregated and summary data to PracticeSession...")
-            session.volume = round(volume if volume is not None else 0)  # Ensure not saving None
-            session.pitch_variability = round(pitch_variability if pitch_variability is not None else 0)
-            session.pace = round(pace if pace is not None else 0)
-            session.pauses = round(pauses_average if pauses_average is not None else 0)  # Save the AVERAGE here
-            session.conviction = round(conviction if conviction is not None else 0)
-            session.clarity = round(clarity if clarity is not None else 0)
-            session.impact = round(impact if impact is not None else 0)
-            session.brevity = round(brevity if brevity is not None else 0)
-            session.trigger_response = round(trigger_response if trigger_response is not None else 0)
-            session.filler_words = round(filler_words if filler_words is not None else 0)
-            session.grammar = round(grammar if grammar is not None else 0)
-            session.posture = round(posture if posture is not None else 0)
-            session.motion = round(motion if motion is not None else 0)
-            session.transformative_potential = round(
-                transformative_potential if transformative_potential is not None else 0)
-
-            # Save derived fields (FloatFields in PracticeSession)
-            session.audience_engagement = round(audience_engagement if audience_engagement is not None else 0.0)
-            session.overall_captured_impact = round(
-                overall_captured_impact if overall_captured_impact is not None else 0.0)
-            session.vocal_variety = round(vocal_variety if vocal_variety is not None else 0.0)
-            session.emotional_impact = round(emotional_impact if emotional_impact is not None else 0.0)
-            session.body_language = round(body_language if body_language is not None else 0.0)
-            session.transformative_communication = round(
-                transformative_communication if transformative_communication is not None else 0.0)
-            session.structure_and_clarity = round(structure_and_clarity if structure_and_clarity is not None else 0.0)
-            session.language_and_word_choice = round(
-                language_and_word_choice if language_and_word_choice is not None else 0.0)
-            session.gestures_score_for_body_language = round(
-                gestures_score_for_body_language if gestures_score_for_body_language is not None else 0.0)
-            # Save boolean gestures field (True if any positive gestures were recorded)
-            session.gestures = total_true_gestures > 0  # True if sum > 0
-
-            metrics_string = f"Final Scores: volume score: {session.volume}, pitch variability score: {session.pitch_variability}, pace score: {session.pace}, pauses score: {session.pauses}, conviction score: {session.conviction}, clarity score: {session.clarity}, impact score: {session.impact}, brevity score: {session.brevity}, trigger response score: {session.trigger_response}, filler words score: {session.filler_words}, grammar score: {session.grammar}, posture score: {session.posture}, motion score: {session.motion}, transformative potential score: {session.transformative_potential}, gestures score: {session.gestures_score_for_body_language}"
-
-            # --- Generate Full Summary using OpenAI ---
-            print("Generating full summary...")
-            full_summary_data = self.generate_full_summary(session_id, metrics_string)
-            strength_summary = full_summary_data.get("Strength", "N/A")
-            improvement_summary = full_summary_data.get("Area of Improvement", "N/A")
-            general_feedback = full_summary_data.get("General Feedback Summary", "N/A")
-
-            # Save the text summaries
-            session.strength = strength_summary
-            session.area_of_improvement = improvement_summary
-            session.general_feedback_summary = general_feedback
-
-            session.save()
-            print(f"session.strength: {session.strength}")
-            print(f"session.area_of_improvement: {session.area_of_improvement}")
-            print(f"PracticeSession {session_id} updated with report data and summary.")
-
-            # --- Prepare Response ---
-            # You can include the calculated aggregated data and summary in the response
-            report_response_data = {
-                "session_id": session.id,
-                "session_name": session.session_name,
-                "company": company,
-                "duration": str(session.duration) if session.duration else None,
-                "slide_specific_timing": session.slide_specific_timing if session.slide_specific_timing else {},
-                "aggregated_scores": {
-                    "volume": round(session.volume or 0),
-                    "pitch_variability": round(session.pitch_variability or 0),
-                    "pace": round(session.pace or 0),
-                    "pauses": round(session.pauses or 0),  # Return the AVERAGE here (stored in session.pauses)
-                    "conviction": round(session.conviction or 0),
-                    "clarity": round(session.clarity or 0),
-                    "impact": round(session.impact or 0),
-                    "brevity": round(session.brevity or 0),
-                    "trigger_response": round(session.trigger_response or 0),
-                    "filler_words": round(session.filler_words or 0),
-                    "grammar": round(session.grammar or 0),
-                    "posture": round(session.posture or 0),
-                    "motion": round(session.motion or 0),
-                    "transformative_potential": round(session.transformative_potential or 0),
-                    "gestures_present": session.gestures,  # Boolean from session model
-                    "slide_efficiency": session.slide_efficiency,
-                    "text_economy": session.text_economy,
-                    "visual_communication": session.visual_communication
-                },
-                "derived_scores": {
-                    "audience_engagement": round(session.audience_engagement or 0),
-                    "overall_captured_impact": round(session.overall_captured_impact or 0),
-                    "vocal_variety": round(session.vocal_variety or 0),
-                    "emotional_impact": round(session.emotional_impact or 0),
-                    "gestures_score_for_body_language": round(session.gestures_score_for_body_language or 0),
-                    "body_language": round(session.body_language or 0),
-                    "transformative_communication": round(session.transformative_communication or 0),
-                    "structure_and_clarity": round(session.structure_and_clarity or 0),
-                    "language_and_word_choice": round(session.language_and_word_choice or 0),
-                },
-                "full_summary": {
-                    "Strength": session.strength,
-                    "Area of Improvement": session.area_of_improvement,
-                    "General Feedback Summary": session.general_feedback_summary,
-                },
-                "performance_analytics": list(performance_analytics_over_time)
-                # Include graph_data if you still need it in the response, you would need to fetch it separately here
-                # "graph_data": ... (Perhaps fetch chunks_with_sentiment and serialize minimal data)
-            }
-
-            print(f"Report generation and summary complete for session ID: {session_id}")
+            # --- Report: in this request, or as a background job when the client asks for one ---
+            if str(request.data.get("background", "")).lower() == "true":
+                # Keyed by the analysed chunks, so repeating the request for the same data reuses the job
+                analysed_chunks = session.chunks.filter(sentiment_analysis__isnull=False).count()
+                try:
+                    job = enqueue_job(generate_session_report, session.id,
+                                      key=f"{generate_session_report.name}:{session.id}:{analysed_chunks}")
+                except JobEnqueueError as e:
+                    print(f"Could not enqueue report generation: {e}")
+                    return Response({"error": "Could not start report generation."},
+                                    status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                return Response({"session_id": session.id, "job_id": job.id, "job_status": job.status},
+                                status=status.HTTP_202_ACCEPTED)
+
+            report_response_data = self.build_report(session, company)
             return Response(report_response_data, status=status.HTTP_200_OK)
 
         except PracticeSession.DoesNotExist:
@@ -0,0 +1,249 @@
+"""
+In-process audio decoding for live session media chunks.
+
+Chunks arrive from the browser as webm/opus. Instead of shelling out to ffmpeg and
+re-encoding every chunk to MP3 on disk, the audio track is decoded with PyAV (libav*
+bindings) straight from memory into a mono float32 numpy array that the Praat metrics
+consume directly.
+
+`decode_audio` handles a standalone chunk. `StreamingDecoder` keeps one demuxer open for a
+whole session and decodes each chunk as a continuation of the same stream.
+"""
+
+import io
+import threading
+from collections import deque
+from typing import NamedTuple
+
+import av
+import numpy as np
+
+from .frame_sampling import FrameSampler, frame_to_bgr, VIDEO_SAMPLE_FPS, VIDEO_MAX_WIDTH, KEYFRAMES_ONLY
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Sample rate used for all analysis audio. 16 kHz comfortably covers speech pitch and
+# intensity, and keeps windows small (~640 KB of float32 per 10 s chunk).
+ANALYSIS_SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when a media chunk has no decodable audio track."""
+
+
+def make_resampler(sample_rate=ANALYSIS_SAMPLE_RATE):
+    """Resampler converting any decoded audio frame to packed mono float32 at `sample_rate`."""
+    return av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+
+
+def resample_frames(resampler, frame):
+    """Runs one decoded frame (or None to flush) through `resampler` and returns its samples."""
+    return [resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame)]
+
+
+def decode_audio(media_bytes, sample_rate=ANALYSIS_SAMPLE_RATE):
+    """
+    Decodes the audio track of an in-memory media chunk (bytes or memoryview) into a
+    mono float32 PCM array at `sample_rate`. Raises AudioDecodeError if the chunk has
+    no audio stream or cannot be demuxed.
+    """
+    try:
+        with av.open(io.BytesIO(media_bytes), mode="r") as container:
+            if not container.streams.audio:
+                raise AudioDecodeError("Media chunk has no audio stream")
+
+            audio_stream = container.streams.audio[0]
+            audio_stream.thread_type = "AUTO"
+            resampler = make_resampler(sample_rate)
+
+            pieces = []
+            for frame in container.decode(audio_stream):
+                pieces.extend(resample_frames(resampler, frame))
+            pieces.extend(resample_frames(resampler, None))
+    except av.FFmpegError as e:
+        raise AudioDecodeError(f"Could not decode media chunk: {e}") from e
+
+    if not pieces:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(pieces)
+
+
+# ---------------------- STREAMING DECODER ----------------------
+
+# How long feed() waits for the decoder to consume a chunk before returning what it has.
+FEED_TIMEOUT = 30.0
+
+
+class DecodedChunk(NamedTuple):
+    """Output of StreamingDecoder.feed for one media chunk."""
+    audio: np.ndarray  # mono float32 PCM at the decoder's sample rate
+    frames: list  # [(timestamp_seconds, BGR ndarray), ...] sampled at the decoder's fps
+    start_time: float  # stream time of the first decoded audio sample, in seconds
+    duration: float  # seconds of audio decoded for this chunk
+
+
+class _ChunkPipe:
+    """
+    Blocking, non-seekable file object between the consumer and the demuxer thread.
+    Chunks are appended with write(); read() blocks until bytes are available, and records
+    when the demuxer is starved so feed() knows everything written so far has been consumed.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._closed = False
+        self._finished = False
+        self._starved = False
+
+    def write(self, data):
+        with self._cond:
+            self._pending.append(memoryview(data))
+            self._starved = False
+            self._cond.notify_all()
+
+    def read(self, size=-1):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._starved = True
+                self._cond.notify_all()
+                self._cond.wait()
+            if not self._pending:
+                return b""
+
+            view = self._pending[0]
+            if size < 0 or size >= view.nbytes:
+                self._pending.popleft()
+                return bytes(view)
+            self._pending[0] = view[size:]
+            return bytes(view[:size])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def mark_finished(self):
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def wait_until_consumed(self, timeout):
+        """Blocks until the demuxer has read every pending byte and is waiting for more."""
+        with self._cond:
+            return self._cond.wait_for(lambda: (self._starved and not self._pending) or self._finished, timeout)
+
+
+class StreamingDecoder:
+    """
+    Long-lived decoder for one live session.
+
+    MediaRecorder chunks are continuations of a single WebM stream, so the container header
+    is parsed once and every chunk is demuxed and decoded exactly once as it arrives. A
+    background thread owns the PyAV container; feed() hands it the next chunk and returns the
+    audio samples and sampled video frames decoded from it. Packets cut at a chunk boundary
+    are simply completed by the next chunk.
+    """
+
+    def __init__(self, sample_rate=ANALYSIS_SAMPLE_RATE, video_fps=VIDEO_SAMPLE_FPS, max_width=VIDEO_MAX_WIDTH,
+                 keyframes_only=KEYFRAMES_ONLY):
+        self.sample_rate = sample_rate
+        self.video_fps = video_fps
+        self.max_width = max_width
+        self.keyframes_only = keyframes_only
+
+        self._pipe = _ChunkPipe()
+        self._lock = threading.Lock()
+        self._audio = []
+        self._frames = []
+        self._samples_emitted = 0
+        self._audio_start_time = None
+        self._frame_sampler = FrameSampler(video_fps)
+        self.error = None
+
+        self._thread = threading.Thread(target=self._run, name="streaming-decoder", daemon=True)
+        self._thread.start()
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def feed(self, media_bytes, timeout=FEED_TIMEOUT):
+        """Feeds the next chunk of the stream and returns what it decoded to (a DecodedChunk)."""
+        if self.failed:
+            raise AudioDecodeError(f"Streaming decoder failed earlier: {self.error}")
+
+        self._pipe.write(media_bytes)
+        if not self._pipe.wait_until_consumed(timeout):
+            logger.warning("Decoder did not consume chunk within %ss; returning partial output", timeout)
+        if self.failed and not self._audio and not self._frames:
+            raise AudioDecodeError(f"Streaming decoder failed: {self.error}")
+        return self._drain()
+
+    def close(self, timeout=5.0):
+        """
+        Signals end of stream and waits briefly for the decoder thread to exit. Returns what was
+        decoded after the last feed() (the decoder's and resampler's buffered tail), as a DecodedChunk.
+        """
+        self._pipe.close()
+        self._thread.join(timeout)
+        return self._drain()
+
+    def _drain(self):
+        with self._lock:
+            audio, self._audio = self._audio, []
+            frames, self._frames = self._frames, []
+            start_sample = self._samples_emitted
+            samples = np.concatenate(audio) if audio else np.zeros(0, dtype=np.float32)
+            self._samples_emitted += samples.size
+
+        start_time = (self._audio_start_time or 0.0) + start_sample / self.sample_rate
+        return DecodedChunk(samples, frames, start_time, samples.size / self.sample_rate)
+
+    def _run(self):
+        try:
+            # The stream is known to be webm (a matroska subset); skip format probing so the
+            # header is read as soon as the first chunk arrives instead of waiting for probesize bytes.
+            with av.open(self._pipe, mode="r", format="matroska", options={"probesize": "32768", "analyzeduration": "0"}) as container:
+                audio_stream = container.streams.audio[0] if container.streams.audio else None
+                video_stream = container.streams.video[0] if container.streams.video else None
+                streams = [s for s in (audio_stream, video_stream) if s is not None]
+                if video_stream is not None and self.keyframes_only:
+                    video_stream.codec_context.skip_frame = "NONKEY"
+                if not streams:
+                    raise AudioDecodeError("Media stream has no audio or video track")
+
+                audio_index = audio_stream.index if audio_stream is not None else None
+                resampler = make_resampler(self.sample_rate)
+                for packet in container.demux(*streams):
+                    for frame in packet.decode():
+                        if packet.stream.index == audio_index:
+                            self._on_audio_frame(resampler, frame)
+                        else:
+                            self._on_video_frame(frame)
+                self._on_audio_frame(resampler, None)
+        except Exception as e:
+            self.error = e
+            logger.error("Decoding stopped with error: %s", e)
+        finally:
+            self._pipe.mark_finished()
+
+    def _on_audio_frame(self, resampler, frame):
+        if frame is not None and self._audio_start_time is None:
+            self._audio_start_time = float(frame.time or 0.0)
+        samples = resample_frames(resampler, frame)
+        if samples:
+            with self._lock:
+                self._audio.extend(samples)
+
+    def _on_video_frame(self, frame):
+        if frame.time is None:
+            return
+        timestamp = float(frame.time)
+        if not self._frame_sampler.accept(timestamp):
+            return
+
+        image = frame_to_bgr(frame, self.max_width)
+        with self._lock:
+            self._frames.append((timestamp, image))
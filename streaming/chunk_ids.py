@@ -0,0 +1,78 @@
+"""
+Per-chunk registry of SessionChunk IDs for a live session.
+
+Window analysis needs the ID of its last chunk's SessionChunk row, and window cleanup must
+not drop a chunk whose row is still being saved. Both used to poll: look for the chunk's save
+task, sleep, look again. Instead the ingest stage registers a future for every chunk, the
+persist stage resolves it with the saved row's ID (None if the save failed), and anyone
+needing the ID awaits it:
+
+    registry.register(media_path)             # ingest
+    registry.resolve(media_path, chunk_id)    # persist
+    chunk_id = await registry.wait(media_path, timeout)
+
+Waiting on a chunk that was never registered (or was already forgotten) returns None at once.
+"""
+
+import asyncio
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ChunkIdRegistry:
+    def __init__(self):
+        self._futures = {}  # media path -> future resolving to the SessionChunk ID
+
+    def __contains__(self, media_path):
+        return media_path in self._futures
+
+    def __len__(self):
+        return len(self._futures)
+
+    def keys(self):
+        return list(self._futures)
+
+    def register(self, media_path):
+        """Registers a chunk whose row is about to be saved and returns its future."""
+        if media_path in self._futures:
+            logger.warning("Overwriting existing entry for %s", media_path)
+        future = asyncio.get_running_loop().create_future()
+        self._futures[media_path] = future
+        return future
+
+    def resolve(self, media_path, chunk_id):
+        """Records the chunk's SessionChunk ID (None if the save failed), waking its waiters."""
+        future = self._futures.get(media_path)
+        if future is None:
+            future = self._futures[media_path] = asyncio.get_running_loop().create_future()
+        if not future.done():
+            future.set_result(chunk_id)
+
+    def get(self, media_path):
+        """The chunk's ID if its save has completed, else None."""
+        future = self._futures.get(media_path)
+        if future is None or not future.done() or future.cancelled():
+            return None
+        return future.result()
+
+    async def wait(self, media_path, timeout=None):
+        """
+        Waits for the chunk's save and returns its ID (None if the save failed or the chunk is
+        unknown). Raises asyncio.TimeoutError after `timeout` seconds; the save itself goes on.
+        """
+        future = self._futures.get(media_path)
+        if future is None:
+            return None
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    def pending(self):
+        """Futures of the chunks still being saved."""
+        return [future for future in self._futures.values() if not future.done()]
+
+    def forget(self, media_path):
+        self._futures.pop(media_path, None)
+
+    def clear(self):
+        self._futures.clear()
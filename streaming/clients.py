@@ -0,0 +1,144 @@
+"""
+Process-wide API clients for OpenAI and Deepgram.
+
+Creating an OpenAI or DeepgramClient per call gives every call a fresh connection pool, so
+each request pays DNS, TCP and TLS setup again. The Deepgram SDK also builds a new HTTP
+client inside every request, so its REST API is called directly over a shared pool here.
+One registry per process holds:
+
+- a sync OpenAI client, used by the DRF views and by code running in threads;
+- one AsyncOpenAI client per event loop, awaited by the consumer (an async connection pool
+  is bound to the loop that created it);
+- sync and async HTTP clients for Deepgram's prerecorded REST endpoint.
+
+All of them keep connections alive between requests, have explicit connect and read
+timeouts, and negotiate HTTP/2 when the `h2` package is installed.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# Seconds to establish a connection, and to wait for a whole response
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+DEEPGRAM_TIMEOUT = float(os.getenv("DEEPGRAM_TIMEOUT", 30))
+
+# Connection pool size per client, and how long idle connections are kept open
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+
+# HTTP/2 needs the optional h2 package; without it the pools use HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEEPGRAM_LISTEN_URL = "https://api.deepgram.com/v1/listen"
+
+# Same model and formatting the Deepgram SDK requests were made with
+DEEPGRAM_OPTIONS = {"model": "nova-3", "smart_format": "true", "filler_words": "true"}
+
+
+def http_options(timeout, http2=HTTP2_AVAILABLE):
+    """Keyword arguments shared by every pooled httpx client."""
+    return {
+        "http2": http2,
+        "timeout": httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                               max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                               keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+    }
+
+
+class ClientRegistry:
+    def __init__(self, openai_api_key=None, deepgram_api_key=None, http2=HTTP2_AVAILABLE):
+        self.openai_api_key = openai_api_key
+        self.deepgram_api_key = deepgram_api_key
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._clients = {}  # name -> sync client
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> {name: async client}
+
+    def _get(self, name, factory):
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = factory()
+            return self._clients[name]
+
+    def _get_async(self, name, factory):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if name not in clients:
+                clients[name] = factory()
+            return clients[name]
+
+    def _deepgram_options(self, timeout):
+        return {
+            "headers": {"Authorization": f"Token {self.deepgram_api_key}"},
+            **http_options(timeout, self.http2),
+        }
+
+    def openai(self):
+        """Shared sync OpenAI client."""
+        return self._get("openai", lambda: OpenAI(
+            api_key=self.openai_api_key, max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.Client(**http_options(OPENAI_TIMEOUT, self.http2))))
+
+    def async_openai(self):
+        """AsyncOpenAI client of the running event loop."""
+        return self._get_async("openai", lambda: AsyncOpenAI(
+            api_key=self.openai_api_key, max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(**http_options(OPENAI_TIMEOUT, self.http2))))
+
+    def deepgram(self):
+        """Shared sync HTTP client for Deepgram's REST API."""
+        return self._get("deepgram", lambda: httpx.Client(**self._deepgram_options(DEEPGRAM_TIMEOUT)))
+
+    def async_deepgram(self):
+        """Async HTTP client for Deepgram's REST API, for the running event loop."""
+        return self._get_async("deepgram", lambda: httpx.AsyncClient(**self._deepgram_options(DEEPGRAM_TIMEOUT)))
+
+    def close(self):
+        """Closes the sync clients."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    async def aclose(self):
+        """Closes the async clients of the running event loop."""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            if isinstance(client, AsyncOpenAI):
+                await client.close()
+            else:
+                await client.aclose()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_clients():
+    """Returns the process-wide ClientRegistry, configured from Django settings."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from django.conf import settings
+            _registry = ClientRegistry(openai_api_key=settings.OPENAI_API_KEY,
+                                       deepgram_api_key=settings.DEEPGRAM_API_KEY)
+        return _registry
+
+
+def deepgram_transcript(response):
+    """Transcript text of a Deepgram prerecorded response."""
+    response.raise_for_status()
+    return response.json()["results"]["channels"][0]["alternatives"][0]["transcript"]
@@ -19,19 +19,16 @@ if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 import json
+import logging
 import os
 import asyncio
 import tempfile
 import concurrent.futures
-import subprocess
-import boto3
 import openai
 import django
 import time
-import traceback
 import random # Import random for selecting variations
 import numpy as np # Import numpy to handle potential numpy types
-from urllib.parse import urlparse # Import urlparse for S3 URL parsing
 
 from base64 import b64decode
 from datetime import timedelta
@@ -39,15 +36,40 @@ from datetime import timedelta
 from channels.generic.websocket import AsyncWebsocketConsumer
 # Import database_sync_to_async for handling synchronous database operations in async context
 from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import Max
 
 # Assuming these are in a local file sentiment_analysis.py
-# transcribe_audio now needs to handle a single audio file (used in process_media_chunk)
-# analyze_results now receives a concatenated transcript and the combined audio path (like the original)
+# transcribe_audio now takes the raw media bytes of a single chunk (used in the pipeline's transcribe stage)
+# analyze_results now receives a concatenated transcript and the combined decoded audio samples
 # Import the ai_audience_question function
-from .sentiment_analysis import analyze_results, transcribe_audio, ai_audience_question
+# The *_async variants await the shared, pooled API clients natively (see clients.py)
+from .sentiment_analysis import (
+    analyze_results_async, transcribe_audio_async, ai_audience_question_async, process_prosody
+)
+from .clients import get_clients
+from .posture import PostureSummary
+from .workers import get_cpu_pool
+from .transcription import LiveTranscriber, TranscriptionError, TRANSCRIPTION_MODE, STREAMING_TRANSCRIPTION
+from .audio_decoding import decode_audio, AudioDecodeError, StreamingDecoder
+from .pcm_buffer import PCMRingBuffer
+from .window_scheduler import WindowScheduler
+from .pipeline import ChunkJob, Pipeline, PipelineClosed, Stage
+from .s3_spool import get_s3_client, get_uploader, UPLOAD_PENDING
+from .storage import BUCKET_NAME, compiled_video_key, s3_url, session_s3_key
+from .tasks import compile_session_video as compile_session_video_job
+from .session_recording import RecordingError, SessionRecording
+from .session_state import get_session_state_store
+from .session_writer import ChunkRecord, SentimentRecord, SessionWriter
+from .chunk_ids import ChunkIdRegistry
+from .log import SAMPLED, get_logger
+from .metrics import ACTIVE_SESSIONS, CHUNK_TO_FEEDBACK_SECONDS, observe_stage, time_stage, track_pipeline
+from .framing import (
+    BINARY_SUBPROTOCOL, BINARY_PROTOCOL_NAME, JSON_PROTOCOL_NAME, FRAME_TYPE_MEDIA, FrameError, parse_frame
+)
 
 from practice_sessions.models import PracticeSession, SessionChunk, ChunkSentimentAnalysis
-from practice_sessions.serializers import SessionChunkSerializer, ChunkSentimentAnalysisSerializer # PracticeSessionSerializer might not be directly needed here
+from practice_sessions.jobs import enqueue_job, JobEnqueueError
 from django.contrib.auth import get_user_model # Import to get the User model
 
 User = get_user_model() # Get the active user model
@@ -59,13 +81,11 @@ django.setup()
 # Initialize OpenAI client
 # Ensure OPENAI_API_KEY is set in your environment
 openai.api_key = os.environ.get("OPENAI_API_KEY")
-client = openai.OpenAI() if openai.api_key else None  # Initialize client only if API key is available
+client = get_clients().openai() if openai.api_key else None  # Shared client, only if API key is available
 
-# Initialize S3 client
+# S3 client, shared with the chunk uploader and video compilation (pooled, see s3_spool.py)
 # Ensure AWS_REGION is set in your environment or settings
-s3 = boto3.client("s3", region_name=os.environ.get('AWS_REGION'))
-BUCKET_NAME = "engagex-user-content-1234" # Replace with your actual S3 bucket name
-BASE_FOLDER = "user-videos/" # Base folder in S3 bucket
+s3 = get_s3_client()
 TEMP_MEDIA_ROOT = tempfile.gettempdir() # Use system's temporary directory
 EMOTION_STATIC_FOLDER = "static-videos"  # Top-level folder for static emotion videos
 
@@ -81,6 +101,19 @@ ANALYSIS_WINDOW_SIZE = 3  # Keeping the reduced window size from the previous te
 # Define the interval for generating AI questions (in terms of number of analysis windows)
 QUESTION_INTERVAL_WINDOWS = 8
 
+# Concurrency of the chunk pipeline's transcription and persistence stages (see pipeline.py)
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", 3))
+PERSIST_CONCURRENCY = int(os.getenv("PERSIST_CONCURRENCY", 4))
+
+# Seconds window analysis, window cleanup and disconnect wait for a chunk's SessionChunk row to be saved
+CHUNK_SAVE_TIMEOUT = float(os.getenv("CHUNK_SAVE_TIMEOUT", 30))
+
+# Seconds disconnect waits for chunks still in the pipeline to be processed
+PIPELINE_DRAIN_TIMEOUT = float(os.getenv("PIPELINE_DRAIN_TIMEOUT", 30))
+
+# Close code of a socket replaced by a newer connection of the same session
+TAKEOVER_CLOSE_CODE = 4000
+
 
 # Helper function to convert numpy types to native Python types for JSON serialization
 def convert_numpy_types(obj):
@@ -102,20 +135,45 @@ def convert_numpy_types(obj):
 class LiveSessionConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.log = get_logger(__name__)  # Bound to the session's context fields in connect
         self.session_id = None
         self.user_id = None # Store the user ID
         self.room_name = None # Store the chosen room name
         self.chunk_counter = 0
         self.media_buffer = []  # Stores temporary media file paths (full video+audio chunk)
-        self.audio_buffer = {}  # Dictionary to map media_path to temporary audio_path (extracted audio)
+        # Rolling buffer of decoded mono PCM samples, one segment per media_path, sized to the analysis window
+        self.pcm_buffer = PCMRingBuffer(ANALYSIS_WINDOW_SIZE)
         self.transcript_buffer = {}  # Dictionary to map media_path to transcript text (transcript of single chunk)
-        self.media_path_to_chunk = {}  # Map temporary media_path to SessionChunk ID (from DB, after saving)
-        # Dictionary to store background tasks for chunk saving, keyed by media_path
-        self.background_chunk_save_tasks = {}
-        self._running_tasks = []
+        # Dictionary to map media_path to the task computing that chunk's PostureSummary (pose detection runs once per chunk)
+        self.posture_summaries = {}
+        # Dictionary to map media_path to the task computing that chunk's ProsodySummary (Praat runs once per chunk)
+        self.prosody_summaries = {}
+        self.stream_decoder = None  # Long-lived decoder for this session's WebM stream, created in connect
+        self.cpu_pool = None  # Process pool running pose detection and Praat, set in connect
+        self.uploader = None  # Write-behind S3 uploader shared by the process, set in connect
+        self.recording = None  # Session video assembled in S3 as chunks arrive (SessionRecording), set in connect
+        self.taken_over = False  # Whether a newer connection of the session replaced this one
+        # Transcription mode: per-chunk Deepgram requests, or one live connection per session (LiveTranscriber)
+        self.transcription_mode = TRANSCRIPTION_MODE
+        self.live_transcriber = None
+        self.pipeline = None  # Staged chunk pipeline (ingest -> decode -> transcribe -> analyze -> persist), built in connect
+        self.last_analyzed_path = None  # Newest chunk the analyze stage has formed a window for
+        # Future per temporary media_path, resolving to its SessionChunk ID once the persist stage has saved it
+        self.chunk_ids = ChunkIdRegistry()
+        self.chunk_received_at = {}  # Map temporary media_path to when its chunk arrived, for feedback latency
+        self.counted_active = False  # Whether this connection is counted in the active sessions metric
+        # Bounds the windows analysed at once; when behind, skips stale windows in favour of the newest
+        self.window_scheduler = WindowScheduler(self.analyze_windowed_media, on_report=self._report_window_lag)
         # Counter for analysis windows to trigger questions
         self.analysis_window_counter = 0
         self.ai_questions_enabled = True  # Default to True, will be updated in connect
+        # Media transport negotiated at connect: JSON/base64 (legacy clients) or binary frames
+        self.media_protocol = JSON_PROTOCOL_NAME
+        self.last_sequence = None  # Sequence number of the last binary media frame accepted
+        # Counters shared with every node (chunk numbers, analysis windows), so a reconnect resumes them
+        self.session_state = None
+        self.session_group = None  # Channel layer group of the session's sockets, across nodes
+        self.session_writer = None  # Batches the session's SessionChunk/ChunkSentimentAnalysis inserts, set in connect
 
     # Make connect asynchronous to allow DB query
     async def connect(self):
@@ -127,13 +185,26 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                     key, value = param.split('=', 1)
                     query_params[key] = value
                 except ValueError:
-                    print(f"WS: Warning: Could not parse query parameter: {param}")
+                    self.log.warning("Could not parse query parameter: %s", param)
 
         self.session_id = query_params.get('session_id', None)
         self.room_name = query_params.get('room_name', None)  # Get room_name from query params
+        self.log = get_logger(__name__, session_id=self.session_id, room=self.room_name)
         # Get AI questions enabled status, default to True if not provided
         self.ai_questions_enabled = query_params.get('ai_questions_enabled', 'true').lower() == 'true'
 
+        self.transcription_mode = query_params.get('transcription', TRANSCRIPTION_MODE).lower()
+
+        # Negotiate the media transport. Clients offering the binary subprotocol (or passing
+        # media_protocol=binary when they cannot set subprotocols) send raw framed webm chunks;
+        # everyone else keeps the JSON/base64 envelope.
+        accepted_subprotocol = None
+        if BINARY_SUBPROTOCOL in self.scope.get('subprotocols', []):
+            self.media_protocol = BINARY_PROTOCOL_NAME
+            accepted_subprotocol = BINARY_SUBPROTOCOL
+        elif query_params.get('media_protocol', JSON_PROTOCOL_NAME).lower() == BINARY_PROTOCOL_NAME:
+            self.media_protocol = BINARY_PROTOCOL_NAME
+
         # Validate session_id and room_name
         if self.session_id and self.room_name in POSSIBLE_ROOMS:
             # Retrieve the user ID from the PracticeSession (requires async DB call)
@@ -145,85 +216,113 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
 
                 if user_id_or_none is not None:
                      self.user_id = str(user_id_or_none) # Store user ID as string
-                     print(f"WS: Client connected for Session ID: {self.session_id}, User ID: {self.user_id}, Room: {self.room_name}, AI Questions Enabled: {self.ai_questions_enabled}")
-                     await self.accept()
+                     self.log = self.log.bind(user_id=self.user_id)
+                     self.log.info("Client connected for Session ID: %s, User ID: %s, Room: %s, AI Questions Enabled: %s, Media Protocol: %s", self.session_id, self.user_id, self.room_name, self.ai_questions_enabled, self.media_protocol)
+                     await self.accept(subprotocol=accepted_subprotocol)
+                     # The session was checked above, so rows reference its ID without loading it again
+                     self.session_writer = SessionWriter(self.session_id)
+                     await self._restore_session_state()
+                     await self._join_session_group()
+                     self.stream_decoder = StreamingDecoder()
+                     # Worker processes for pose detection and Praat; started by the first session on this node
+                     self.cpu_pool = await asyncio.to_thread(get_cpu_pool)
+                     # Uploader threads for spooled chunks; the first session also re-queues leftover uploads
+                     self.uploader = await asyncio.to_thread(get_uploader)
+                     await self._start_recording()
+                     if self.transcription_mode == STREAMING_TRANSCRIPTION:
+                         await self._start_live_transcription()
+                     self.pipeline = self._build_pipeline()
+                     self.pipeline.start()
+                     track_pipeline(self.pipeline)
+                     ACTIVE_SESSIONS.inc()
+                     self.counted_active = True
                      await self.send(json.dumps({
                          "type": "connection_established",
-                         "message": f"Connected to session {self.session_id} for user {self.user_id} in room {self.room_name}"
+                         "message": f"Connected to session {self.session_id} for user {self.user_id} in room {self.room_name}",
+                         "media_protocol": self.media_protocol
                      }))
-                     print("WS: Connect method successfully completed logic.") # Added diagnostic print
+                     self.log.debug("Connect method successfully completed logic.") # Added diagnostic print
 
                 else:
                      # This covers cases where the session_id is invalid or the session has no user
-                     print(f"WS: Connection rejected for Session ID {self.session_id}: PracticeSession not found or has no associated user.")
+                     self.log.warning("Connection rejected for Session ID %s: PracticeSession not found or has no associated user.", self.session_id)
                      await self.close()
 
             # We might still catch PracticeSession.DoesNotExist if the initial filter didn't exclude it,
             # but the values_list approach with first() should handle the no-session case gracefully with None.
             # Keeping this catch block for robustness against other potential DB errors.
             except Exception as e:
-                 print(f"WS: Error retrieving PracticeSession or User ID during connect: {e}")
-                 traceback.print_exc()
+                 self.log.exception("Error retrieving PracticeSession or User ID during connect: %s", e)
                  await self.close()
 
         else:
-            print(f"WS: Connection rejected: Missing session_id or invalid room_name ({self.room_name}).") # Added more detailed message
+            self.log.info("Connection rejected: Missing session_id or invalid room_name (%s).", self.room_name) # Added more detailed message
             await self.close()
 
     async def disconnect(self, close_code):
-        print(f"WS: Client disconnected for Session ID: {self.session_id}. Cleaning up...")
-
-        # Trigger video compilation as a background task
-        if self.session_id:
-            print(f"WS: Triggering video compilation for session {self.session_id}")
-            # Use asyncio.create_task to run compilation in the background
-            asyncio.create_task(self.compile_session_video(self.session_id))
-
-        # Attempt to wait for background chunk save tasks to finish gracefully
-        print(f"WS: Waiting for {len(self.background_chunk_save_tasks)} pending background save tasks...")
-        tasks_to_wait_for = list(self.background_chunk_save_tasks.values())
-        if tasks_to_wait_for:
+        self.log.info("Client disconnected for Session ID: %s. Cleaning up...", self.session_id)
+        if self.counted_active:
+            ACTIVE_SESSIONS.dec()
+            self.counted_active = False
+
+        if self.session_group is not None:
+            await self.channel_layer.group_discard(self.session_group, self.channel_name)
+
+        # Let chunks already received finish their way through the pipeline (bounded), so they are
+        # transcribed, analysed and saved before the decoder and transcriber are closed
+        if self.pipeline is not None:
+            await self.pipeline.close(timeout=PIPELINE_DRAIN_TIMEOUT)
+            self.log.info("Chunk pipeline closed. Final stage metrics: %s", self.pipeline.metrics())
+
+        # A newer connection carries on with the session, feeding a new stream, so this one's recording
+        # cannot be continued; the connection that ends the session has the video compiled
+        taken_over = self.taken_over or close_code == TAKEOVER_CLOSE_CODE
+        if taken_over and self.recording is not None:
+            await self.recording.abort()
+            self.recording = None
+            self.log.info("Session %s was taken over; discarded its recording. The video will be compiled at the end.", self.session_id)
+
+        # No new windows; the running and pending ones finish (bounded) before the buffers they read are cleared
+        if not await self.window_scheduler.close(timeout=CHUNK_SAVE_TIMEOUT):
+            self.log.warning("Analysis windows of session %s still running after %s seconds; cleaning up anyway.", self.session_id, CHUNK_SAVE_TIMEOUT)
+
+        # Flush and close the live transcription connection
+        if self.live_transcriber is not None:
+            await self.live_transcriber.close()
+            self.live_transcriber = None
+
+        # Signal end of stream to the session decoder so its thread exits
+        if self.stream_decoder is not None:
+            await asyncio.to_thread(self.stream_decoder.close)
+            self.stream_decoder = None
+
+        # Wait (bounded) for the saves of chunks still being persisted; a failed save resolves to None
+        pending_saves = self.chunk_ids.pending()
+        self.log.info("Waiting for %s pending chunk saves...", len(pending_saves))
+        if pending_saves:
             try:
-                # Wait with a timeout for all tasks related to saving chunks
-                # Using asyncio.gather to wait for multiple tasks
-                # return_exceptions=True allows gathering to complete even if some tasks raise errors (like CancelledError on disconnect)
-                # Store the results and exceptions
-                results = await asyncio.wait_for(asyncio.gather(*tasks_to_wait_for, return_exceptions=True),
-                                                 timeout=10.0)  # Wait up to 10 seconds
-                print("WS: Finished waiting for background save tasks during disconnect.")
-
-                # Explicitly process results to handle exceptions like CancelledError
-                for i, result in enumerate(results):
-                    if isinstance(result, asyncio.CancelledError):
-                        # This is expected if the task was cancelled on disconnect
-                        print(f"WS: Background save task {i} was cancelled during disconnect wait (expected).")
-                    elif isinstance(result, Exception):
-                        # Log any other unexpected exceptions that occurred in the background tasks
-                        print(f"WS: Background save task {i} finished with unexpected exception: {result}")
-                        traceback.print_exc()  # Print traceback for unexpected exceptions
-                    # Else: The task completed successfully, no action needed here as the save logic
-                    # and buffer updates happen within the task itself (_complete_chunk_save_in_background)
-
+                await asyncio.wait_for(asyncio.gather(*pending_saves, return_exceptions=True), timeout=CHUNK_SAVE_TIMEOUT)
+                self.log.info("Finished waiting for chunk saves during disconnect.")
             except asyncio.TimeoutError:
-                print("WS: Timeout waiting for some background save tasks during disconnect.")
-            except Exception as e:
-                # Catch any errors that occur *during* the gather or wait_for itself
-                print(f"WS: Error during asyncio.gather for background save tasks: {e}")
-                traceback.print_exc()
+                self.log.warning("Timeout waiting for some chunk saves during disconnect.")
+
+        # Every received chunk has been ingested and saved, so the session video can be finalized
+        if self.session_id and not taken_over:
+            self.log.info("Finalizing the video of session %s", self.session_id)
+            await self.finalize_session_video(self.session_id)
 
         # Get all paths from buffers and the map keys for final cleanup
         # Ensure we get paths associated with tasks that might have just finished or failed
-        audio_paths_to_clean = list(self.audio_buffer.values())
+        # (decoded audio lives in memory only, so there are no audio files to remove)
         media_paths_to_clean_from_buffer = list(self.media_buffer)
-        media_paths_to_clean_from_map_keys = list(self.media_path_to_chunk.keys())  # Includes paths for saved chunks
+        media_paths_to_clean_from_map_keys = self.chunk_ids.keys()  # Includes paths for saved chunks
 
         # Combine all potential paths and remove duplicates
         all_paths_to_clean = set(
-            [p for p in audio_paths_to_clean + media_paths_to_clean_from_buffer + media_paths_to_clean_from_map_keys if
-             p is not None])
+            [p for p in media_paths_to_clean_from_buffer + media_paths_to_clean_from_map_keys if p is not None])
 
         # Clean up temporary files
-        print(f"WS: Attempting to clean up {len(all_paths_to_clean)} temporary files...")
+        self.log.debug("Attempting to clean up %s temporary files...", len(all_paths_to_clean))
         # Use asyncio.gather for file removals to potentially speed up cleanup
         cleanup_tasks = []
         for file_path in all_paths_to_clean:
@@ -233,37 +332,38 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                     await asyncio.sleep(0.05)  # Small delay before removing
                     if os.path.exists(f_path):
                         os.remove(f_path)
-                        print(f"WS: Removed temporary file: {f_path}")
+                        self.log.debug("Removed temporary file: %s", f_path, extra=SAMPLED)
                     else:
-                        print(f"WS: Temporary file not found during disconnect cleanup: {f_path}")
+                        self.log.debug("Temporary file not found during disconnect cleanup: %s", f_path, extra=SAMPLED)
                 except Exception as e:
-                    print(f"WS: Error removing file {f_path} during disconnect cleanup: {e}")
-                    traceback.print_exc()  # Add traceback for cleanup errors
+                    self.log.exception("Error removing file %s during disconnect cleanup: %s", f_path, e)
 
             cleanup_tasks.append(remove_file_safe(file_path))
 
         if cleanup_tasks:
             # Run cleanup tasks concurrently, don't worry about exceptions as they are caught within the task
             await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-            print("WS: Finished temporary file cleanup.")
+            self.log.debug("Finished temporary file cleanup.")
 
         # Clear buffers and maps *after* attempting cleanup
-        self.audio_buffer = {}
+        self.pcm_buffer.clear()
         self.media_buffer = []
         self.transcript_buffer = {}  # Clear the transcript buffer
-        self.media_path_to_chunk = {}
-        self.background_chunk_save_tasks = {}  # Clear background task tracking dictionary
+        self.posture_summaries = {}
+        self.prosody_summaries = {}
+        self.chunk_ids.clear()
+        self.chunk_received_at = {}
 
-        print(f"WS: Session {self.session_id} cleanup complete.")
+        self.log.info("Session %s cleanup complete.", self.session_id)
 
     async def receive(self, text_data=None, bytes_data=None):
-        print("WS: Received message or data.") # Added diagnostic print
+        self.log.debug("Received message or data.", extra=SAMPLED) # Added diagnostic print
         if not self.session_id:
-            print("WS: Error: Session ID not available, cannot process data.")
+            self.log.error("Session ID not available, cannot process data.")
             return
         # Ensure user_id is available before processing data
         if not self.user_id:
-            print("WS: Error: User ID not available, cannot process data.")
+            self.log.error("User ID not available, cannot process data.")
             return
 
 
@@ -272,171 +372,372 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                 data = json.loads(text_data)
                 message_type = data.get("type")
                 if message_type == "media":
-                    self.chunk_counter += 1
                     media_blob = data.get("data")
                     if media_blob:
-                        media_bytes = b64decode(media_blob)
-                        # Create a temporary file for the media chunk
-                        media_path = os.path.join(TEMP_MEDIA_ROOT, f"{self.session_id}_{self.chunk_counter}_media.webm")
-                        with open(media_path, "wb") as mf:
-                            mf.write(media_bytes)
-                        print(
-                            f"WS: Received media chunk {self.chunk_counter} for Session {self.session_id}. Saved to {media_path}")
-                        self.media_buffer.append(media_path)
-
-                        # Start processing the media chunk (audio extraction, transcription)
-                        # This part is still awaited to ensure audio/transcript are in buffers
-                        # S3 upload and DB save are initiated as background tasks within process_media_chunk
-                        print(
-                            f"WS: Starting processing (audio/transcript) for chunk {self.chunk_counter} and WAITING for it to complete.")
-                        await self.process_media_chunk(media_path)
-
-                        # Trigger windowed analysis if buffer size is sufficient
-                        # analyze_windowed_media will run concurrently
-                        # It will handle waiting for background chunk save before saving analysis results
-                        if len(self.media_buffer) >= ANALYSIS_WINDOW_SIZE:
-                            # Take the last ANALYSIS_WINDOW_SIZE chunks for the sliding window
-                            window_paths = list(self.media_buffer[-ANALYSIS_WINDOW_SIZE:])
-                            print(
-                                f"WS: Triggering windowed analysis for sliding window (chunks ending with {self.chunk_counter})")
-                            # Pass the list of media paths in the window and the latest chunk number
-                            asyncio.create_task(self.analyze_windowed_media(window_paths, self.chunk_counter))
-
+                        await self.handle_media_chunk(b64decode(media_blob))
                     else:
-                        print("WS: Error: Missing 'data' in media message.")
+                        self.log.error("Missing 'data' in media message.")
                 else:
-                    print(f"WS: Received text message of type: {message_type}")
+                    self.log.debug("Received text message of type: %s", message_type, extra=SAMPLED)
             elif bytes_data:
-                print(f"WS: Received binary data of length: {len(bytes_data)}")
+                if self.media_protocol != BINARY_PROTOCOL_NAME:
+                    self.log.warning("Received binary data of length %s without negotiating the binary protocol. Ignoring.", len(bytes_data))
+                    return
+                try:
+                    frame_type, sequence, _, payload = parse_frame(bytes_data)
+                except FrameError as frame_error:
+                    self.log.warning("Dropping malformed binary frame: %s", frame_error)
+                    return
+
+                if frame_type != FRAME_TYPE_MEDIA:
+                    self.log.warning("Received binary frame of unknown type %s. Ignoring.", frame_type)
+                    return
+                if self.last_sequence is not None and sequence <= self.last_sequence:
+                    self.log.warning("Dropping duplicate or out-of-order media frame %s (last accepted %s).", sequence, self.last_sequence)
+                    return
+                if self.last_sequence is not None and sequence != self.last_sequence + 1:
+                    self.log.warning("Media frames %s-%s were never received.", self.last_sequence + 1, sequence - 1)
+                self.last_sequence = sequence
+
+                if payload.nbytes:
+                    await self.handle_media_chunk(payload)
+                else:
+                    self.log.error("Empty payload in media frame %s.", sequence)
         except json.JSONDecodeError:
-            print(f"WS: Received invalid JSON data: {text_data}")
+            self.log.info("Received invalid JSON data: %s", text_data)
         except Exception as e:
-            print(f"WS: Error processing received data: {e}")
-            traceback.print_exc()
+            self.log.exception("Error processing received data: %s", e)
 
-    async def process_media_chunk(self, media_path):
+    async def _restore_session_state(self):
         """
-        Processes a single media chunk: extracts audio, transcribes,
-        and initiates S3 upload and saves SessionChunk data in the background.
-        This function returns after extracting audio and transcribing,
-        allowing analyze_windowed_media to be triggered sooner.
+        Resumes the session's chunk numbering and analysis window count from the shared
+        session-state store, so a reconnect (on this or another node) continues the sequence.
+        A store with no state for the session (new, expired) is seeded from the chunks already saved.
         """
-        start_time = time.time()
-        print(f"WS: process_media_chunk started for: {media_path} at {start_time}")
-        audio_path = None
-        chunk_transcript = None  # Initialize transcript as None
-
+        self.session_state = get_session_state_store()
         try:
-            # --- Audio Extraction (Blocking, but relatively fast) ---
-            # Use asyncio.to_thread for the blocking audio extraction call
-            # This part is awaited to ensure audio file is ready for transcription
-            extract_future = asyncio.to_thread(self.extract_audio, media_path)
-            audio_path = await extract_future  # Await audio extraction
-
-            # Check if audio extraction was successful and file exists
-            if audio_path and os.path.exists(audio_path):
-                print(f"WS: Audio extracted and found at: {audio_path}")
-                self.audio_buffer[media_path] = audio_path  # Store the mapping
-
-                # --- Transcription of the single chunk (Blocking network I/O) ---
-                # Only transcribe if AI questions are enabled or analysis requires it
-                # Assuming transcription is always needed for analysis regardless of questions
-                # If transcription was *only* for questions, we would gate it here.
-                # For now, keep transcription as it's needed for general analysis too.
-                if client:  # Check if OpenAI client was initialized
-                    print(f"WS: Attempting transcription for single chunk audio: {audio_path}")
-                    transcription_start_time = time.time()
-                    try:
-                        # Assuming transcribe_audio returns the transcript string or None on failure
-                        chunk_transcript = await asyncio.to_thread(transcribe_audio, audio_path)
-                        print(
-                            f"WS: Single chunk Transcription Result: {chunk_transcript} after {time.time() - transcription_start_time:.2f} seconds")
+            state = await self.session_state.load(self.session_id)
+            saved_chunks = await database_sync_to_async(
+                lambda: SessionChunk.objects.filter(session_id=self.session_id).aggregate(Max('chunk_number'))['chunk_number__max'])()
+            if saved_chunks and state.get("chunk_counter", 0) < saved_chunks:
+                state["chunk_counter"] = await self.session_state.incr(
+                    self.session_id, "chunk_counter", saved_chunks - state.get("chunk_counter", 0))
+        except Exception as e:
+            self.log.warning("Could not load shared state for session %s, numbering chunks locally: %s", self.session_id, e)
+            return
+        self.chunk_counter = state.get("chunk_counter", 0)
+        self.analysis_window_counter = state.get("analysis_window_counter", 0)
+        if state:
+            self.log.info("Resuming session %s after chunk %s, analysis window %s", self.session_id, self.chunk_counter, self.analysis_window_counter)
 
-                        # Always store the result, even if it's None or empty string
-                        self.transcript_buffer[media_path] = chunk_transcript
-                        print(f"WS: Stored transcript for {media_path} in buffer.")
+    async def _increment_session_state(self, field, local_value):
+        """
+        Atomically increments a shared session counter and returns the new value. If the store
+        cannot be reached, falls back to counting locally from `local_value`.
+        """
+        if self.session_state is not None:
+            try:
+                return await self.session_state.incr(self.session_id, field)
+            except Exception as e:
+                self.log.warning("Could not update shared %s for session %s, counting locally: %s", field, self.session_id, e)
+        return local_value + 1
 
-                    except Exception as transcribe_error:
-                        print(f"WS: Error during single chunk transcription for {audio_path}: {transcribe_error}")
-                        traceback.print_exc()  # Print traceback for transcription errors
-                        # If transcription fails, chunk_transcript is still None, and None is stored in buffer
+    async def _join_session_group(self):
+        """
+        Joins the session's channel layer group and tells any older socket of the session (a
+        connection the client has abandoned, possibly on another node) to close, so one socket
+        at a time feeds the session.
+        """
+        if self.channel_layer is None:
+            return
+        self.session_group = f"session_{self.session_id}"
+        await self.channel_layer.group_add(self.session_group, self.channel_name)
+        await self.channel_layer.group_send(self.session_group, {
+            "type": "session.takeover",
+            "channel_name": self.channel_name,
+        })
+
+    async def session_takeover(self, event):
+        """A newer socket of this session connected; this one closes."""
+        if event["channel_name"] == self.channel_name:
+            return
+        self.log.info("Session %s was resumed on another connection; closing this one.", self.session_id)
+        self.taken_over = True
+        await self.close(code=TAKEOVER_CLOSE_CODE)
 
+    async def handle_media_chunk(self, media_bytes):
+        """
+        Hands one received media chunk to the session pipeline and returns, so the socket reader
+        can take the next message. `media_bytes` may be bytes (decoded JSON envelope) or a memoryview
+        over a binary frame; it is written to disk by the ingest stage without an intermediate copy.
+        Only waits if the pipeline's ingest queue is full (backpressure on the client).
+        """
+        if self.pipeline is None:
+            self.log.error("Chunk pipeline not started, cannot process media chunk.")
+            return
+        self.chunk_counter = await self._increment_session_state("chunk_counter", self.chunk_counter)
+        if self.pipeline.full:
+            self.log.warning("Chunk pipeline is full; waiting before accepting chunk %s. Queues: %s", self.chunk_counter, self.pipeline.metrics())
+        try:
+            await self.pipeline.put(ChunkJob(self.chunk_counter, media_bytes))
+        except PipelineClosed:
+            self.log.info("Chunk pipeline is closing; dropping chunk %s.", self.chunk_counter)
 
-                else:
-                    print("WS: OpenAI client not initialized (missing API key?). Skipping single chunk transcription.")
-                    self.transcript_buffer[media_path] = None  # Store None if transcription is skipped
+    def _build_pipeline(self):
+        """
+        The session's chunk pipeline: ingest -> decode -> transcribe -> analyze -> persist.
+        Decoding feeds one WebM stream, and live transcription one audio stream, so those run one
+        chunk at a time; per-chunk transcription requests run concurrently but are passed on in
+        chunk order, so every window is formed only after all of its chunks are transcribed.
+        """
+        live = self.live_transcriber is not None
+        return Pipeline([
+            Stage("ingest", self._ingest_chunk),
+            Stage("decode", self._decode_chunk),
+            Stage("transcribe", self._transcribe_chunk, concurrency=1 if live else TRANSCRIBE_CONCURRENCY,
+                  ordered=True),
+            Stage("analyze", self._analyze_chunk),
+            Stage("persist", self._persist_chunk, concurrency=PERSIST_CONCURRENCY),
+        ], on_drop=self._chunk_dropped)
+
+    def _chunk_dropped(self, job):
+        """A chunk left the pipeline before it was saved: nobody should wait for its SessionChunk row."""
+        if job.media_path is not None:
+            self.chunk_ids.resolve(job.media_path, None)
+
+    async def _ingest_chunk(self, job):
+        """Ingest stage: writes the chunk to a temporary file and adds it to the media buffer."""
+        # Create a temporary file for the media chunk
+        job.media_path = os.path.join(TEMP_MEDIA_ROOT, f"{self.session_id}_{job.chunk_number}_media.webm")
+        with open(job.media_path, "wb") as mf:
+            mf.write(job.media_bytes)
+        self.log.debug("Received media chunk %s for Session %s. Saved to %s", job.chunk_number, self.session_id, job.media_path, extra=SAMPLED)
+        self.media_buffer.append(job.media_path)
+        self.chunk_received_at[job.media_path] = job.received_at
+        # Chunks arrive here in order, so the session video grows with each one
+        if self.recording is not None:
+            await self.recording.append(job.media_bytes)
+
+        # Registered now so window analysis and cleanup can wait for the save of a chunk still in the pipeline;
+        # resolved by the persist stage
+        job.saved = self.chunk_ids.register(job.media_path)
+        return job
+
+    async def _decode_chunk(self, job):
+        """
+        Decode stage: decodes the chunk's audio and video in memory, stores the samples for the
+        window and starts the chunk's posture and prosody summaries in the worker pool.
+        """
+        start_time = time.time()
+        media_path = job.media_path
+        # --- Audio/Video Decoding (CPU-bound, in-process, no temp files) ---
+        # Use asyncio.to_thread for the blocking decode call
+        with time_stage("decode"):
+            audio_samples, video_frames = await asyncio.to_thread(self.extract_audio, job.media_bytes)
+
+        # --- Posture features for this chunk (computed once, merged by every window containing it) ---
+        # Decoded frames are used when available; otherwise the chunk file is read with OpenCV
+        self.posture_summaries[media_path] = asyncio.create_task(
+            self._summarize_chunk_posture(media_path, video_frames or media_path))
+
+        # Check if audio decoding was successful
+        if audio_samples is not None and audio_samples.size:
+            self.log.debug("Audio decoded for %s: %s samples after %.2f seconds", media_path, audio_samples.size, time.time() - start_time, extra=SAMPLED)
+            job.audio_samples = audio_samples
+            self.pcm_buffer.append(media_path, audio_samples)  # Store the samples for the window
+            # Pitch/intensity statistics for this chunk, merged by every window containing it
+            self.prosody_summaries[media_path] = asyncio.create_task(
+                self._summarize_chunk_prosody(media_path, audio_samples))
+        else:
+            self.log.warning("Audio decoding failed or produced no samples for %s. Skipping transcription for this chunk.", media_path)
+            # Nothing is appended to pcm_buffer, so windows containing this chunk skip audio analysis
+        return job
+
+    async def _transcribe_chunk(self, job):
+        """Transcribe stage: stores the chunk's transcript (or its live transcription handle) in transcript_buffer."""
+        media_path, media_bytes, audio_samples = job.media_path, job.media_bytes, job.audio_samples
+        # The received bytes are not needed past this stage
+        job.media_bytes = None
+
+        if audio_samples is None:
+            self.transcript_buffer[media_path] = None  # Store None if transcription is skipped
+
+        elif client and self.live_transcriber is not None and not self.live_transcriber.failed:
+            # Streaming mode: send the decoded audio down the session's live connection and move on.
+            # Interim/final segments fill transcript_buffer via _on_live_transcript; the window
+            # analysis waits for this chunk's final transcript.
+            try:
+                self.transcript_buffer[media_path] = ""
+                await self.live_transcriber.feed(media_path, audio_samples)
+                self.log.debug("Sent %s samples of %s to live transcription", audio_samples.size, media_path, extra=SAMPLED)
+            except TranscriptionError as e:
+                self.log.warning("Live transcription failed (%s). Falling back to per-chunk transcription.", e)
+                self.transcript_buffer[media_path] = await transcribe_audio_async(media_bytes)
+
+        elif client:  # Check if OpenAI client was initialized
+            self.log.debug("Attempting transcription for single chunk: %s", media_path, extra=SAMPLED)
+            transcription_start_time = time.time()
+            chunk_transcript = None
+            try:
+                # Deepgram accepts the webm/opus chunk directly, so no re-encode is needed
+                # Assuming transcribe_audio_async returns the transcript string or None on failure
+                with time_stage("transcription"):
+                    chunk_transcript = await transcribe_audio_async(media_bytes)
+                self.log.debug("Single chunk Transcription Result: %s after %.2f seconds", chunk_transcript, time.time() - transcription_start_time, extra=SAMPLED)
+            except Exception as transcribe_error:
+                self.log.exception("Error during single chunk transcription for %s: %s", media_path, transcribe_error)
+            # Always store the result, even if it's None or empty string
+            self.transcript_buffer[media_path] = chunk_transcript
+            self.log.debug("Stored transcript for %s in buffer.", media_path, extra=SAMPLED)
 
-            else:
-                print(
-                    f"WS: Audio extraction failed or file not found for {media_path}. Audio path: {audio_path}. Skipping transcription for this chunk.")
-                self.audio_buffer[media_path] = None  # Store None if audio extraction failed
-                self.transcript_buffer[media_path] = None  # Store None if transcription is skipped
-
-            # --- Initiate S3 Upload and Save SessionChunk data in the BACKGROUND ---
-            # Create a task for S3 upload - this runs in a thread pool
-            s3_upload_task = asyncio.create_task(asyncio.to_thread(self.upload_to_s3, media_path))
-
-            # Create a task to await the S3 upload and then save the chunk data to the DB
-            # This task runs in the background. Store the task so analyze_windowed_media can potentially wait for it.
-            # Create the task first, then add it to the dictionary to ensure it's registered
-            # Pass the current chunk_counter to the background task
-            chunk_save_task = asyncio.create_task(
-                self._complete_chunk_save_in_background(media_path, s3_upload_task, self.chunk_counter))
-            print(f"WS: Created background chunk save task for {media_path}: {chunk_save_task}")
-            self._running_tasks.append(chunk_save_task)
-
-            await asyncio.sleep(0.1)  # Increase delay slightly in case of task registration lag
-
-            if media_path in self.background_chunk_save_tasks:
-                print(f"WS: WARNING: Overwriting existing task for {media_path}")
-            self.background_chunk_save_tasks[media_path] = chunk_save_task
-
-            # Confirm it was successfully added
-            if media_path in self.background_chunk_save_tasks:
-                print(f"WS: Registered background chunk save task for {media_path} ✅")
-            else:
-                print(f"WS: ❌ Failed to register background task for {media_path}")
+        else:
+            self.log.warning("OpenAI client not initialized (missing API key?). Skipping single chunk transcription.")
+            self.transcript_buffer[media_path] = None  # Store None if transcription is skipped
+        return job
 
+    async def _analyze_chunk(self, job):
+        """
+        Analyze stage: submits the sliding window ending with this chunk to the window scheduler.
+        The scheduler runs analyze_windowed_media concurrently, at most WINDOW_MAX_IN_FLIGHT windows at a time;
+        while those are busy only the newest window waits, and older waiting windows are skipped.
+        analyze_windowed_media handles waiting for the chunk save before saving analysis results.
+        """
+        if job.media_path not in self.media_buffer:
+            self.log.debug("%s left the buffer before analysis (session closing?). Not forming a window.", job.media_path)
+            return job
+        self.last_analyzed_path = job.media_path
+        end = self.media_buffer.index(job.media_path) + 1
+        if end >= ANALYSIS_WINDOW_SIZE:
+            # The ANALYSIS_WINDOW_SIZE chunks ending with this one form the sliding window
+            window_paths = list(self.media_buffer[end - ANALYSIS_WINDOW_SIZE:end])
+            # Pass the list of media paths in the window and the latest chunk number
+            status = self.window_scheduler.submit(window_paths, job.chunk_number)
+            self.log.debug("Windowed analysis for sliding window (chunks ending with %s) %s", job.chunk_number, status, extra=SAMPLED)
+        return job
+
+    async def _persist_chunk(self, job):
+        """Persist stage: spools the chunk for upload to S3 and saves its SessionChunk row."""
+        # Spooling is a hard link (or local copy); the upload itself happens after the row is saved
+        spool_entry = await asyncio.to_thread(self.spool_for_upload, job.media_path)
+        chunk_id = None
+        try:
+            chunk_id = await self._complete_chunk_save_in_background(job.media_path, spool_entry, job.chunk_number)
+        finally:
+            # Resolve the save future registered at ingest with the SessionChunk ID (None if the save failed)
+            self.chunk_ids.resolve(job.media_path, chunk_id)
+        self.log.debug("Chunk %s persisted %.2f seconds after it arrived", job.chunk_number, time.time() - job.received_at, extra=SAMPLED)
+        return None
 
+    async def _start_recording(self):
+        """
+        Starts assembling the session video in S3 as chunks arrive. Skipped when the session already
+        has chunks (a reconnect or takeover), since the recording would only hold this connection's
+        chunks. The resumed chunk counter also covers chunks an earlier connection has not saved yet.
+        """
+        has_chunks = self.chunk_counter > 0 or await database_sync_to_async(
+            lambda: SessionChunk.objects.filter(session_id=self.session_id).exists())()
+        if has_chunks:
+            self.log.info("Session %s already has chunks. Its video will be compiled at the end.", self.session_id)
+            return
+        recording = SessionRecording(get_s3_client(), BUCKET_NAME, compiled_video_key(self.user_id, self.session_id))
+        try:
+            await recording.start()
+            self.recording = recording
+        except RecordingError as e:
+            self.log.warning("%s. The session video will be compiled at the end.", e)
+
+    async def _start_live_transcription(self):
+        """Opens the session's live transcription connection; on failure chunks are transcribed one by one."""
+        transcriber = LiveTranscriber(settings.DEEPGRAM_API_KEY, on_update=self._on_live_transcript)
+        try:
+            await transcriber.start()
+            self.live_transcriber = transcriber
+            self.log.info("Live transcription connected for session %s", self.session_id)
+        except TranscriptionError as e:
+            self.log.warning("%s. Using per-chunk transcription.", e)
+
+    def _on_live_transcript(self, media_path, text, is_final):
+        """Writes interim and final live transcript segments into the transcript buffer."""
+        if media_path in self.transcript_buffer:
+            self.transcript_buffer[media_path] = text
+
+    async def _await_live_transcripts(self, window_paths):
+        """Waits (bounded) for the final live transcript of every chunk in the window."""
+        if self.live_transcriber is None:
+            return
+        paths = [path for path in window_paths if path in self.live_transcriber.chunks]
+        texts = await asyncio.gather(*(self.live_transcriber.transcript(path) for path in paths))
+        for path, text in zip(paths, texts):
+            if path in self.transcript_buffer:
+                self.transcript_buffer[path] = text
+
+    async def _summarize_chunk_posture(self, media_path, video_source):
+        """Runs pose detection over one chunk and returns its PostureSummary, or None on failure."""
+        try:
+            with time_stage("posture"):
+                return await self.cpu_pool.summarize_posture(video_source)
         except Exception as e:
-            print(f"WS: Error in process_media_chunk for {media_path}: {e}")
-            traceback.print_exc()
+            self.log.exception("Error summarizing posture for %s: %s", media_path, e)
+            return None
 
-        print(
-            f"WS: process_media_chunk finished (background tasks initiated) for: {media_path} after {time.time() - start_time:.2f} seconds")
-        # This function now returns sooner, allowing the next chunk's processing or analysis trigger to proceed.
+    async def _window_posture_data(self, window_paths):
+        """
+        Merges the PostureSummary of every chunk in the window into analyze_posture-style data.
+        Returns None if no chunk has a summary, so analyze_results falls back to running pose detection.
+        """
+        tasks = [self.posture_summaries[path] for path in window_paths if path in self.posture_summaries]
+        summaries = [summary for summary in await asyncio.gather(*tasks) if summary is not None]
+        if not summaries:
+            return None
+        return PostureSummary.merge_all(summaries).to_posture_data()
 
-    async def _complete_chunk_save_in_background(self, media_path, s3_upload_task, chunk_number):
-        """Awaits S3 upload and then saves the SessionChunk data."""
+    async def _summarize_chunk_prosody(self, media_path, audio_samples):
+        """Runs Praat pitch/intensity analysis over one chunk and returns its ProsodySummary, or None on failure."""
         try:
-            # Wait for S3 upload to complete in its thread
-            s3_url = await s3_upload_task
+            with time_stage("prosody"):
+                return await self.cpu_pool.summarize_prosody(audio_samples)
+        except Exception as e:
+            self.log.exception("Error summarizing prosody for %s: %s", media_path, e)
+            return None
+
+    async def _window_prosody_metrics(self, window_paths):
+        """
+        Merges the ProsodySummary of every chunk in the window into process_audio-style metrics.
+        Returns None if any chunk lacks a summary, so analyze_results falls back to analysing the window audio.
+        """
+        if not all(path in self.prosody_summaries for path in window_paths):
+            return None
+        summaries = await asyncio.gather(*(self.prosody_summaries[path] for path in window_paths))
+        if any(summary is None for summary in summaries):
+            return None
+        # Pace uses each chunk's own transcript word count
+        for path, summary in zip(window_paths, summaries):
+            summary.word_count = len((self.transcript_buffer.get(path) or "").split())
+        return process_prosody(summaries)
 
-            if s3_url:
-                print(f"WS: S3 upload complete for {media_path}. Attempting to save SessionChunk data in background.")
-                # Now call the database save method using the obtained S3 URL and the chunk_number
-                await self._save_chunk_data(media_path, s3_url, chunk_number)
-                # The chunk ID will be added to self.media_path_to_chunk inside _save_chunk_data
+    async def _complete_chunk_save_in_background(self, media_path, spool_entry, chunk_number):
+        """
+        Saves the SessionChunk data for a spooled chunk, then hands the chunk to the S3 uploader.
+        Returns the SessionChunk ID, or None if the chunk could not be saved.
+        """
+        chunk_id = None
+        try:
+            if spool_entry:
+                # The S3 key is known before the upload, so the row is saved straight away as pending
+                chunk_s3_url = s3_url(spool_entry.key)
+                self.log.debug("%s spooled for upload. Attempting to save SessionChunk data in background.", media_path, extra=SAMPLED)
+                chunk_id = await self._save_chunk_data(media_path, chunk_s3_url, chunk_number, upload_status=UPLOAD_PENDING)
+                # Upload even if the save failed, so the chunk still reaches S3 for compilation
+                await asyncio.to_thread(self.uploader.submit, spool_entry, chunk_id)
 
             else:
-                print(f"WS: S3 upload failed for {media_path}. Cannot save SessionChunk data in background.")
+                self.log.warning("Could not spool %s for upload. Cannot save SessionChunk data in background.", media_path)
         except asyncio.CancelledError:
             # Handle task cancellation gracefully during disconnect
-            print(f"WS: Background chunk save task for {media_path} was cancelled.")
+            self.log.info("Background chunk save task for %s was cancelled.", media_path)
         except Exception as e:
-            print(f"WS: Error in background chunk save for {media_path}: {e}")
-            traceback.print_exc()
-        finally:
-            # Clean up the task tracking entry once this task is done (success or failure)
-            if media_path in self.background_chunk_save_tasks:
-                await asyncio.sleep(0.01)
-                if media_path in self.background_chunk_save_tasks:
-                    print(f"WS: ✅ Task for {media_path} finished. Removing from tracking.")
-                    del self.background_chunk_save_tasks[media_path]
-                else:
-                    print(f"WS: ⚠️ Task for {media_path} already removed before cleanup.")
-            else:
-                print(f"WS: ⚠️ Task for {media_path} was not found in tracking dict at cleanup time.")
+            self.log.exception("Error in background chunk save for %s: %s", media_path, e)
+        return chunk_id
 
     async def analyze_windowed_media(self, window_paths, latest_chunk_number):
         """
@@ -448,25 +749,26 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
         last_media_path = window_paths[-1]
         window_chunk_number = latest_chunk_number  # Refers to the number of the last chunk in the window
 
-        print(
-            f"WS: analyze_windowed_media started for window ending with {last_media_path} (chunk {window_chunk_number}) at {start_time}")
+        self.log.debug("analyze_windowed_media started for window ending with %s (chunk %s) at %s", last_media_path, window_chunk_number, start_time, extra=SAMPLED)
 
         # --- Add Logging Here ---
-        print(f"WS: DEBUG: Current media_buffer: {[os.path.basename(p) for p in self.media_buffer]}", flush=True)
-        print(
-            f"WS: DEBUG: Current transcript_buffer keys: {[os.path.basename(k) for k in self.transcript_buffer.keys()]}",
-            flush=True)
-        print(f"WS: DEBUG: Current window_paths: {[os.path.basename(p) for p in window_paths]}", flush=True)
+        # The buffer listings are only built when debug logging is on
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Current media_buffer: %s", [os.path.basename(p) for p in self.media_buffer], extra=SAMPLED)
+            self.log.debug("Current transcript_buffer keys: %s", [os.path.basename(k) for k in self.transcript_buffer.keys()], extra=SAMPLED)
+            self.log.debug("Current window_paths: %s", [os.path.basename(p) for p in window_paths], extra=SAMPLED)
         # --- End Logging ---
 
-        combined_audio_path = None  # Reintroduce combined audio path
+        combined_audio = None  # Decoded PCM samples for the whole window
         combined_transcript_text = ""
         analysis_result = None  # Initialize analysis_result as None
         window_transcripts_list = []  # List to hold individual transcripts for concatenation
 
         try:
             # --- Retrieve Individual Transcripts and Concatenate ---
-            print(f"WS: Retrieving and concatenating transcripts for window ending with chunk {window_chunk_number}")
+            self.log.debug("Retrieving and concatenating transcripts for window ending with chunk %s", window_chunk_number, extra=SAMPLED)
+            await self._await_live_transcripts(window_paths)
+            concat_start_time = time.perf_counter()
             all_transcripts_found = True
             for media_path in window_paths:  # window_paths are the paths for the current window
                 # Retrieve transcript from the buffer using the media_path
@@ -475,111 +777,76 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                 if transcript is not None:  # Check if the value is not None
                     window_transcripts_list.append(transcript)
                     # --- Add Logging for individual transcripts ---
-                    print(f"WS: DEBUG: Transcript for {os.path.basename(media_path)}: '{transcript}'", flush=True)
+                    self.log.debug("Transcript for %s: '%s'", os.path.basename(media_path), transcript, extra=SAMPLED)
                     # --- End Logging ---
                 else:
                     # If any transcript is missing (None) or key not in buffer, log a warning
                     # and add an empty string for concatenation
-                    print(
-                        f"WS: Warning: Transcript not found or was None in buffer for chunk media path: {media_path}. Including empty string.")
+                    self.log.warning("Transcript not found or was None in buffer for chunk media path: %s. Including empty string.", media_path)
                     all_transcripts_found = False
                     window_transcripts_list.append("")
 
             combined_transcript_text = "".join(window_transcripts_list)
-            print(f"WS: Concatenated Transcript for window: '{combined_transcript_text}'")
+            self.log.debug("Concatenated Transcript for window: '%s'", combined_transcript_text, extra=SAMPLED)
 
             if not all_transcripts_found:
-                print(
-                    f"WS: Analysis for window ending with chunk {window_chunk_number} may be incomplete due to missing transcripts.")
+                self.log.warning("Analysis for window ending with chunk %s may be incomplete due to missing transcripts.", window_chunk_number)
 
-            # --- FFmpeg Audio Concatenation (Reintroduced) ---
-            # Filter out None audio paths or paths that don't exist on disk from the audio_buffer
-            required_audio_paths = [self.audio_buffer.get(media_path) for media_path in window_paths]
-            valid_audio_paths = [path for path in required_audio_paths if path is not None and os.path.exists(path)]
+            # --- Window Audio (zero-copy slice of the rolling PCM buffer) ---
+            # The view stays valid even if older chunks are evicted while the analysis runs
+            combined_audio = self.pcm_buffer.window(window_paths)
+            observe_stage("window_concat", time.perf_counter() - concat_start_time)
 
-            # We only need ANALYSIS_WINDOW_SIZE valid audio paths for concatenation
-            # Only concatenate audio if we have valid paths AND if AI questions are enabled
-            # or if any other analysis requires the combined audio.
             # Assuming combined audio is needed for analyze_results regardless of questions:
-            if len(valid_audio_paths) == ANALYSIS_WINDOW_SIZE:
-                print(f"WS: Valid audio paths for concatenation: {valid_audio_paths}")
-
-                combined_audio_path = os.path.join(TEMP_MEDIA_ROOT,
-                                                   f"{self.session_id}_window_{window_chunk_number}.mp3")
-                concat_command = ["ffmpeg", "-y"]
-                for audio_path in valid_audio_paths:
-                    concat_command.extend(["-i", audio_path])
-                # Added -nostats -loglevel 0 to reduce FFmpeg output noise
-                concat_command.extend(
-                    ["-filter_complex", f"concat=n={len(valid_audio_paths)}:a=1:v=0", "-acodec", "libmp3lame", "-b:a",
-                     "128k", "-nostats", "-loglevel", "0", combined_audio_path])
-
-                print(f"WS: Running FFmpeg audio concatenation command: {' '.join(concat_command)}")
-                process = subprocess.Popen(concat_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = await asyncio.to_thread(process.communicate)  # Run blocking communicate in a thread
-                returncode = await asyncio.to_thread(lambda p: p.returncode, process)  # Get return code in thread
-
-                if returncode != 0:
-                    error_output = stderr.decode()
-                    print(
-                        f"WS: FFmpeg audio concatenation error (code {returncode}) for window ending with chunk {window_chunk_number}: {error_output}")
-                    print(f"WS: FFmpeg stdout: {stdout.decode()}")
-                    combined_audio_path = None  # Ensure combined_audio_path is None on failure
-                else:
-                    print(f"WS: Audio files concatenated to: {combined_audio_path}")
-                    # combined_audio_path is set here if successful
-
+            if combined_audio is not None:
+                self.log.debug("Window audio ready: %s samples from %s chunks", combined_audio.size, len(window_paths), extra=SAMPLED)
             else:
-                print(
-                    f"WS: Audio not found for all {ANALYSIS_WINDOW_SIZE} chunks in window ending with chunk {latest_chunk_number}. Ready audio paths: {len(valid_audio_paths)}/{ANALYSIS_WINDOW_SIZE}. Skipping audio concatenation for this window instance.")
-                combined_audio_path = None  # Ensure combined_audio_path is None if not all audio paths are valid
+                self.log.warning("Audio not found for all %s chunks in window ending with chunk %s. Skipping audio analysis for this window instance.", ANALYSIS_WINDOW_SIZE, latest_chunk_number)
 
             # --- Analyze results using OpenAI (blocking network I/O) ---
             # Proceed with analysis if there is a non-empty concatenated transcript and the client is initialized
-            # AND combined_audio_path is available (mimicking old working behavior)
+            # AND combined_audio is available (mimicking old working behavior)
             # We will get the analysis result if possible, regardless of whether the chunk save is complete yet.
             # Analysis should still run even if AI questions are disabled, as it provides other feedback.
-            if combined_transcript_text.strip() and client and combined_audio_path and os.path.exists(
-                    combined_audio_path):
-                print(f"WS: Running analyze_results for combined transcript and audio.")
+            if combined_transcript_text.strip() and client and combined_audio is not None:
+                self.log.debug("Running analyze_results for combined transcript and audio.", extra=SAMPLED)
                 analysis_start_time = time.time()
                 try:
-                    # Using asyncio.to_thread for blocking OpenAI/Analysis call
-                    # Pass the combined_transcript_text, video_path of the first chunk, and the combined_audio_path
-                    # This replicates the call signature from the working version
-                    analysis_result = await asyncio.to_thread(analyze_results, combined_transcript_text,
-                                                              window_paths[0], combined_audio_path)
-                    print(
-                        f"WS: Analysis Result: {analysis_result} after {time.time() - analysis_start_time:.2f} seconds")
+                    # The OpenAI request is awaited on the shared async client rather than in a thread
+                    # Merge the per-chunk posture summaries so the posture data covers the whole window
+                    window_posture_data = await self._window_posture_data(window_paths)
+                    # Likewise merge the per-chunk prosody summaries instead of re-running Praat on the window
+                    window_metrics = await self._window_prosody_metrics(window_paths)
+                    # Pass the combined_transcript_text, video_path of the first chunk and the combined_audio samples
+                    # (each only used if the merged posture data / metrics are unavailable)
+                    analysis_result = await analyze_results_async(combined_transcript_text, window_paths[0],
+                                                                  combined_audio, window_posture_data, window_metrics)
+                    self.log.debug("Analysis Result: %s after %.2f seconds", analysis_result, time.time() - analysis_start_time, extra=SAMPLED)
 
                     # Check if the result is a dictionary and contains an error (as implemented previously for robustness)
                     if analysis_result is None or (isinstance(analysis_result, dict) and 'error' in analysis_result):
                         error_message = analysis_result.get('error') if isinstance(analysis_result,
                                                                                    dict) else 'Unknown analysis error (result is None)'
-                        print(f"WS: Analysis returned an error structure: {error_message}")
+                        self.log.error("Analysis returned an error structure: %s", error_message)
                         # analysis_result variable already holds the error dictionary or None
 
                 except Exception as analysis_error:
-                    print(
-                        f"WS: Error during analysis (analyze_results) for window ending with chunk {window_chunk_number}: {analysis_error}")
-                    traceback.print_exc()  # Print traceback for analysis errors
+                    self.log.exception("Error during analysis (analyze_results) for window ending with chunk %s: %s", window_chunk_number, analysis_error)
                     # Structure the error result consistently as a dictionary with an error key
                     analysis_result = {'error': str(analysis_error), 'Feedback': {}, 'Posture': {},
                                        'Scores': {}}  # Provide empty nested dicts for serializer safety
 
 
             elif combined_transcript_text.strip() and client:
-                # Scenario where transcript exists and client is ready, but combined_audio_path is missing/failed
-                print(
-                    "WS: Skipping analysis: Combined audio path is missing or failed despite transcript being available.")
+                # Scenario where transcript exists and client is ready, but combined_audio is missing/failed
+                self.log.warning("Skipping analysis: Combined audio is missing or failed despite transcript being available.")
                 # analysis_result remains None
             elif combined_transcript_text.strip():
                 # Scenario where transcript exists, but client is not initialized
-                print("WS: OpenAI client not initialized. Skipping analysis despite having concatenated transcript.")
+                self.log.info("OpenAI client not initialized. Skipping analysis despite having concatenated transcript.")
                 # analysis_result remains None
             else:
-                print(
-                    f"WS: Concatenated transcript is empty or only whitespace for window ending with chunk {window_chunk_number}. Skipping analysis.")
+                self.log.debug("Concatenated transcript is empty or only whitespace for window ending with chunk %s. Skipping analysis.", window_chunk_number, extra=SAMPLED)
                 # analysis_result remains None
 
             # --- Sending updates to the frontend (happens regardless of analysis save status) ---
@@ -607,42 +874,40 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                         region_name = os.environ.get('AWS_S3_REGION_NAME', os.environ.get('AWS_REGION', 'us-east-1'))
                         emotion_s3_url = f"https://{BUCKET_NAME}.s3.{region_name}.amazonaws.com/{EMOTION_STATIC_FOLDER}/{self.room_name}/{lowercase_emotion}/{selected_variation}.mp4"
 
-                        print(
-                            f"WS: Sending window emotion update: {audience_emotion}, URL: {emotion_s3_url} (Room: {self.room_name}, Variation: {selected_variation})")
+                        self.log.debug("Sending window emotion update: %s, URL: %s (Room: %s, Variation: %s)", audience_emotion, emotion_s3_url, self.room_name, selected_variation, extra=SAMPLED)
                         await self.send(json.dumps({
                             "type": "window_emotion_update",
                             "emotion": audience_emotion,
                             "emotion_s3_url": emotion_s3_url
                         }))
                     except Exception as e:
-                        print(f"WS: Error constructing or sending emotion URL for emotion '{audience_emotion}': {e}")
-                        traceback.print_exc()
+                        self.log.exception("Error constructing or sending emotion URL for emotion '%s': %s", audience_emotion, e)
 
                 elif audience_emotion:
-                    print(
-                        "WS: Audience emotion detected but S3 client not configured or room_name is missing, cannot send static video URL.")
+                    self.log.warning("Audience emotion detected but S3 client not configured or room_name is missing, cannot send static video URL.")
                 else:
                     # This will also print if analysis_result didn't have a 'Feedback'/'Audience Emotion' structure or if audience_emotion was None/empty
-                    print(
-                        "WS: No audience emotion detected or analysis structure unexpected. Cannot send static video URL.")
+                    self.log.debug("No audience emotion detected or analysis structure unexpected. Cannot send static video URL.", extra=SAMPLED)
 
-                print(
-                    f"WS: Sending full analysis update to frontend for window ending with chunk {window_chunk_number}: {serializable_analysis_result}")
+                self.log.debug("Sending full analysis update to frontend for window ending with chunk %s: %s", window_chunk_number, serializable_analysis_result, extra=SAMPLED)
                 await self.send(json.dumps({
                     "type": "full_analysis_update",
                     "analysis": serializable_analysis_result
                 }))
+                last_chunk_received_at = self.chunk_received_at.get(last_media_path)
+                if last_chunk_received_at is not None:
+                    CHUNK_TO_FEEDBACK_SECONDS.observe(time.time() - last_chunk_received_at)
 
                 # --- Trigger AI Audience Question Generation ---
                 # Increment the analysis window counter
-                self.analysis_window_counter += 1
-                print(f"WS: Analysis window count: {self.analysis_window_counter}")
+                self.analysis_window_counter = await self._increment_session_state("analysis_window_counter",
+                                                                                   self.analysis_window_counter)
+                self.log.debug("Analysis window count: %s", self.analysis_window_counter, extra=SAMPLED)
 
                 # Check if it's time to generate a question based on the interval
                 # AND if AI questions are enabled for this session
                 if self.ai_questions_enabled and self.analysis_window_counter % QUESTION_INTERVAL_WINDOWS == 0:
-                    print(
-                        f"WS: AI questions are ENABLED. Generating AI Audience Question for window ending with chunk {window_chunk_number}")
+                    self.log.info("AI questions are ENABLED. Generating AI Audience Question for window ending with chunk %s", window_chunk_number)
                     # Use asyncio.create_task to run the question generation in the background
                     # Pass the concatenated transcript to the function
                     asyncio.create_task(self.generate_and_send_question(combined_transcript_text))
@@ -650,217 +915,155 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                     # self.analysis_window_counter = 0 # Uncomment this if you want intervals based on *since last question*
 
                 elif not self.ai_questions_enabled:
-                    print(
-                        f"WS: AI questions are DISABLED. Skipping AI Audience Question generation for window ending with chunk {window_chunk_number}")
+                    self.log.debug("AI questions are DISABLED. Skipping AI Audience Question generation for window ending with chunk %s", window_chunk_number, extra=SAMPLED)
                 else:
-                    print(
-                        f"WS: AI questions are ENABLED but not time for a question yet (window {self.analysis_window_counter}). Skipping AI Audience Question generation.")
-
-                # --- Wait for the background chunk save task for the LAST chunk in the window ---
-                # before attempting to save the window analysis results to the database.
-                last_chunk_save_task = None
-                wait_start_time = time.time()
-                wait_timeout = 30.0  # Increased timeout to wait for the task to appear/complete
-                max_retries = 3  # Maximum number of retries to find the task
-                retry_count = 0
-
-                while (time.time() - wait_start_time) < wait_timeout and retry_count < max_retries:
-                    last_chunk_save_task = self.background_chunk_save_tasks.get(last_media_path)
-                    if last_chunk_save_task:
-                        print(f"WS: Background save task found for {last_media_path}. Waiting for it to complete...")
-                        try:
-                            # Wait for the specific task to finish (with the remaining timeout)
-                            await asyncio.wait_for(last_chunk_save_task,
-                                                   timeout=wait_timeout - (time.time() - wait_start_time))
-                            print(
-                                f"WS: Background save task for {last_media_path} completed. Proceeding to save window analysis.")
-
-                            # --- Initiate Saving Analysis data in the BACKGROUND ---
-                            # Only create the analysis save task if the chunk save completed
-                            print(
-                                f"WS: Initiating saving window analysis for chunk {window_chunk_number} in background.")
-                            # Create a task to save the analysis result
-                            # Pass the original analysis_result here, as the saving function might expect it
-                            asyncio.create_task(
-                                self._save_window_analysis(last_media_path, analysis_result, combined_transcript_text,
-                                                           window_chunk_number))
-
-                        except asyncio.TimeoutError:
-                            print(
-                                f"WS: Timeout waiting for background save task for {last_media_path} to complete. Cannot save window analysis for chunk {window_chunk_number}.")
-                        except Exception as task_error:
-                            # This handles exceptions within the chunk save task itself if return_exceptions=True was used (it's not, but good practice)
-                            print(
-                                f"WS: Background save task for {last_media_path} failed with error: {task_error}. Cannot save window analysis.")
-
-                        break  # Exit the while loop once the task is found and processed
-
-                    # If task not found, wait a bit and retry
-                    await asyncio.sleep(0.5)  # Increased sleep time between retries
-                    retry_count += 1
-                    print(f"WS: Retry {retry_count}/{max_retries} - waiting for background task of {last_media_path}")
-                    print(
-                        f"WS: Current keys in self.background_chunk_save_tasks: {list(self.background_chunk_save_tasks.keys())}")
-                    print(f"WS: Current keys in self.media_path_to_chunk: {list(self.media_path_to_chunk.keys())}")
-
-                # If the loop finished without finding/waiting for the task, check if the chunk ID is in the map and try to save analysis
-                if not last_chunk_save_task:
-                    if last_media_path in self.media_path_to_chunk:
-                        print(
-                            f"WS: ⚠️ Background save task missing, but chunk ID found for {last_media_path}. Proceeding to save window analysis.")
-                        asyncio.create_task(
-                            self._save_window_analysis(last_media_path, analysis_result, combined_transcript_text,
-                                                       window_chunk_number))
-                    else:
-                        print(
-                            f"WS: ❌ Background save task for the last chunk ({last_media_path}) in the window was not found within timeout AND no chunk ID. Cannot save window analysis.")
-                        print(
-                            f"WS: DEBUG: Current background_chunk_save_tasks keys: {list(self.background_chunk_save_tasks.keys())}")
-                        print(f"WS: DEBUG: Current media_path_to_chunk keys: {list(self.media_path_to_chunk.keys())}")
+                    self.log.debug("AI questions are ENABLED but not time for a question yet (window %s). Skipping AI Audience Question generation.", self.analysis_window_counter, extra=SAMPLED)
 
+                # --- Wait for the save of the LAST chunk in the window ---
+                # before saving the window analysis results against its SessionChunk row.
+                # Usually resolved long before the analysis finishes.
+                try:
+                    last_chunk_id = await self.chunk_ids.wait(last_media_path, timeout=CHUNK_SAVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    last_chunk_id = None
+                    self.log.warning("Timeout waiting for the save of %s. Cannot save window analysis for chunk %s.", last_media_path, window_chunk_number)
+                if last_chunk_id:
+                    self.log.debug("Initiating saving window analysis for chunk %s in background.", window_chunk_number, extra=SAMPLED)
+                    asyncio.create_task(
+                        self._save_window_analysis(last_media_path, analysis_result, combined_transcript_text,
+                                                   window_chunk_number, session_chunk_id=last_chunk_id))
+                elif last_media_path not in self.chunk_ids:
+                    self.log.error("❌ No chunk save registered for the last chunk (%s) in the window. Cannot save window analysis.", last_media_path)
+                else:
+                    self.log.error("❌ The last chunk (%s) in the window was not saved. Cannot save window analysis.", last_media_path)
 
             else:
-                print(
-                    f"WS: No analysis result obtained for window ending with chunk {window_chunk_number}. Skipping analysis save and sending updates.")
+                self.log.warning("No analysis result obtained for window ending with chunk %s. Skipping analysis save and sending updates.", window_chunk_number)
 
         except Exception as e:  # Catch any exceptions during the analyze_windowed_media process itself (excluding analyze_results internal errors already caught)
-            print(f"WS: Error during windowed media analysis ending with chunk {window_chunk_number}: {e}")
-            traceback.print_exc()  # Print traceback for general analyze_windowed_media errors
+            self.log.exception("Error during windowed media analysis ending with chunk %s: %s", window_chunk_number, e)
         finally:
-            # Clean up the temporary combined audio file if it was created
-            # This cleanup happens regardless of whether the analysis or save succeeded.
-            if combined_audio_path and os.path.exists(combined_audio_path):
-                try:
-                    # Add a small delay before removing
-                    await asyncio.sleep(0.05)
-                    os.remove(combined_audio_path)
-                    print(f"WS: Removed temporary combined audio file: {combined_audio_path}")
-                except Exception as e:
-                    print(f"WS: Error removing temporary combined audio file {combined_audio_path}: {e}")
-
             # Clean up the oldest chunk from the buffers after an analysis attempt for a window finishes.
             # This happens if the media_buffer has reached or exceeded the window size
             # We only want to remove *one* oldest chunk per analysis trigger
             # The condition `len(self.media_buffer) >= ANALYSIS_WINDOW_SIZE` ensures we maintain a buffer of ANALYSIS_WINDOW_SIZE
             # Corrected condition back to >= ANALYSIS_WINDOW_SIZE to match original logic and ensure cleanup happens
-            while len(self.media_buffer) >= ANALYSIS_WINDOW_SIZE:
-                print(f"WS: Cleaning up oldest chunk after analysis. Current buffer size: {len(self.media_buffer)}")
+            # Chunks still needed by a running or waiting window are kept until that window has run
+            protected_paths = self.window_scheduler.protected_paths(window_paths)
+            # Chunks the analyze stage has not reached yet (and the ones before them their windows need) are kept too
+            while (self._chunks_through_analysis() >= ANALYSIS_WINDOW_SIZE
+                   and self.media_buffer[0] not in protected_paths):
+                self.log.debug("Cleaning up oldest chunk after analysis. Current buffer size: %s", len(self.media_buffer), extra=SAMPLED)
                 try:
                     # Get the oldest media path from the buffer *without* removing it yet
                     oldest_media_path = self.media_buffer[0]
-                    print(f"WS: Considering cleanup for oldest media chunk {oldest_media_path}...")
-
-                    # --- Wait for the background chunk save task for this specific oldest chunk to complete ---
-                    # This ensures the S3 upload and initial DB save for the chunk being removed from the buffer are done.
-                    # This is distinct from waiting for the *last* chunk's save task for analysis saving.
-                    save_task = self.background_chunk_save_tasks.get(oldest_media_path)
-
-                    if save_task:
-                        print(
-                            f"WS: Waiting for background save task for oldest chunk ({oldest_media_path}) to complete before cleaning up...")
-                        try:
-                            # Wait for the specific task to finish (with a reasonable timeout)
-                            await asyncio.wait_for(save_task, timeout=90.0)  # Use a reasonable timeout
-                            print(
-                                f"WS: Background save task for oldest chunk ({oldest_media_path}) completed. Proceeding with cleanup.")
-
-                        except asyncio.TimeoutError:
-                            print(
-                                f"WS: Timeout waiting for background save task for oldest chunk ({oldest_media_path}). Skipping cleanup of this chunk for now.")
-                            # Skip cleanup for this specific chunk in this iteration; it might be cleaned up later or on disconnect
-                            # Break the while loop to avoid blocking further cleanup attempts for other chunks that might be ready
-                            break  # Exit the while loop after a cleanup attempt (successful or timed out)
-
-                        except Exception as task_error:
-                            # This handles exceptions within the background save task itself
-                            print(
-                                f"WS: Background save task for oldest chunk ({oldest_media_path}) failed with error: {task_error}. Proceeding with cleanup as task is done.")
-                            # The task failed but is finished. We can proceed with cleanup.
-
+                    self.log.debug("Considering cleanup for oldest media chunk %s...", oldest_media_path, extra=SAMPLED)
 
-                    else:
-                        # This case might happen if cleanup runs significantly later and the task finished/failed and removed itself from tracking,
-                        # or if process_media_chunk had an error before starting the task.
-                        print(
-                            f"WS: No background save task found for oldest chunk ({oldest_media_path}). Assuming it finished or wasn't started. Proceeding with cleanup.")
-                        # We proceed with cleanup cautiously.
+                    # --- Wait for the save of this oldest chunk to complete ---
+                    # This ensures the initial DB save for the chunk being removed from the buffer is done
+                    # (returns at once if it already is, or if the chunk was dropped by the pipeline).
+                    try:
+                        await self.chunk_ids.wait(oldest_media_path, timeout=CHUNK_SAVE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        self.log.warning("Timeout waiting for the save of oldest chunk (%s). Skipping cleanup of this chunk for now.", oldest_media_path)
+                        # Skip cleanup for this chunk; it is cleaned up by a later window or on disconnect
+                        break
 
                     # --- If we reached here, either the task completed, failed, or didn't exist. Proceed with cleanup ---
                     # Now pop the oldest media path from the buffer as the save is considered complete/dealt with
                     # Check if the oldest media path is still in the buffer before popping
                     if self.media_buffer and self.media_buffer[0] == oldest_media_path:
                         oldest_media_path_to_clean = self.media_buffer.pop(0)  # Pop it now
-                        print(f"WS: Popped oldest media chunk {oldest_media_path_to_clean} from buffer for cleanup.")
+                        self.log.debug("Popped oldest media chunk %s from buffer for cleanup.", oldest_media_path_to_clean, extra=SAMPLED)
 
                         # Remove associated entries from other buffers and maps
-                        oldest_audio_path = self.audio_buffer.pop(oldest_media_path_to_clean, None)
+                        self.pcm_buffer.evict(oldest_media_path_to_clean)
+                        self.posture_summaries.pop(oldest_media_path_to_clean, None)
+                        self.chunk_received_at.pop(oldest_media_path_to_clean, None)
+                        self.prosody_summaries.pop(oldest_media_path_to_clean, None)
                         oldest_transcript = self.transcript_buffer.pop(oldest_media_path_to_clean, None)
-                        oldest_chunk_id = self.media_path_to_chunk.pop(oldest_media_path_to_clean, None)
-                        # The background_chunk_save_tasks entry for this path is removed within _complete_chunk_save_in_background's finally block.
+                        if self.live_transcriber is not None:
+                            self.live_transcriber.forget(oldest_media_path_to_clean)
+                        oldest_chunk_id = self.chunk_ids.get(oldest_media_path_to_clean)
+                        self.chunk_ids.forget(oldest_media_path_to_clean)
 
                         # Clean up the temporary files associated with this oldest chunk
-                        files_to_remove = [oldest_media_path_to_clean, oldest_audio_path]
+                        files_to_remove = [oldest_media_path_to_clean]
                         for file_path in files_to_remove:
                             if file_path and os.path.exists(file_path):
                                 try:
-                                    await asyncio.sleep(0.05)  # Small delay before removing
                                     os.remove(file_path)
-                                    print(f"WS: Removed temporary file: {file_path}")
+                                    self.log.debug("Removed temporary file: %s", file_path, extra=SAMPLED)
                                 except Exception as e:
-                                    print(f"WS: Error removing temporary file {file_path}: {e}")
+                                    self.log.error("Error removing temporary file %s: %s", file_path, e)
                             elif file_path:
-                                print(f"WS: File path {file_path} was associated but not found on disk during cleanup.")
+                                self.log.debug("File path %s was associated but not found on disk during cleanup.", file_path, extra=SAMPLED)
 
                         if oldest_transcript is not None:
-                            print(
-                                f"WS: Removed transcript from buffer for oldest media path: {oldest_media_path_to_clean}")
+                            self.log.debug("Removed transcript from buffer for oldest media path: %s", oldest_media_path_to_clean, extra=SAMPLED)
                         else:
-                            print(
-                                f"WS: No transcript found in buffer for oldest media path {oldest_media_path_to_clean} during cleanup.")
+                            self.log.debug("No transcript found in buffer for oldest media path %s during cleanup.", oldest_media_path_to_clean, extra=SAMPLED)
 
                         if oldest_chunk_id is not None:
-                            print(
-                                f"WS: Removed chunk ID mapping from buffer for oldest media path: {oldest_media_path_to_clean}")
+                            self.log.debug("Removed chunk ID mapping from buffer for oldest media path: %s", oldest_media_path_to_clean, extra=SAMPLED)
                         else:
-                            print(
-                                f"WS: No chunk ID mapping found in buffer for oldest media path {oldest_media_path_to_clean} during cleanup.")
+                            self.log.debug("No chunk ID mapping found in buffer for oldest media path %s during cleanup.", oldest_media_path_to_clean, extra=SAMPLED)
 
                     else:
-                        print(
-                            f"WS: Oldest media path in buffer ({self.media_buffer[0] if self.media_buffer else 'None'}) is not the one considered for cleanup ({oldest_media_path}). Skipping cleanup loop iteration.")
+                        self.log.debug("Oldest media path in buffer (%s) is not the one considered for cleanup (%s). Skipping cleanup loop iteration.", self.media_buffer[0] if self.media_buffer else 'None', oldest_media_path, extra=SAMPLED)
                         # This might happen in complex async scenarios if the buffer changes unexpectedly.
                         break  # Exit the while loop to prevent infinite loops
 
                 except IndexError:
                     # Should not happen with the while condition, but good practice
-                    print("WS: media_buffer was unexpectedly empty during cleanup in analyze_windowed_media finally.")
+                    self.log.warning("media_buffer was unexpectedly empty during cleanup in analyze_windowed_media finally.")
                     break  # Exit the while loop if buffer is empty
                 except Exception as cleanup_error:
-                    print(f"WS: Error during cleanup of oldest chunk in analyze_windowed_media: {cleanup_error}")
-                    traceback.print_exc()
+                    self.log.exception("Error during cleanup of oldest chunk in analyze_windowed_media: %s", cleanup_error)
                     break  # Exit the while loop on general cleanup error
-                # The while loop condition `len(self.media_buffer) >= ANALYSIS_WINDOW_SIZE`
+                # The while loop condition (chunks through analysis >= ANALYSIS_WINDOW_SIZE)
                 # will continue cleaning up the next oldest chunk if the buffer is still too large.
 
-        print(
-            f"WS: analyze_windowed_media finished (instance) for window ending with chunk {window_chunk_number} after {time.time() - start_time:.2f} seconds")
+        self.log.debug("analyze_windowed_media finished (instance) for window ending with chunk %s after %.2f seconds", window_chunk_number, time.time() - start_time, extra=SAMPLED)
+
+    def _chunks_through_analysis(self):
+        """Number of buffered chunks up to and including the newest one the analyze stage has passed."""
+        if self.last_analyzed_path not in self.media_buffer:
+            return 0
+        return self.media_buffer.index(self.last_analyzed_path) + 1
+
+    async def _report_window_lag(self, report):
+        """Tells the client how far behind the live audio its feedback is (see WindowScheduler)."""
+        self.log.info("Window ending with chunk %s analysed %.2fs after it was submitted (queued %.2fs, %s stale windows skipped so far)", report.chunk_number, report.lag, report.queued, report.skipped)
+        try:
+            await self.send(json.dumps({
+                "type": "analysis_lag",
+                "chunk_number": report.chunk_number,
+                "lag_seconds": round(report.lag, 2),
+                "queued_seconds": round(report.queued, 2),
+                "skipped_windows": report.skipped,
+                "windows_in_flight": report.in_flight,
+                # Chunks waiting in each pipeline stage
+                "queue_depths": {name: stage["depth"] for name, stage in self.pipeline.metrics().items()}
+                if self.pipeline is not None else {},
+            }))
+        except Exception as send_error:
+            self.log.error("Error sending analysis lag to frontend: %s", send_error)
 
     # NEW METHOD: Generates and sends an AI audience question
     async def generate_and_send_question(self, transcript):
         """Generates an AI audience question based on the transcript and sends it to the frontend."""
         # Added check for self.ai_questions_enabled
         if not self.ai_questions_enabled or not transcript or not client:
-            print(
-                "WS: Skipping AI audience question generation: Feature disabled, transcript is empty, or OpenAI client not initialized.")
+            self.log.debug("Skipping AI audience question generation: Feature disabled, transcript is empty, or OpenAI client not initialized.", extra=SAMPLED)
             return
 
-        print("WS: Calling ai_audience_question...")
+        self.log.debug("Calling ai_audience_question...")
         try:
-            # Call the synchronous ai_audience_question function in a thread
-            question = await asyncio.to_thread(ai_audience_question, transcript)
+            question = await ai_audience_question_async(transcript)
 
             if question:
-                print(f"WS: Generated AI audience question: {question}")
+                self.log.info("Generated AI audience question: %s", question)
                 # Send the question to the frontend via WebSocket
                 # Wrap in try/except in case the connection is closed
                 try:
@@ -868,297 +1071,110 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
                         "type": "audience_question",
                         "question": question
                     }))
-                    print("WS: Sent AI audience question to frontend.")
+                    self.log.info("Sent AI audience question to frontend.")
                 except Exception as send_error:
-                    print(f"WS: Error sending AI audience question to frontend: {send_error}")
+                    self.log.error("Error sending AI audience question to frontend: %s", send_error)
             else:
-                print("WS: AI audience question function returned None.")
+                self.log.info("AI audience question function returned None.")
 
         except Exception as e:
-            print(f"WS: Error generating or sending AI audience question: {e}")
-            traceback.print_exc()
+            self.log.exception("Error generating or sending AI audience question: %s", e)
 
-    def extract_audio(self, media_path):
-        """Extracts audio from a media file using FFmpeg. This is a synchronous operation."""
+    def extract_audio(self, media_bytes):
+        """
+        Decodes one media chunk to mono float32 PCM plus sampled video frames. This is a synchronous operation.
+        Chunks are fed to the session's StreamingDecoder so the WebM stream is parsed and decoded exactly once.
+        If that decoder is unavailable (e.g. a client sending standalone files), the chunk's audio is decoded
+        on its own. Returns (samples, frames); frames is None when only audio could be decoded.
+        """
         start_time = time.time()
-        base, _ = os.path.splitext(media_path)
-        audio_mp3_path = f"{base}.mp3"
-        # Use list format for command for better security and compatibility
-        # Added -nostats -loglevel 0 to reduce FFmpeg output noise
-        ffmpeg_command = ["ffmpeg", "-y", "-i", media_path, "-vn", "-acodec", "libmp3lame", "-ab", "128k", "-nostats",
-                          "-loglevel", "0", audio_mp3_path]
-        print(f"WS: Running FFmpeg command: {' '.join(ffmpeg_command)}")
         try:
-            # subprocess.Popen and communicate() are blocking calls
-            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = process.communicate()
-            returncode = process.returncode
-            if returncode == 0:
-                print(f"WS: Audio extracted to: {audio_mp3_path} after {time.time() - start_time:.2f} seconds")
-                # Verify file exists and has non-zero size
-                if os.path.exists(audio_mp3_path) and os.path.getsize(audio_mp3_path) > 0:
-                    return audio_mp3_path
-                else:
-                    print(f"WS: Extracted audio file is missing or empty: {audio_mp3_path}")
-                    return None
-
-            else:
-                error_output = stderr.decode()
-                print(f"WS: FFmpeg audio extraction error (code {returncode}): {error_output}")
-                print(f"WS: FFmpeg stdout: {stdout.decode()}")
-                # Clean up potentially created empty/partial file
-                if os.path.exists(audio_mp3_path):
-                    try:
-                        os.remove(audio_mp3_path)
-                        print(f"WS: Removed incomplete audio file after FFmpeg error: {audio_mp3_path}")
-                    except Exception as e:
-                        print(f"WS: Error removing incomplete audio file {audio_mp3_path}: {e}")
-                return None
-        except FileNotFoundError:
-            print(f"WS: FFmpeg command not found. Is FFmpeg installed and in your PATH?")
-            return None
+            if self.stream_decoder is not None and not self.stream_decoder.failed:
+                try:
+                    decoded = self.stream_decoder.feed(media_bytes)
+                    self.log.debug("Chunk decoded by stream decoder (%s samples, %s frames) after %.2f seconds", decoded.audio.size, len(decoded.frames), time.time() - start_time, extra=SAMPLED)
+                    return decoded.audio, decoded.frames
+                except AudioDecodeError as e:
+                    self.log.warning("Stream decoder unavailable (%s). Decoding chunk standalone.", e)
+
+            samples = decode_audio(media_bytes)
+            self.log.debug("Audio decoded (%s samples) after %.2f seconds", samples.size, time.time() - start_time, extra=SAMPLED)
+            return samples, None
+        except AudioDecodeError as e:
+            self.log.error("Audio decoding error: %s", e)
+            return None, None
         except Exception as e:
-            print(f"WS: Error running FFmpeg for audio extraction: {e}")
-            traceback.print_exc()
-            return None
+            self.log.exception("Error decoding audio in-process: %s", e)
+            return None, None
 
-    def upload_to_s3(self, file_path):
-        """Uploads a local file to S3. This is a synchronous operation."""
-        if s3 is None:
-             print(f"WS: S3 client is not initialized. Cannot upload file: {file_path}.")
-             return None
+    def spool_for_upload(self, file_path):
+        """
+        Places a chunk in the S3 upload spool. Returns its SpoolEntry, or None if it could not be spooled.
+        This is a synchronous operation; the upload happens once the entry is submitted to the uploader.
+        """
+        if self.uploader is None:
+            self.log.error("S3 uploader is not initialized. Cannot upload file: %s.", file_path)
+            return None
         # Ensure user_id is available before attempting upload
         if not self.user_id:
-            print(f"WS: Error: User ID not available. Cannot upload file {file_path} to S3 with user structure.")
+            self.log.error("User ID not available. Cannot upload file %s to S3 with user structure.", file_path)
             return None
-
-
-        start_time = time.time()
-        file_name = os.path.basename(file_path)
-        # Updated folder structure: BASE_FOLDER/user_id/session_id/file_name
-        folder_path = f"{BASE_FOLDER}{self.user_id}/{self.session_id}/"
-        s3_key = f"{folder_path}{file_name}"
         try:
-            # s3.upload_file is a blocking call
-            s3.upload_file(file_path, BUCKET_NAME, s3_key)
-            # Construct S3 URL - using regional endpoint format
-            region_name = os.environ.get('AWS_S3_REGION_NAME', os.environ.get('AWS_REGION', 'us-east-1'))
-            s3_url = f"https://{BUCKET_NAME}.s3.{region_name}.amazonaws.com/{s3_key}"
-            print(
-                f"WS: Uploaded {file_path} to S3 successfully. S3 URL: {s3_url} after {time.time() - start_time:.2f} seconds.")
-            return s3_url
+            return self.uploader.spool(file_path, BUCKET_NAME, session_s3_key(self.user_id, self.session_id, os.path.basename(file_path)))
         except Exception as e:
-            print(f"WS: S3 upload failed for {file_path}: {e}")
-            traceback.print_exc()
+            self.log.warning("Could not spool %s for S3 upload: %s", file_path, e, exc_info=True)
             return None
 
-    # Decorate with database_sync_to_async to run this synchronous DB method in a thread
-    @database_sync_to_async
-    def _save_chunk_data(self, media_path, s3_url, chunk_number):
-        """Saves the SessionChunk object and maps media path to chunk ID."""
+    async def _save_chunk_data(self, media_path, s3_url, chunk_number, upload_status="uploaded"):
+        """Saves the SessionChunk row through the session writer and maps media path to chunk ID."""
         start_time = time.time()
-        print(
-            f"WS: _save_chunk_data called for chunk at {media_path} with S3 URL {s3_url} (chunk number: {chunk_number}) at {start_time}")
-        if not self.session_id:
-            print("WS: Error: Session ID not available, cannot save chunk data.")
-            # Returning None explicitly for clarity with async decorator
+        if self.session_writer is None:
+            self.log.error("Session writer not available, cannot save chunk data.")
             return None
 
         if not s3_url:
-            print(f"WS: Error: S3 URL not provided for {media_path}. Cannot save SessionChunk.")
-            return None  # Returning None explicitly
+            self.log.error("S3 URL not provided for %s. Cannot save SessionChunk.", media_path)
+            return None
 
         try:
-            # Synchronous DB call: Get the session
-            # Because this method is decorated, this runs in a sync context/thread
-            print(f"WS: Attempting to get PracticeSession with id: {self.session_id}")
-            try:
-                session = PracticeSession.objects.get(id=self.session_id)
-                print(f"WS: Retrieved PracticeSession: {session.id}, {session.session_name}")
-            except PracticeSession.DoesNotExist:
-                print(f"WS: Error: PracticeSession with id {self.session_id} not found. Cannot save chunk data.")
-                return None  # Returning None explicitly
-
-            print(f"WS: S3 URL for SessionChunk: {s3_url}")
-            session_chunk_data = {
-                'session': session.id,  # Link to the session using its ID
-                'chunk_number': chunk_number,  # Include the chunk number here
-                'video_file': s3_url  # Use the passed S3 URL
-            }
-            print(f"WS: SessionChunk data: {session_chunk_data}")
-            session_chunk_serializer = SessionChunkSerializer(data=session_chunk_data)
-
-            if session_chunk_serializer.is_valid():
-                print("WS: SessionChunkSerializer is valid.")
-                try:
-                    # Synchronous DB call: Save the SessionChunk
-                    session_chunk = session_chunk_serializer.save()
-                    print(
-                        f"WS: SessionChunk saved with ID: {session_chunk.id} for media path: {media_path} after {time.time() - start_time:.2f} seconds")
-                    # Store the mapping from temporary media path to the saved chunk's ID
-                    # Accessing self here is fine as it's the consumer instance
-                    self.media_path_to_chunk[media_path] = session_chunk.id
-                    print(f"WS: Added mapping: {media_path} -> {session_chunk.id}")
-                    return session_chunk.id  # Return the saved chunk ID
-
-                except Exception as save_error:
-                    print(f"WS: Error during SessionChunk save: {save_error}")
-                    traceback.print_exc()
-                    return None  # Return None on save error
-            else:
-                # Corrected variable name from session_serializer.errors to session_chunk_serializer.errors
-                print("WS: Error saving SessionChunk:", session_chunk_serializer.errors)
-                return None  # Return None if serializer is not valid
-
-        except Exception as e:  # Catching other potential exceptions during DB interaction etc.
-            print(f"WS: Error in _save_chunk_data: {e}")
-            traceback.print_exc()
-            return None  # Return None on general error
-        finally:
-            print(f"WS: _save_chunk_data finished after {time.time() - start_time:.2f} seconds")
+            # upload_status is "pending" until the write-behind upload completes
+            record = ChunkRecord(chunk_number=chunk_number, video_file=s3_url, upload_status=upload_status)
+            session_chunk_id = await self.session_writer.save_chunk(record)
+        except Exception as e:
+            self.log.exception("Error saving SessionChunk for %s (chunk %s): %s", media_path, chunk_number, e)
+            return None
 
-    # Decorate with database_sync_to_async to run this synchronous DB method in a thread
-    @database_sync_to_async
-    def _save_window_analysis(self, media_path_of_last_chunk_in_window, analysis_result, combined_transcript_text,
-                              window_chunk_number):
+        self.log.debug("SessionChunk saved with ID: %s for media path: %s after %.2f seconds", session_chunk_id, media_path, time.time() - start_time, extra=SAMPLED)
+        return session_chunk_id
+
+    async def _save_window_analysis(self, media_path_of_last_chunk_in_window, analysis_result, combined_transcript_text,
+                                    window_chunk_number, session_chunk_id=None):
         """
-        Saves the window's analysis result to the database, linked to the last chunk in the window.
-        Runs in a separate thread thanks to database_sync_to_async.
-        Handles cases where analysis_result might be an error dictionary.
-        It will implicitly wait for the SessionChunk to exist via the ORM query for the chunk ID.
+        Saves the window's analysis result through the session writer, linked to the last chunk in the window.
+        An error result (or None) is saved with the transcript and default analysis fields.
         """
         start_time = time.time()
-        print(
-            f"WS: _save_window_analysis started for window ending with media path: {media_path_of_last_chunk_in_window} (chunk {window_chunk_number}) at {start_time}")
-        if not self.session_id:
-            print("WS: Error: Session ID not available, cannot save window analysis.")
-            return None  # Returning None explicitly
-
-        try:
-            # Get the SessionChunk ID from the map for the *last* chunk in the window
-            # This dictionary access is synchronous and fine within the decorated method.
-            # The ORM query inside the serializer's is_valid() or save() method will
-            # handle waiting for the chunk to exist in the DB.
-            session_chunk_id = self.media_path_to_chunk.get(media_path_of_last_chunk_in_window)
-
-            print(
-                f"WS: In _save_window_analysis for {media_path_of_last_chunk_in_window} (chunk {window_chunk_number}): session_chunk_id found? {session_chunk_id is not None}. ID: {session_chunk_id}")
-
-            if session_chunk_id:
-                print(
-                    f"WS: Found SessionChunk ID: {session_chunk_id} for media path: {media_path_of_last_chunk_in_window}")
-
-                # Initialize sentiment_data with basic required fields and the transcript
-                sentiment_data = {
-                    'chunk': session_chunk_id,  # Link to the SessionChunk using its ID
-                    'chunk_number': window_chunk_number,
-                    # Store the chunk number (this is the last chunk in the window)
-                    'chunk_transcript': combined_transcript_text,
-                }
-
-                # Check if analysis_result is a valid dictionary and not an error structure
-                if isinstance(analysis_result, dict) and 'error' not in analysis_result:
-                    print("WS: Analysis result is valid, mapping feedback, posture, and scores.")
-                    # Safely access nested dictionaries from analysis_result
-                    feedback_data = analysis_result.get('Feedback', {})
-                    posture_data = analysis_result.get('Posture', {})
-                    scores_data = analysis_result.get('Scores', {})
-
-                    # Map data from analyze_results
-                    sentiment_data.update({
-                        'audience_emotion': feedback_data.get('Audience Emotion'),
-                        'conviction': feedback_data.get('Conviction'),
-                        'clarity': feedback_data.get('Clarity'),
-                        'impact': feedback_data.get('Impact'),
-                        'brevity': feedback_data.get('Brevity'),
-                        'transformative_potential': feedback_data.get('Transformative Potential'),
-                        'trigger_response': feedback_data.get('Trigger Response'),
-                        'filler_words': feedback_data.get('Filler Words'),
-                        'grammar': feedback_data.get('Grammar'),
-                        'general_feedback_summary': feedback_data.get('General Feedback Summary', ''),
-
-                        'posture': posture_data.get('Posture'),
-                        'motion': posture_data.get('Motion'),
-                        # Handle potential non-boolean values safely
-                        'gestures': bool(posture_data.get('Gestures', False)) if posture_data.get(
-                            'Gestures') is not None else False,
-
-                        'volume': scores_data.get('Volume Score'),
-                        'pitch_variability': scores_data.get('Pitch Variability Score'),
-                        'pace': scores_data.get('Pace Score'),
-                        'pauses': scores_data.get('Pause Score'),
-                    })
-                elif isinstance(analysis_result, dict) and 'error' in analysis_result:
-                    print(
-                        f"WS: Analysis result contained an error: {analysis_result.get('error')}. Saving with error message and null analysis fields.")
-                    # Optionally store the error message in a dedicated field if your model supports it
-                    # For now, we just log it and proceed with saving basic data + transcript
-
-                else:
-                    print(
-                        "WS: Analysis result was not a valid dictionary or was None. Saving with null analysis fields.")
-                    # sentiment_data already only contains basic fields + transcript
-
-                print(
-                    f"WS: ChunkSentimentAnalysis data (for window, chunk {window_chunk_number}) prepared for saving: {sentiment_data}")
-
-                # Use the serializer to validate and prepare data for saving
-                sentiment_serializer = ChunkSentimentAnalysisSerializer(data=sentiment_data)
-
-                # The is_valid() call might trigger DB lookups (e.g., for the 'chunk' foreign key)
-                # This runs in the sync thread provided by database_sync_to_async.
-                # If the chunk corresponding to session_chunk_id does not yet exist,
-                # this lookup will wait or fail depending on DB/ORM behavior.
-                # With database_sync_to_async and typical ORM, it might wait.
-                if sentiment_serializer.is_valid():
-                    print(f"WS: ChunkSentimentAnalysisSerializer (for window, chunk {window_chunk_number}) is valid.")
-                    try:
-                        # Synchronous database call to save the sentiment analysis
-                        sentiment_analysis_obj = sentiment_serializer.save()
-
-                        print(
-                            f"WS: Window analysis data saved for chunk ID: {session_chunk_id} (chunk {window_chunk_number}) with sentiment ID: {sentiment_analysis_obj.id} after {time.time() - start_time:.2f} seconds")
-                        return sentiment_analysis_obj.id  # Return the saved sentiment ID
-
-                    except Exception as save_error:
-                        print(
-                            f"WS: Error during ChunkSentimentAnalysis save (for window, chunk {window_chunk_number}): {save_error}")
-                        traceback.print_exc()  # Print traceback for save errors
-                        return None  # Return None on save error
-                else:
-                    # Print validation errors if serializer is not valid
-                    print(f"WS: Error saving ChunkSentimentAnalysis (chunk {window_chunk_number}):",
-                          sentiment_serializer.errors)
-                    return None  # Return None if serializer is not valid
-
-            else:
-                # This logs if session_chunk_id was None (meaning _save_chunk_data failed or hasn't run for the last chunk in the window)
-                error_message = f"SessionChunk ID not found in media_path_to_chunk for media path {media_path_of_last_chunk_in_window} during window analysis save for chunk {window_chunk_number}. Analysis will not be saved for this chunk."
-                print(f"WS: {error_message}")
-                return None  # Return None if chunk ID not found
+        if self.session_writer is None:
+            self.log.error("Session writer not available, cannot save window analysis.")
+            return None
 
-        except Exception as e:
-            print(
-                f"WS: Error in _save_window_analysis for media path {media_path_of_last_chunk_in_window} (chunk {window_chunk_number}): {e}")
-            traceback.print_exc()  # Print traceback for general _save_window_analysis errors
-            return None  # Return None on general error
-        finally:
-            print(f"WS: _save_window_analysis finished after {time.time() - start_time:.2f} seconds")
+        # The last chunk's save has completed before this is called (see analyze_windowed_media)
+        session_chunk_id = session_chunk_id or self.chunk_ids.get(media_path_of_last_chunk_in_window)
+        if not session_chunk_id:
+            self.log.warning("SessionChunk ID not found for media path %s during window analysis save for chunk %s. Analysis will not be saved for this chunk.", media_path_of_last_chunk_in_window, window_chunk_number)
+            return None
 
-    @database_sync_to_async
-    def get_session_chunk_urls(self, session_id):
-        """Retrieves S3 URLs for all chunks of a session."""
+        if isinstance(analysis_result, dict) and 'error' in analysis_result:
+            self.log.error("Analysis result contained an error: %s. Saving with default analysis fields.", analysis_result.get('error'))
         try:
-            # Order by chunk_number to ensure correct compilation order
-            chunks = SessionChunk.objects.filter(session__id=session_id).order_by('chunk_number')
-            # Directly use chunk.video_file as it's already the S3 URL string
-            chunk_urls = [chunk.video_file for chunk in chunks if chunk.video_file]
-            print(f"WS: Retrieved {len(chunk_urls)} chunk URLs for session {session_id}")
-            return chunk_urls
+            record = SentimentRecord.from_analysis(window_chunk_number, combined_transcript_text, analysis_result)
+            sentiment_analysis_id = await self.session_writer.save_analysis(session_chunk_id, record)
         except Exception as e:
-            print(f"WS: Error retrieving chunk URLs for session {session_id}: {e}")
-            traceback.print_exc()
-            return []
+            self.log.exception("Error saving ChunkSentimentAnalysis (chunk %s): %s", window_chunk_number, e)
+            return None
+
+        self.log.debug("Window analysis data saved for chunk ID: %s (chunk %s) with sentiment ID: %s after %.2f seconds", session_chunk_id, window_chunk_number, sentiment_analysis_id, time.time() - start_time, extra=SAMPLED)
+        return sentiment_analysis_id
 
     @database_sync_to_async
     def update_session_with_video_url(self, session_id, video_url):
@@ -1167,150 +1183,46 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
             session = PracticeSession.objects.get(id=session_id)
             session.compiled_video_url = video_url  # Assuming you have a field named compiled_video_url
             session.save(update_fields=['compiled_video_url'])
-            print(f"WS: Updated session {session_id} with compiled video URL: {video_url}")
+            self.log.info("Updated session %s with compiled video URL: %s", session_id, video_url)
             # You might want to send a WebSocket message to the frontend here if the connection is still open
         except PracticeSession.DoesNotExist:
-            print(f"WS: PracticeSession with id {session_id} not found during video URL update.")
+            self.log.warning("PracticeSession with id %s not found during video URL update.", session_id)
         except Exception as e:
-            print(f"WS: Error updating session {session_id} with compiled video URL: {e}")
-            traceback.print_exc()
-
-    async def compile_session_video(self, session_id):
-        """Background task to compile all chunks for a session."""
-        print(f"WS: Starting video compilation for session {session_id} in background task.")
-        temp_file_paths = []  # To keep track of temporary files for cleanup
-        try:
-            # 1. Get all chunk S3 URLs for the session
-            chunk_urls = await self.get_session_chunk_urls(session_id)
-            if not chunk_urls:
-                print(f"WS: No chunk URLs found for session {session_id}. Skipping compilation.")
-                return
+            self.log.exception("Error updating session %s with compiled video URL: %s", session_id, e)
 
-            # 2. Download chunks temporarily
-            print(f"WS: Downloading {len(chunk_urls)} chunks for session {session_id}.")
-            downloaded_chunk_paths = []
-            for i, url in enumerate(chunk_urls):
-                # Extract the S3 key from the URL more robustly
-                s3_key = None
-                try:
-                    parsed_url = urlparse(url)
-                    # For regional endpoints like bucket-name.s3.region.amazonaws.com
-                    # the bucket name is the first part of the hostname
-                    # the key is the path part without the leading slash
-                    hostname_parts = parsed_url.hostname.split('.')
-                    extracted_bucket_name = hostname_parts[0] if hostname_parts else None
-                    key_path = parsed_url.path.lstrip('/') if parsed_url.path else None # Get path without leading slash
-
-                    if extracted_bucket_name == BUCKET_NAME and key_path:
-                         s3_key = key_path # This is the correct S3 key relative to the bucket root
-                         print(f"WS: Extracted S3 key from URL {url}: {s3_key}")
-                    else:
-                         print(f"WS: Could not extract S3 key or bucket name from URL: {url}. Extracted bucket: {extracted_bucket_name}, Expected: {BUCKET_NAME}, Extracted key path: {key_path}. Skipping download for this chunk.")
-                         continue # Skip this chunk if extraction fails
-
-
-                except Exception as url_parse_error:
-                     print(f"WS: Error parsing URL {url}: {url_parse_error}. Skipping download for this chunk.")
-                     continue
-
-
-                if not s3_key:
-                     # This case should be caught by the try/except above, but as a safeguard
-                     print(f"WS: S3 key is None after extraction attempt for URL: {url}. Skipping download for this chunk.")
-                     continue
-
-
-                temp_file_path = os.path.join(TEMP_MEDIA_ROOT, f"{session_id}_chunk_{i}_{os.path.basename(s3_key)}") # Include key filename in temp filename
-                temp_file_paths.append(temp_file_path) # Add to cleanup list
-                try:
-                    # Use asyncio.to_thread for blocking download
-                    # The s3.download_file method takes bucket name, S3 key, and local file path
-                    await asyncio.to_thread(s3.download_file, BUCKET_NAME, s3_key, temp_file_path)
-                    downloaded_chunk_paths.append(temp_file_path)
-                    print(f"WS: Downloaded chunk {i+1}/{len(chunk_urls)} from {s3_key} to {temp_file_path}") # Log using the key
-                except Exception as e:
-                    print(f"WS: Error downloading chunk {i+1} from {s3_key}: {e}") # Log using the key
-                    # Decide how to handle download errors - skip the chunk or fail compilation?
-                    # For now, we'll try to compile with downloaded chunks.
-                    continue
-
-            if not downloaded_chunk_paths:
-                print(f"WS: No chunks were successfully downloaded for session {session_id}. Skipping compilation.")
-                return
-
-            # 3. Create a file list for FFmpeg concat demuxer
-            list_file_path = os.path.join(TEMP_MEDIA_ROOT, f"{session_id}_concat_list.txt")
-            temp_file_paths.append(list_file_path)  # Add to cleanup list
-            with open(list_file_path, 'w') as f:
-                for chunk_path in downloaded_chunk_paths:
-                    # FFmpeg expects paths in 'file /path/to/file' format in the list file
-                    # Ensure paths are correctly formatted for the environment FFmpeg runs in
-                    f.write(f"file '{chunk_path.replace(os.sep, '/')}'\n")  # Use forward slashes for FFmpeg
-            print(f"WS: Created concat list file: {list_file_path}")
-
-            # 4. Compile video using FFmpeg concat demuxer
-            compiled_video_filename = f"{session_id}_compiled.webm"
-            compiled_video_path = os.path.join(TEMP_MEDIA_ROOT, compiled_video_filename)
-            temp_file_paths.append(compiled_video_path)  # Add to cleanup list
-
-            # FFmpeg command to concatenate using demuxer
-            # Added -c copy for efficiency
-            # Added -f webm explicitly if the input format is webm (which it seems to be from chunk names)
-            ffmpeg_command = [
-                "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file_path,
-                "-c", "copy", "-f", "webm", "-nostats", "-loglevel", "0", compiled_video_path
-            ]
-            print(f"WS: Running FFmpeg compilation command: {' '.join(ffmpeg_command)}")
-
-            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = await asyncio.to_thread(process.communicate)
-            returncode = await asyncio.to_thread(lambda p: p.returncode, process)
-
-            if returncode != 0:
-                error_output = stderr.decode()
-                print(f"WS: FFmpeg compilation error (code {returncode}) for session {session_id}: {error_output}")
-                print(f"WS: FFmpeg stdout: {stdout.decode()}")
-                # Decide how to handle compilation errors - log, notify user?
-                return
-            else:
-                print(f"WS: Video compiled successfully to: {compiled_video_path}")
-
-            # 5. Upload compiled video to S3
-            print(f"WS: Uploading compiled video to S3 for session {session_id}.")
-            # Construct the S3 key for the compiled video
-            # Updated compiled S3 key structure: BASE_FOLDER/user_id/session_id/compiled_video_filename
-            # Ensure user_id is available
-            if not self.user_id:
-                 print(f"WS: Error: User ID not available. Cannot upload compiled video for session {session_id}.")
-                 return # Exit if user ID is missing
-
-            compiled_s3_key = f"{BASE_FOLDER}{self.user_id}/{self.session_id}/{compiled_video_filename}" # Use self.user_id and self.session_id
-            # Upload the compiled video
-            # Use asyncio.to_thread for blocking upload
-            await asyncio.to_thread(s3.upload_file, compiled_video_path, BUCKET_NAME, compiled_s3_key)
-
-            # Construct the final S3 URL
-            region_name = os.environ.get('AWS_S3_REGION_NAME', os.environ.get('AWS_REGION', 'us-east-1'))
-            compiled_s3_url = f"https://{BUCKET_NAME}.s3.{region_name}.amazonaws.com/{compiled_s3_key}"
-
-            if compiled_s3_url:
-                # 6. Update Session model with compiled video URL
+    async def finalize_session_video(self, session_id):
+        """
+        Completes the session video assembled during the session; only the first and last parts are
+        left to upload. Falls back to a compilation job if there is no recording or it cannot be completed.
+        """
+        if self.recording is not None:
+            start_time = time.time()
+            try:
+                size = await self.recording.finish()
+                compiled_s3_url = s3_url(self.recording.key)
                 await self.update_session_with_video_url(session_id, compiled_s3_url)
-                print(f"WS: Video compilation and upload complete for session {session_id}. URL: {compiled_s3_url}")
-            else:
-                print(f"WS: Failed to upload compiled video to S3 for session {session_id}.")
-
+                self.log.info("Session video finalized (%s bytes) for session %s after %.2f seconds. URL: %s", size, session_id, time.time() - start_time, compiled_s3_url)
+                return
+            except RecordingError as e:
+                self.log.warning("Could not finalize the session recording for session %s: %s. Compiling the uploaded chunks instead.", session_id, e)
+        await self.compile_session_video(session_id)
 
+    async def compile_session_video(self, session_id):
+        """
+        Hands compilation of the session's uploaded chunks to a background job (streaming.tasks),
+        keyed by the session and its chunk count so a repeated disconnect does not compile twice.
+        Compilation never runs in this process: if the job broker cannot be reached the SessionJob
+        is left failed, and enqueueing the same key again sends it.
+        """
+        try:
+            job = await database_sync_to_async(self._enqueue_compile_job)(session_id)
+            self.log.info("Video compilation for session %s is %s (job %s).", session_id, job.status, job.id)
+        except JobEnqueueError as e:
+            self.log.error("%s. The compilation job of session %s is left failed.", e, session_id)
         except Exception as e:
-            print(f"WS: An error occurred during video compilation for session {session_id}: {e}")
-            traceback.print_exc()
-        finally:
-            # Clean up temporary files
-            print(f"WS: Cleaning up temporary files for session {session_id}.")
-            for file_path in temp_file_paths:
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        print(f"WS: Removed temporary file: {file_path}")
-                    except Exception as e:
-                        print(f"WS: Error removing temporary file {file_path} during cleanup: {e}")
+            self.log.exception("Could not enqueue video compilation for session %s: %s", session_id, e)
+
+    def _enqueue_compile_job(self, session_id):
+        chunk_count = SessionChunk.objects.filter(session_id=session_id).count()
+        return enqueue_job(compile_session_video_job, session_id,
+                           key=f"{compile_session_video_job.name}:{session_id}:{chunk_count}")
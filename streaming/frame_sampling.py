@@ -0,0 +1,94 @@
+"""
+Deterministic video frame sampling for posture analysis.
+
+Posture statistics do not need every frame: a few frames per second, downscaled before
+inference, give the same picture at a fraction of the CPU. Frames are picked by their
+container timestamps rather than by arrival order or queue capacity, so the same video
+always yields the same frames, and durations come from those timestamps instead of an
+assumed frame rate.
+"""
+
+import math
+import os
+
+import av
+
+# Target analysis rate (frames per second) and maximum width of analyzed frames
+VIDEO_SAMPLE_FPS = float(os.getenv("POSTURE_SAMPLE_FPS", 5))
+VIDEO_MAX_WIDTH = int(os.getenv("POSTURE_MAX_WIDTH", 640))
+
+# Decode only keyframes when reading video files (much cheaper, but far fewer frames)
+KEYFRAMES_ONLY = os.getenv("POSTURE_KEYFRAMES_ONLY", "False") == "True"
+
+
+class FrameSampler:
+    """
+    Picks at most one frame per 1/fps slot of stream time: the first frame whose timestamp
+    falls in a slot not yet taken. Slots are anchored at t=0, so a video split into chunks
+    samples the same frames as the whole video. fps of 0 or None keeps every frame.
+    """
+
+    def __init__(self, fps=VIDEO_SAMPLE_FPS):
+        self.interval = 1.0 / fps if fps else 0.0
+        self._last_slot = None
+
+    def accept(self, timestamp):
+        if not self.interval:
+            return True
+        # The epsilon keeps timestamps that sit exactly on a slot boundary (e.g. 0.2 s at 5 fps) in that slot
+        slot = math.floor(timestamp / self.interval + 1e-6)
+        if self._last_slot is not None and slot <= self._last_slot:
+            return False
+        self._last_slot = slot
+        return True
+
+
+def scaled_size(width, height, max_width=VIDEO_MAX_WIDTH):
+    """Returns (width, height) scaled down to at most `max_width`, keeping even dimensions, or None if already small enough."""
+    if not max_width or width <= max_width:
+        return None
+    return max_width, max(2, int(round(height * max_width / width / 2)) * 2)
+
+
+def frame_to_bgr(frame, max_width=VIDEO_MAX_WIDTH):
+    """Converts a decoded PyAV video frame to a BGR ndarray, downscaling during the pixel-format conversion."""
+    size = scaled_size(frame.width, frame.height, max_width)
+    if size is None:
+        return frame.to_ndarray(format="bgr24")
+    width, height = size
+    return frame.to_ndarray(format="bgr24", width=width, height=height)
+
+
+def sample_video_frames(video_path, fps=VIDEO_SAMPLE_FPS, max_width=VIDEO_MAX_WIDTH, keyframes_only=KEYFRAMES_ONLY):
+    """
+    Yields (timestamp_seconds, BGR ndarray) for the sampled frames of a video file. With
+    `keyframes_only` the decoder skips every non-key frame, so only keyframes are decoded.
+    """
+    with av.open(video_path, mode="r") as container:
+        if not container.streams.video:
+            return
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        if keyframes_only:
+            stream.codec_context.skip_frame = "NONKEY"
+
+        sampler = FrameSampler(fps)
+        for frame in container.decode(stream):
+            if frame.time is None:
+                continue
+            timestamp = float(frame.time)
+            if sampler.accept(timestamp):
+                yield timestamp, frame_to_bgr(frame, max_width)
+
+
+def sampled_duration(timestamps, fps=VIDEO_SAMPLE_FPS):
+    """
+    Stream time covered by sampled frames: their span plus one average sampling interval
+    (each frame stands for the interval up to the next one).
+    """
+    if not timestamps:
+        return 0.0
+    if len(timestamps) == 1:
+        return 1.0 / fps if fps else 0.0
+    span = timestamps[-1] - timestamps[0]
+    return span * len(timestamps) / (len(timestamps) - 1)
@@ -0,0 +1,60 @@
+"""
+Binary WebSocket framing for live session media chunks.
+
+Clients that negotiate the binary protocol at connect time send every media chunk as a
+single binary WebSocket message laid out as a fixed header followed by the raw webm bytes:
+
+    +---------+------------+---------+-----------------+------------------+
+    | version | frame type |  flags  | sequence number |  payload (webm)  |
+    | 1 byte  |   1 byte   | 2 bytes |     4 bytes     |   rest of frame  |
+    +---------+------------+---------+-----------------+------------------+
+
+All header fields are unsigned big-endian integers. The payload is never copied while
+parsing: `parse_frame` hands back a memoryview over the received message.
+"""
+
+import struct
+
+# Subprotocol offered in Sec-WebSocket-Protocol by clients that speak the binary framing.
+BINARY_SUBPROTOCOL = "engagex.media.v1"
+
+# Value of the `media_protocol` query parameter for clients that cannot set subprotocols.
+BINARY_PROTOCOL_NAME = "binary"
+JSON_PROTOCOL_NAME = "json"
+
+PROTOCOL_VERSION = 1
+
+FRAME_HEADER = struct.Struct("!BBHI")
+HEADER_SIZE = FRAME_HEADER.size
+
+# Frame types
+FRAME_TYPE_MEDIA = 1
+
+MAX_SEQUENCE = 0xFFFFFFFF
+
+
+class FrameError(ValueError):
+    """Raised when a binary message does not follow the media framing."""
+
+
+def parse_frame(data):
+    """
+    Parses a binary frame into (frame_type, sequence, flags, payload).
+    `payload` is a memoryview into `data`, so no bytes are copied.
+    """
+    view = memoryview(data)
+    if view.nbytes < HEADER_SIZE:
+        raise FrameError(f"Frame too short: {view.nbytes} bytes, header is {HEADER_SIZE} bytes")
+
+    version, frame_type, flags, sequence = FRAME_HEADER.unpack_from(view)
+    if version != PROTOCOL_VERSION:
+        raise FrameError(f"Unsupported frame version {version}, expected {PROTOCOL_VERSION}")
+
+    return frame_type, sequence, flags, view[HEADER_SIZE:]
+
+
+def build_frame(frame_type, sequence, payload, flags=0):
+    """Builds a binary frame. Used by clients and tests; the server only parses frames."""
+    if not 0 <= sequence <= MAX_SEQUENCE:
+        raise FrameError(f"Sequence number out of range: {sequence}")
+    return FRAME_HEADER.pack(PROTOCOL_VERSION, frame_type, flags, sequence) + bytes(payload)
@@ -0,0 +1,277 @@
+"""
+Content-addressed cache for LLM responses.
+
+Every chat completion request (model, messages, response schema and sampling parameters) is
+hashed into a key, and the response text is stored under that key. A repeated request, such
+as a retried report POST or a re-uploaded slide deck, then returns the stored response
+instead of calling the API again.
+
+Only requests whose replay is wanted go through the cache: analysis and slide scoring, and
+the session report (a retried report POST gets the same feedback). Audience questions are
+sampled (temperature 0.7) to vary and their transcripts rarely repeat, so they call the API
+directly; caching them would pin one question to a transcript and cost a write per call.
+
+Entries expire after LLM_CACHE_TTL seconds, and at most LLM_CACHE_MAX_ENTRIES are kept, with
+the least recently used evicted first. The storage is pluggable:
+
+- "memory": an in-process LRU (the default; per worker process)
+- "django": the Django cache named by LLM_CACHE_ALIAS, shared by every process using it
+- "file":   one JSON file per entry under LLM_CACHE_DIR, shared by processes on one host
+- "none":   caching disabled
+
+Hit and miss counts are kept per process and returned by `get_llm_cache().stats()`.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+LLM_CACHE_ALIAS = os.getenv("LLM_CACHE_ALIAS", "default")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "engagex-llm-cache"))
+
+# Bumping this invalidates every stored entry (e.g. after changing how responses are parsed)
+KEY_VERSION = 1
+
+
+def request_key(request):
+    """Hex digest identifying a chat completion request by its model, prompt, schema and parameters."""
+    payload = json.dumps({"v": KEY_VERSION, **request}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------- BACKENDS ----------------------
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """A configured Django cache; expiry and eviction are the cache's own."""
+
+    def __init__(self, alias=LLM_CACHE_ALIAS, prefix="llm:"):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(self.prefix + key, value, timeout=ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class FileBackend:
+    """
+    One JSON file per entry. A file's modification time is its last use: reads touch it, and
+    writes evict the least recently used files beyond max_entries.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            self._remove(path)
+            return None
+        self._touch(path)
+        return entry["value"]
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        # Written to a temporary file and renamed, so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump({"expires_at": time.time() + ttl, "value": value}, file)
+        os.replace(temp_path, path)
+        self._touch(path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                self._remove(path)
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                self._remove(entry.path)
+
+    @staticmethod
+    def _touch(path):
+        # Explicit nanosecond timestamps, so the LRU order holds within one filesystem clock tick
+        now = time.time_ns()
+        try:
+            os.utime(path, ns=(now, now))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "django": DjangoCacheBackend,
+    "file": FileBackend,
+}
+
+
+# ---------------------- CACHE ----------------------
+
+class LLMCache:
+    def __init__(self, backend, ttl=LLM_CACHE_TTL):
+        self.backend = backend  # None disables caching
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning("Lookup failed: %s", e)
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend is None or not value:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("Store failed: %s", e)
+
+    def _store(self, key, content, validate):
+        # A response the caller cannot use (e.g. malformed JSON) is returned but not cached
+        if validate is not None:
+            try:
+                validate(content)
+            except Exception:
+                return
+        self.set(key, content)
+
+    def complete(self, client, request, validate=None):
+        """
+        Response text of a chat completion request, from the cache or from `client` (an OpenAI
+        client). `validate`, if given, must accept the text for it to be cached.
+        """
+        key = request_key(request)
+        content = self.get(key)
+        if content is None:
+            completion = client.chat.completions.create(**request)
+            content = completion.choices[0].message.content
+            self._store(key, content, validate)
+        return content
+
+    async def acomplete(self, client, request, validate=None):
+        """complete() for an AsyncOpenAI client. File and Django cache lookups run in a thread."""
+        in_process = self.backend is None or isinstance(self.backend, MemoryBackend)
+        key = request_key(request)
+        content = self.get(key) if in_process else await asyncio.to_thread(self.get, key)
+        if content is None:
+            completion = await client.chat.completions.create(**request)
+            content = completion.choices[0].message.content
+            if in_process:
+                self._store(key, content, validate)
+            else:
+                await asyncio.to_thread(self._store, key, content, validate)
+        return content
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the process-wide LLMCache, using the LLM_CACHE_BACKEND storage."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend_class = BACKENDS.get(LLM_CACHE_BACKEND)
+            if backend_class is None and LLM_CACHE_BACKEND != "none":
+                logger.warning("Unknown backend %r; caching disabled", LLM_CACHE_BACKEND)
+            _cache = LLMCache(backend_class() if backend_class is not None else None)
+        return _cache
@@ -0,0 +1,137 @@
+"""
+Leveled, structured logging for the live session path.
+
+The consumer and the analysis code used to print() several lines per chunk (transcripts,
+analysis dicts, buffer listings) and one per decoded frame, each a synchronous write to
+stdout on the event loop or a worker thread. They now log through the standard logging
+module, configured by LOGGING in settings.py:
+
+- Levels: per-chunk and per-frame detail is DEBUG, session lifecycle INFO, recoverable
+  problems WARNING, failures ERROR (with the traceback). LOG_LEVEL sets the level of the
+  "streaming" loggers (default INFO), so the detail costs nothing in production: messages
+  use %-style arguments and are only formatted for records that are emitted.
+- Context: `get_logger(name, session_id=..., user_id=...)` returns a logger whose records
+  carry those fields; `bind()` adds more. The formatter writes them as key=value pairs (or
+  JSON fields with LOG_FORMAT=json).
+- Sampling: records logged with `extra=SAMPLED` (per-chunk and per-frame detail) pass the
+  SamplingFilter only once every LOG_SAMPLE_EVERY times per call site.
+- Non-blocking output: QueueingHandler puts records on a bounded queue; a background thread
+  formats and writes them. When the queue is full records are dropped (and counted) rather
+  than blocking the caller.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" (key=value) or "json"
+LOG_SAMPLE_EVERY = max(1, int(os.getenv("LOG_SAMPLE_EVERY", 10)))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# Record attributes written as context fields when present
+CONTEXT_FIELDS = ("session_id", "user_id", "room")
+
+# extra= for sampled detail lines
+SAMPLED = {"sample": True}
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """Adds the session's context fields to every record; `extra` passed to a call is merged in."""
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    def bind(self, **fields):
+        """A logger with additional context fields."""
+        return SessionLogger(self.logger, {**self.extra, **fields})
+
+
+def get_logger(name, **context):
+    return SessionLogger(logging.getLogger(name), context)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes one in `every` records logged with extra=SAMPLED, per call site; other records always pass."""
+
+    def __init__(self, every=LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, "sample", False) or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            counter = self._counters.get(site)
+            if counter is None:
+                counter = self._counters[site] = itertools.count()
+        return next(counter) % self.every == 0
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: time, level, logger, context fields and message, as key=value text or JSON."""
+
+    def __init__(self, fmt=LOG_FORMAT):
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record):
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+        fields = {name: getattr(record, name) for name in CONTEXT_FIELDS if getattr(record, name, None) is not None}
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        if self.json:
+            return json.dumps({"time": timestamp, "level": record.levelname, "logger": record.name,
+                               **fields, "message": message}, default=str)
+        context = "".join(f" {name}={value}" for name, value in fields.items())
+        return f"{timestamp} {record.levelname} {record.name}{context} {message}"
+
+
+class QueueingHandler(QueueHandler):
+    """
+    Hands records to a background thread that formats and writes them to `stream` (stdout by
+    default). Only the message arguments are rendered in the caller's thread, so later changes
+    to the objects logged do not alter the line.
+    """
+
+    def __init__(self, stream=None, queue_size=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self.dropped = 0
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        # Formatting happens in the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()  # writes out what is queued
+            self.listener = None
+            self.target.close()
+        super().close()
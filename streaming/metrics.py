@@ -0,0 +1,251 @@
+"""
+Metrics of the live session pipeline, served in the Prometheus text format at /metrics/.
+
+- engagex_stage_seconds{stage}: histogram of each stage's duration: decode, transcription,
+  window_concat, posture, prosody, llm_scoring, s3_upload, db_save, compile
+- engagex_chunk_to_feedback_seconds: histogram of the time from receiving a window's last
+  chunk to sending its feedback
+- engagex_active_sessions: live sessions connected to this process
+- engagex_pipeline_queue_depth{stage} / engagex_pipeline_busy_workers{stage}: summed over
+  the process's live session pipelines
+- engagex_windows_skipped_total: stale windows skipped by the window schedulers
+- engagex_s3_uploads_pending, engagex_session_writes_pending, engagex_llm_cache_*_total
+
+Metrics are kept per process, in memory; each WebSocket process serves its own. Compile
+durations recorded by Celery workers stay in the worker process. Gauges that describe
+state owned elsewhere (queue depths, pending uploads) are read when the metrics are scraped.
+
+Set METRICS_TOKEN to require "Authorization: Bearer <token>" on the endpoint.
+"""
+
+import math
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from django.http import HttpResponse
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds; stage durations range from milliseconds (DB batches) to minutes (compilation)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+FEEDBACK_BUCKETS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help_text, labelnames=(), collect=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._collect = collect  # callback returning {label values: value}, read at scrape time
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _samples(self):
+        if self._collect is not None:
+            return sorted(self._collect().items())
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self._samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount=1, *labels):
+        self.inc(-amount, *labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # One count per bucket, then the sum
+                counts = self._values[labels] = [0] * len(self.buckets) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observes the duration of the `with` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        with self._lock:
+            counts = self._values.get(labels)
+            return counts[-2] if counts else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, counts in self._samples():
+            counts = list(counts)
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{label_text} {counts[-2]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.warning("Could not collect %s: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+
+# Live session pipelines (and their writers) of this process, for the scrape-time gauges
+_pipelines = weakref.WeakSet()
+_writers = weakref.WeakSet()
+
+
+def track_pipeline(pipeline):
+    _pipelines.add(pipeline)
+
+
+def track_writer(writer):
+    _writers.add(writer)
+
+
+def _pipeline_gauge(field):
+    def collect():
+        totals = {}
+        for pipeline in list(_pipelines):
+            for stage in pipeline.stages:
+                value = stage.queue.qsize() if field == "depth" else stage.busy
+                totals[(stage.name,)] = totals.get((stage.name,), 0) + value
+        return totals
+    return collect
+
+
+def _uploads_pending():
+    from . import s3_spool  # imported here: s3_spool records upload durations in this module
+    uploader = s3_spool._uploader
+    return {(): uploader.pending if uploader is not None else 0}
+
+
+def _writes_pending():
+    return {(): sum(writer.pending for writer in list(_writers))}
+
+
+def _llm_cache(field):
+    def collect():
+        from .llm_cache import _cache
+        return {(): _cache.stats()[field] if _cache is not None else 0}
+    return collect
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "engagex_stage_seconds", "Duration of each live pipeline stage in seconds.", labelnames=("stage",)))
+CHUNK_TO_FEEDBACK_SECONDS = REGISTRY.register(Histogram(
+    "engagex_chunk_to_feedback_seconds", "Seconds from receiving a window's last chunk to sending its feedback.",
+    buckets=FEEDBACK_BUCKETS))
+ACTIVE_SESSIONS = REGISTRY.register(Gauge(
+    "engagex_active_sessions", "Live sessions connected to this process."))
+WINDOWS_SKIPPED = REGISTRY.register(Counter(
+    "engagex_windows_skipped_total", "Stale analysis windows skipped in favour of newer ones."))
+ACTIVE_SESSIONS.set(0)
+WINDOWS_SKIPPED.inc(0)
+REGISTRY.register(Gauge(
+    "engagex_pipeline_queue_depth", "Chunks waiting in each pipeline stage's queue, over all live sessions.",
+    labelnames=("stage",), collect=_pipeline_gauge("depth")))
+REGISTRY.register(Gauge(
+    "engagex_pipeline_busy_workers", "Pipeline stage workers processing a chunk, over all live sessions.",
+    labelnames=("stage",), collect=_pipeline_gauge("busy")))
+REGISTRY.register(Gauge(
+    "engagex_s3_uploads_pending", "Spooled chunks not uploaded to S3 yet.", collect=_uploads_pending))
+REGISTRY.register(Gauge(
+    "engagex_session_writes_pending", "SessionChunk/ChunkSentimentAnalysis rows queued for the next batch insert.",
+    collect=_writes_pending))
+REGISTRY.register(Counter(
+    "engagex_llm_cache_hits_total", "LLM responses served from the cache.", collect=_llm_cache("hits")))
+REGISTRY.register(Counter(
+    "engagex_llm_cache_misses_total", "LLM requests not found in the cache.", collect=_llm_cache("misses")))
+
+
+def time_stage(stage):
+    """Context manager observing the duration of one pipeline stage."""
+    return STAGE_SECONDS.time(stage)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+
+
+def metrics_view(request):
+    """Serves every metric of this process in the Prometheus text format."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
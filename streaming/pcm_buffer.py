@@ -0,0 +1,109 @@
+"""
+Rolling buffer of decoded PCM samples for the sliding analysis window.
+
+Each media chunk contributes one segment. Windows are returned as numpy views over a single
+contiguous backing array, so handing a window to process_audio copies nothing, and windows
+that overlap by one or two chunks share the same samples instead of re-decoding them.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .audio_decoding import ANALYSIS_SAMPLE_RATE
+
+# Nominal length of a MediaRecorder chunk; only used to size the initial allocation.
+NOMINAL_CHUNK_SECONDS = 10
+
+
+class PCMRingBuffer:
+    """
+    Holds the samples of the most recent chunks in order, keyed by the chunk's media path.
+
+    Samples are appended after the live region and never written again, so a window view
+    stays valid while new chunks arrive and old ones are evicted (analysis of one window
+    runs in a worker thread while the next chunk is appended). When the backing array runs
+    out of room the live region is moved to a fresh array; views taken earlier keep
+    referencing the old one.
+    """
+
+    def __init__(self, window_chunks, chunk_seconds=NOMINAL_CHUNK_SECONDS, sample_rate=ANALYSIS_SAMPLE_RATE,
+                 dtype=np.float64):
+        # Praat works on float64, so storing float64 lets parselmouth.Sound take the view as-is.
+        self.dtype = dtype
+        self.sample_rate = sample_rate
+        # Room for two windows: one relocation per window's worth of appended audio.
+        self._buf = np.empty(2 * window_chunks * chunk_seconds * sample_rate, dtype=dtype)
+        self._start = 0
+        self._end = 0
+        self._segments = deque()  # (key, number of samples), oldest first
+
+    def __len__(self):
+        return len(self._segments)
+
+    def __contains__(self, key):
+        return any(k == key for k, _ in self._segments)
+
+    @property
+    def duration(self):
+        """Seconds of audio currently buffered."""
+        return (self._end - self._start) / self.sample_rate
+
+    def append(self, key, samples):
+        """Appends the decoded samples of one chunk."""
+        samples = np.asarray(samples).reshape(-1)
+        n = samples.size
+        if self._end + n > self._buf.size:
+            self._relocate(n)
+        self._buf[self._end:self._end + n] = samples
+        self._end += n
+        self._segments.append((key, n))
+
+    def evict(self, key):
+        """
+        Drops the chunk `key` and everything older than it. Returns False if `key` is
+        not buffered (e.g. its audio failed to decode).
+        """
+        if key not in self:
+            return False
+        while self._segments:
+            evicted_key, n = self._segments.popleft()
+            self._start += n
+            if evicted_key == key:
+                break
+        return True
+
+    def window(self, keys):
+        """
+        Returns a zero-copy view over the samples of `keys`, which must be consecutive
+        buffered chunks in order. Returns None if any of them is missing.
+        """
+        keys = list(keys)
+        if not keys:
+            return None
+
+        offset = self._start
+        segments = list(self._segments)
+        for i, (key, n) in enumerate(segments):
+            if key == keys[0]:
+                following = segments[i:i + len(keys)]
+                if [k for k, _ in following] != keys:
+                    return None
+                length = sum(n for _, n in following)
+                return self._buf[offset:offset + length]
+            offset += n
+        return None
+
+    def clear(self):
+        # The offsets are not rewound: views handed out earlier must not be written over
+        self._segments.clear()
+        self._start = self._end
+
+    def _relocate(self, incoming):
+        live = self._end - self._start
+        size = max(self._buf.size, 2 * (live + incoming))
+        new_buf = np.empty(size, dtype=self.dtype)
+        new_buf[:live] = self._buf[self._start:self._end]
+        self._buf = new_buf
+        self._start = 0
+        self._end = live
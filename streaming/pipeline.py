@@ -0,0 +1,186 @@
+"""
+Staged per-session chunk pipeline.
+
+The consumer's socket reader only hands each received chunk to the pipeline; the work is
+done by a chain of stages (ingest -> decode -> transcribe -> analyze -> persist), each with
+its own worker tasks:
+
+- Stages are connected by bounded asyncio queues. A stage that falls behind fills its
+  queue, which blocks the stage before it, and eventually the socket reader, instead of
+  buffering without limit.
+- Every stage has its own concurrency (number of workers). A stage with more than one worker
+  can be `ordered`, in which case its results are passed on in the order items arrived,
+  e.g. so windows are only formed once every earlier chunk has been transcribed.
+- A handler returns the item to pass on, or None to stop it there. Exceptions are logged and
+  counted, and the item is dropped.
+- The pipeline's `on_drop(item)` callback is called for every item dropped on the way: its
+  stage failed, or it was still queued or being processed when `close()` gave up.
+- `metrics()` reports each stage's queue depth, peak depth, busy workers and counters.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Items each stage's queue holds before the stage feeding it has to wait
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 8))
+
+
+class PipelineClosed(Exception):
+    """Raised when an item is put into a pipeline that is closing."""
+
+
+@dataclass
+class ChunkJob:
+    """One media chunk as it moves through the consumer's pipeline."""
+    chunk_number: int
+    media_bytes: object  # bytes or memoryview of the received chunk; released after transcription
+    received_at: float = field(default_factory=time.time)
+    media_path: str = None  # temporary file, written by the ingest stage
+    audio_samples: np.ndarray = None  # decoded mono PCM, set by the decode stage
+    video_frames: list = None  # decoded (timestamp, BGR frame) pairs, set by the decode stage
+    saved: asyncio.Future = None  # resolves once the persist stage has saved the chunk
+
+
+class Stage:
+    def __init__(self, name, handler, concurrency=1, ordered=False, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.handler = handler  # async handler(item) -> item for the next stage, or None
+        self.concurrency = max(1, concurrency)
+        self.ordered = ordered
+        self.queue = asyncio.Queue(queue_size)
+        self.next = None
+        self.on_drop = None  # set by the Pipeline
+        self.busy = 0
+        self.max_depth = 0
+        self.processed = 0
+        self.failed = 0
+        self._received = 0  # sequence number of the next item put into this stage
+        self._emitted = 0  # sequence number of the next item to pass on (ordered stages)
+        self._finished = {}  # sequence number -> result, held until earlier items are passed on
+        self._emit_lock = asyncio.Lock()
+        self._workers = []
+
+    async def put(self, item):
+        sequence, self._received = self._received, self._received + 1
+        await self.queue.put((sequence, item))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            sequence, item = await self.queue.get()
+            self.busy += 1
+            try:
+                result = await self.handler(item)
+                self.processed += 1
+            except asyncio.CancelledError:
+                self._drop(item)
+                raise
+            except Exception as e:
+                logger.exception("%s stage failed: %s", self.name, e)
+                self.failed += 1
+                result = None
+                self._drop(item)
+            finally:
+                self.busy -= 1
+            try:
+                await self._emit(sequence, result)
+            finally:
+                self.queue.task_done()
+
+    def _drop(self, item):
+        if self.on_drop is not None:
+            try:
+                self.on_drop(item)
+            except Exception as e:
+                logger.error("On_drop failed in %s stage: %s", self.name, e)
+
+    def drop_queued(self):
+        """Drops every item still waiting in this stage's queue."""
+        while not self.queue.empty():
+            _, item = self.queue.get_nowait()
+            self.queue.task_done()
+            self._drop(item)
+
+    async def _emit(self, sequence, result):
+        if not self.ordered:
+            if result is not None and self.next is not None:
+                await self.next.put(result)
+            return
+        self._finished[sequence] = result
+        async with self._emit_lock:
+            while self._emitted in self._finished:
+                result = self._finished.pop(self._emitted)
+                self._emitted += 1
+                if result is not None and self.next is not None:
+                    await self.next.put(result)
+
+    def metrics(self):
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "busy": self.busy,
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages, on_drop=None):
+        self.stages = list(stages)
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next = next_stage
+        for stage in self.stages:
+            stage.on_drop = on_drop
+        self.closed = False
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    @property
+    def full(self):
+        """True when putting an item would wait for the first stage to catch up."""
+        return self.stages[0].queue.full()
+
+    async def put(self, item):
+        """Puts an item into the first stage, waiting while its queue is full."""
+        if self.closed:
+            raise PipelineClosed("pipeline is closing")
+        await self.stages[0].put(item)
+
+    def metrics(self):
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    async def close(self, timeout=None):
+        """Stops taking items, lets queued items through every stage (up to `timeout` seconds), then stops."""
+        self.closed = True
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Not drained after %ss; dropping %s", timeout, self.metrics())
+        finally:
+            for stage in self.stages:
+                stage.stop()
+                stage.drop_queued()
+
+    async def _drain(self):
+        # Stage by stage: once a stage's queue is joined, everything it received has been passed on
+        for stage in self.stages:
+            await stage.queue.join()
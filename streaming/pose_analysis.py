@@ -0,0 +1,304 @@
+"""
+Reentrant posture analysis backed by a bounded pool of MediaPipe pose graphs.
+
+A MediaPipe Pose graph is expensive to build and is not safe to share between threads, so
+each process keeps a small pool of pre-initialized graphs. Every analysis checks one out
+as a PoseAnalyzer, which owns its own PostureSummary, so several sessions on one node
+analyze posture in parallel without sharing any mutable state, and memory stays constant
+regardless of how many chunks have been analyzed. Frames are sampled and downscaled by
+streaming/frame_sampling.py before inference.
+"""
+
+import math as m
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import av
+import cv2
+import mediapipe as mp
+
+from .frame_sampling import (
+    FrameSampler, sample_video_frames, sampled_duration, scaled_size, VIDEO_SAMPLE_FPS, VIDEO_MAX_WIDTH, KEYFRAMES_ONLY
+)
+from .posture import PostureSummary, POSTURE_THRESHOLD
+from .log import SAMPLED, get_logger
+
+logger = get_logger(__name__)
+
+mp_pose = mp.solutions.pose
+
+# Number of pose graphs per process; analyses beyond this wait for a graph to be released.
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE", min(4, os.cpu_count() or 1)))
+
+# How long an analysis waits for a free graph before giving up (seconds).
+POSE_ACQUIRE_TIMEOUT = 60
+
+
+class PosePoolExhausted(Exception):
+    """Raised when no pose graph becomes free within the acquire timeout."""
+
+
+# Calculate Distance
+def find_distance(x1, y1, x2, y2):
+    return m.sqrt(((x2 - x1) ** 2) + ((y2 - y1) ** 2))
+
+
+# Calculate Angles
+def find_angle(x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    vertical = (0, 1)
+    dot = dy
+    norm_vector = find_distance(x1, y1, x2, y2)
+    if norm_vector == 0:
+        return 0.0
+    cos_theta = max(min(dot / norm_vector, 1.0), -1.0)
+    return m.degrees(m.acos(cos_theta))
+
+
+# Extract posture angles
+def extract_posture_angles(landmarks, image_width, image_height):
+    def to_pixel(landmark):
+        return (int(landmark.x * image_width), int(landmark.y * image_height))
+
+    visibility_threshold = 0.5
+
+    left_pinky_present = right_pinky_present = left_index_present = right_index_present = left_thumb_present = right_thumb_present = left_wrist_present = right_wrist_present = False
+
+    left_shoulder = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value])
+    right_shoulder = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value])
+
+    left_ear = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_EAR.value])
+    right_ear = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_EAR.value])
+
+    left_hip = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_HIP.value])
+    right_hip = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value])
+
+    left_wrist = landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value]
+    right_wrist = landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value]
+
+    left_pinky = (landmarks[mp_pose.PoseLandmark.LEFT_PINKY.value])
+    right_pinky = (landmarks[mp_pose.PoseLandmark.RIGHT_PINKY.value])
+
+    left_index = (landmarks[mp_pose.PoseLandmark.LEFT_INDEX.value])
+    right_index = (landmarks[mp_pose.PoseLandmark.RIGHT_INDEX.value])
+
+    left_thumb = (landmarks[mp_pose.PoseLandmark.LEFT_THUMB.value])
+    right_thumb = (landmarks[mp_pose.PoseLandmark.RIGHT_THUMB.value])
+
+    if left_wrist.visibility > visibility_threshold:
+        left_wrist_present = True
+        left_wrist = to_pixel(left_wrist)
+
+    if right_wrist.visibility > visibility_threshold:
+        right_wrist_present = True
+        right_wrist = to_pixel(right_wrist)
+
+    if left_pinky.visibility > visibility_threshold:
+        left_pinky_present = True
+        left_pinky = to_pixel(left_pinky)
+
+    if right_pinky.visibility > visibility_threshold:
+        right_pinky_present = True
+        right_pinky = to_pixel(right_pinky)
+
+    if left_index.visibility > visibility_threshold:
+        left_index_present = True
+        left_index = to_pixel(left_index)
+
+    if right_index.visibility > visibility_threshold:
+        right_index_present = True
+        right_index = to_pixel(right_index)
+
+    if left_thumb.visibility > visibility_threshold:
+        left_thumb_present = True
+        left_thumb = to_pixel(left_thumb)
+
+    if right_thumb.visibility > visibility_threshold:
+        right_thumb_present = True
+        right_thumb = to_pixel(right_thumb)
+
+    shoulder_mid = ((left_shoulder[0] + right_shoulder[0]) // 2, (left_shoulder[1] + right_shoulder[1]) // 2)
+    hip_mid = ((left_hip[0] + right_hip[0]) // 2, (left_hip[1] + right_hip[1]) // 2)
+    ear_mid = ((left_ear[0] + right_ear[0]) // 2, (left_ear[1] + right_ear[1]) // 2)
+
+    # print(f"\n left_shoulder: {left_shoulder}, right_shoulder: {right_shoulder}, left_ear: {left_ear}, right_ear: {right_ear}, left_hip: {left_hip}, right_hip: {right_hip}", flush=True)
+
+    # print(f"\n left_wrist: {left_wrist}, right_wrist: {right_wrist}, left_pinky: {left_pinky}, right_pinky: {right_pinky}, left_index: {left_index}, right_index: {right_index}", flush=True)
+
+    # print(f"\n left_thumb: {left_thumb}, right_thumb: {right_thumb}", flush=True)
+
+    # print(f"\n shoulder_mid: {shoulder_mid}, hip_mid: {hip_mid}, ear_mid: {ear_mid}", flush=True)
+
+    neck_inclination = find_angle(ear_mid[0], ear_mid[1], shoulder_mid[0], shoulder_mid[1])
+    back_inclination = find_angle(shoulder_mid[0], shoulder_mid[1], hip_mid[0], hip_mid[1])
+
+    extracted_posture_angles = {
+        "neck_inclination": neck_inclination,
+        "back_inclination": back_inclination,
+        "left_wrist_present": left_wrist_present,
+        "right_wrist_present": right_wrist_present,
+        "left_pinky_present": left_pinky_present,
+        "right_pinky_present": right_pinky_present,
+        "left_index_present": left_index_present,
+        "right_index_present": right_index_present,
+        "left_thumb_present": left_thumb_present,
+        "right_thumb_present": right_thumb_present
+    }
+    logger.debug("extracted_posture_angles: %s", extracted_posture_angles, extra=SAMPLED)  # Added logging
+    return extracted_posture_angles
+
+
+def downscale(image, max_width=VIDEO_MAX_WIDTH):
+    """Shrinks a BGR frame to at most `max_width` before inference; frames already that small are returned as-is."""
+    size = scaled_size(image.shape[1], image.shape[0], max_width)
+    if size is None:
+        return image
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+# ---------------------- POSE ANALYZER ----------------------
+
+class PoseAnalyzer:
+    """
+    One posture analysis over one video source, using a pose graph checked out of a PosePool.
+    All state (sampler settings, summary) belongs to the instance, so a new analyzer is
+    created for every invocation.
+    """
+
+    def __init__(self, pose, threshold=POSTURE_THRESHOLD, fps=VIDEO_SAMPLE_FPS, max_width=VIDEO_MAX_WIDTH,
+                 keyframes_only=KEYFRAMES_ONLY):
+        self.pose = pose
+        self.threshold = threshold
+        self.fps = fps
+        self.max_width = max_width
+        self.keyframes_only = keyframes_only
+        self.summary = PostureSummary()
+
+    def summarize(self, video_path):
+        """
+        Runs pose detection over the sampled frames of `video_path` (a video file path or a
+        list of (timestamp, BGR frame) pairs from the streaming decoder) and returns its
+        PostureSummary. Every sampled frame is analyzed, so the result does not depend on timing.
+        """
+        sampler = FrameSampler(self.fps)
+        timestamps = []
+        try:
+            for timestamp, frame in self.frames(video_path):
+                if not sampler.accept(timestamp):
+                    continue
+                timestamps.append(timestamp)
+                self.process_frame(downscale(frame, self.max_width))
+        except av.FFmpegError as e:
+            logger.error("Could not decode video %s: %s", video_path, e)
+
+        # Real stream time covered by the analyzed frames
+        self.summary.duration = sampled_duration(timestamps, self.fps)
+        return self.summary
+
+    def frames(self, video_path):
+        # Frames already decoded by the session's StreamingDecoder: [(timestamp, BGR ndarray), ...]
+        if isinstance(video_path, list):
+            return video_path
+        return sample_video_frames(video_path, self.fps, self.max_width, self.keyframes_only)
+
+    def process_frame(self, frame):
+        image_height, image_width, _ = frame.shape
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = self.pose.process(frame_rgb)
+
+        if results.pose_landmarks:
+            angles = extract_posture_angles(results.pose_landmarks.landmark, image_width, image_height)
+
+            # check if any points on the hand are present
+            is_hand_present = (
+                    angles["left_wrist_present"] or
+                    angles["right_wrist_present"] or
+                    angles["left_pinky_present"] or
+                    angles["right_pinky_present"] or
+                    angles["left_index_present"] or
+                    angles["right_index_present"] or
+                    angles["left_thumb_present"] or
+                    angles["right_thumb_present"]
+            )
+
+            # accumulate angles and time in posture
+            self.summary.add(angles["back_inclination"], angles["neck_inclination"], is_hand_present,
+                             threshold=self.threshold)
+
+
+class PosePool:
+    """
+    Bounded pool of pre-initialized MediaPipe pose graphs. At most `size` analyses run at
+    once; each gets a graph to itself, reset so no tracking state leaks between videos.
+    """
+
+    def __init__(self, size=POSE_POOL_SIZE, factory=None):
+        self.size = size
+        self._factory = factory or mp_pose.Pose
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._factory())
+
+    @contextmanager
+    def analyzer(self, timeout=POSE_ACQUIRE_TIMEOUT, **analyzer_options):
+        """Checks out a graph and yields a fresh PoseAnalyzer (built with `analyzer_options`) around it."""
+        start_time = time.time()
+        try:
+            pose = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PosePoolExhausted(f"No pose graph became free within {timeout}s")
+
+        waited = time.time() - start_time
+        if waited > 1:
+            logger.debug("Waited %.2fs for a pose graph", waited)
+
+        try:
+            if hasattr(pose, "reset"):
+                pose.reset()
+            yield PoseAnalyzer(pose, **analyzer_options)
+        finally:
+            self._idle.put(pose)
+
+    def close(self):
+        while True:
+            try:
+                pose = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if hasattr(pose, "close"):
+                pose.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pose_pool(size=POSE_POOL_SIZE):
+    """
+    Returns this process's PosePool, building it with `size` graphs on first use. Graphs are
+    never shared across processes: a forked worker builds its own pool.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = PosePool(size)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def summarize_posture(video_path):
+    """
+    Runs pose detection once over a chunk (video file path or decoded frames) and returns its
+    PostureSummary. Window-level posture data is the merge of its chunks' summaries.
+    """
+    start_time = time.time()
+
+    with get_pose_pool().analyzer() as analyzer:
+        summary = analyzer.summarize(video_path)
+
+    logger.debug("Posture summary over %s frames in %.2f seconds", summary.frames, time.time() - start_time)
+    return summary
@@ -0,0 +1,163 @@
+"""
+Compact posture statistics that can be computed once per chunk and merged per window.
+
+MediaPipe runs over each media chunk exactly once, when the chunk arrives. The per-frame
+angles are folded into a PostureSummary (sums, squared sums, min/max and frame counts),
+and a window's posture data is the merge of its chunks' summaries, so every window covers
+all of its chunks without running pose detection again.
+"""
+
+import math
+from dataclasses import dataclass
+
+# Inclination (degrees) above which a frame counts as bad back/neck posture
+POSTURE_THRESHOLD = 5
+
+
+@dataclass
+class PostureSummary:
+    frames: int = 0
+    # Stream time (seconds) covered by the analyzed frames, from their container timestamps
+    duration: float = 0.0
+    back_sum: float = 0.0
+    back_sq_sum: float = 0.0
+    back_min: float = math.inf
+    back_max: float = -math.inf
+    neck_sum: float = 0.0
+    neck_sq_sum: float = 0.0
+    neck_min: float = math.inf
+    neck_max: float = -math.inf
+    good_back_frames: int = 0
+    bad_back_frames: int = 0
+    good_neck_frames: int = 0
+    bad_neck_frames: int = 0
+    hand_frames: int = 0
+    # State of the most recent frame, reported as the current feedback
+    last_back_good: bool = None
+    last_neck_good: bool = None
+    last_hand_present: bool = None
+
+    def add(self, back_angle, neck_angle, hand_present, threshold=POSTURE_THRESHOLD):
+        """Folds one frame's angles into the summary."""
+        self.frames += 1
+
+        self.back_sum += back_angle
+        self.back_sq_sum += back_angle * back_angle
+        self.back_min = min(self.back_min, back_angle)
+        self.back_max = max(self.back_max, back_angle)
+
+        self.neck_sum += neck_angle
+        self.neck_sq_sum += neck_angle * neck_angle
+        self.neck_min = min(self.neck_min, neck_angle)
+        self.neck_max = max(self.neck_max, neck_angle)
+
+        self.last_back_good = back_angle <= threshold
+        self.last_neck_good = neck_angle <= threshold
+        if self.last_back_good:
+            self.good_back_frames += 1
+        else:
+            self.bad_back_frames += 1
+        if self.last_neck_good:
+            self.good_neck_frames += 1
+        else:
+            self.bad_neck_frames += 1
+
+        self.last_hand_present = bool(hand_present)
+        if hand_present:
+            self.hand_frames += 1
+
+    def merge(self, later):
+        """
+        Returns the summary of this chunk followed by `later`. A chunk in which no pose was
+        detected adds nothing, not even its duration, since its posture is unknown.
+        """
+        if not later.frames:
+            return self
+        if not self.frames:
+            return later
+        return PostureSummary(
+            frames=self.frames + later.frames,
+            duration=self.duration + later.duration,
+            back_sum=self.back_sum + later.back_sum,
+            back_sq_sum=self.back_sq_sum + later.back_sq_sum,
+            back_min=min(self.back_min, later.back_min),
+            back_max=max(self.back_max, later.back_max),
+            neck_sum=self.neck_sum + later.neck_sum,
+            neck_sq_sum=self.neck_sq_sum + later.neck_sq_sum,
+            neck_min=min(self.neck_min, later.neck_min),
+            neck_max=max(self.neck_max, later.neck_max),
+            good_back_frames=self.good_back_frames + later.good_back_frames,
+            bad_back_frames=self.bad_back_frames + later.bad_back_frames,
+            good_neck_frames=self.good_neck_frames + later.good_neck_frames,
+            bad_neck_frames=self.bad_neck_frames + later.bad_neck_frames,
+            hand_frames=self.hand_frames + later.hand_frames,
+            last_back_good=later.last_back_good,
+            last_neck_good=later.last_neck_good,
+            last_hand_present=later.last_hand_present,
+        )
+
+    @classmethod
+    def merge_all(cls, summaries):
+        merged = cls()
+        for summary in summaries:
+            if summary is not None:
+                merged = merged.merge(summary)
+        return merged
+
+    @property
+    def back_std(self):
+        return _std(self.frames, self.back_sum, self.back_sq_sum)
+
+    @property
+    def neck_std(self):
+        return _std(self.frames, self.neck_sum, self.neck_sq_sum)
+
+    def to_posture_data(self, video_duration=None):
+        """
+        Formats the summary as the dict returned by analyze_posture. Good/bad posture times
+        split `video_duration` (by default the real duration of the analyzed video) by the
+        share of frames in each posture.
+        """
+        if video_duration is None:
+            video_duration = self.duration
+        if self.frames:
+            mean_back = self.back_sum / self.frames
+            range_back = self.back_max - self.back_min
+            mean_neck = self.neck_sum / self.frames
+            range_neck = self.neck_max - self.neck_min
+        else:
+            mean_back = range_back = mean_neck = range_neck = 0
+
+        back_frames = self.good_back_frames + self.bad_back_frames
+        neck_frames = self.good_neck_frames + self.bad_neck_frames
+        good_back_time = self.good_back_frames / back_frames * video_duration if back_frames else 0
+        bad_back_time = self.bad_back_frames / back_frames * video_duration if back_frames else 0
+        good_neck_time = self.good_neck_frames / neck_frames * video_duration if neck_frames else 0
+        bad_neck_time = self.bad_neck_frames / neck_frames * video_duration if neck_frames else 0
+
+        return {
+            "mean_back_inclination": mean_back,
+            "range_back_inclination": range_back,
+            "mean_neck_inclination": mean_neck,
+            "range_neck_inclination": range_neck,  # body fluidity (range)
+            "back_feedback": _feedback(self.last_back_good, "back"),
+            "neck_feedback": _feedback(self.last_neck_good, "neck"),
+            "good_back_time": round(good_back_time, 2),  # body posture score (time)
+            "bad_back_time": round(bad_back_time, 2),
+            "good_neck_time": round(good_neck_time, 2),
+            "bad_neck_time": round(bad_neck_time, 2),
+            "is_hand_present": self.last_hand_present if self.last_hand_present else 0,
+        }
+
+
+def _std(count, total, sq_total):
+    if not count:
+        return 0.0
+    mean = total / count
+    return math.sqrt(max(sq_total / count - mean * mean, 0.0))
+
+
+def _feedback(is_good, body):
+    if is_good is None:
+        return ""
+    return f"Good {body} posture" if is_good else f"Bad {body} posture"
@@ -0,0 +1,246 @@
+"""
+Mergeable per-chunk prosody statistics.
+
+Windows slide by one chunk, so running Praat over the whole window pushes every second of
+speech through pitch and intensity analysis ANALYSIS_WINDOW_SIZE times. Instead each chunk is
+analysed once when it arrives and reduced to a ProsodySummary; a window's prosody features
+are merged from its chunks' summaries without touching audio again:
+
+- pitch variability from the voiced-frame moments (count, sum, sum of squares)
+- volume (median) and the pause threshold (30th percentile) from a sparse intensity histogram
+- pauses by grouping below-threshold intensity frames across the whole window, so a pause
+  that straddles a chunk boundary is carried over into a single segment
+- pace from the summed word counts and durations
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import parselmouth
+
+from .audio_decoding import ANALYSIS_SAMPLE_RATE
+
+# Resolution of the intensity histogram (dB). Percentiles are exact to within half a bin.
+INTENSITY_RESOLUTION = 0.01
+
+# Pause detection parameters (also used by sentiment_analysis.get_pauses)
+MIN_PAUSE_DURATION = 0.4
+LONG_PAUSE_DURATION = 0.8
+PAUSE_GAP = 0.2
+PAUSE_PERCENTILE = 30
+
+
+def load_sound(audio):
+    """
+    Returns a Praat Sound for `audio`, which may be a file path, an existing
+    parselmouth.Sound, or a mono PCM numpy array sampled at ANALYSIS_SAMPLE_RATE.
+    """
+    if isinstance(audio, parselmouth.Sound):
+        return audio
+    if isinstance(audio, np.ndarray):
+        return parselmouth.Sound(audio.astype(np.float64, copy=False), sampling_frequency=ANALYSIS_SAMPLE_RATE)
+    return parselmouth.Sound(audio)
+
+
+class AudioAnalysisContext:
+    """
+    One piece of audio loaded once, with its Praat analyses computed on first use and
+    memoized, so every extractor reading it shares a single Sound, Pitch and Intensity.
+    """
+
+    def __init__(self, audio):
+        self._audio = audio
+
+    @classmethod
+    def of(cls, audio):
+        """Returns `audio` itself if it already is a context, otherwise a new context around it."""
+        return audio if isinstance(audio, cls) else cls(audio)
+
+    @cached_property
+    def sound(self):
+        return load_sound(self._audio)
+
+    @cached_property
+    def duration(self):
+        return self.sound.duration
+
+    @cached_property
+    def pitch(self):
+        return self.sound.to_pitch()
+
+    @cached_property
+    def voiced_frequencies(self):
+        """Pitch (Hz) of the voiced frames."""
+        frequencies = self.pitch.selected_array["frequency"]
+        return frequencies[frequencies > 0]
+
+    @cached_property
+    def intensity(self):
+        return self.sound.to_intensity()
+
+    @cached_property
+    def intensity_values(self):
+        return self.intensity.values[0]
+
+    @cached_property
+    def intensity_times(self):
+        return self.intensity.xs()
+
+
+@dataclass
+class ProsodySummary:
+    duration: float = 0.0
+    # Moments of the voiced pitch frames (Hz)
+    pitch_count: int = 0
+    pitch_sum: float = 0.0
+    pitch_sq_sum: float = 0.0
+    # Sparse intensity histogram: quantized dB bins and their frame counts
+    intensity_bins: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    intensity_counts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    # Intensity track, needed to place pauses once the window threshold is known
+    intensity_values: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))
+    intensity_t0: float = 0.0
+    intensity_dt: float = 0.0
+    word_count: int = 0
+
+    @classmethod
+    def from_sound(cls, sound):
+        """Runs Praat pitch and intensity analysis once over a chunk's audio (see AudioAnalysisContext)."""
+        context = AudioAnalysisContext.of(sound)
+        voiced = context.voiced_frequencies
+        intensity = context.intensity
+        values = context.intensity_values
+        bins, counts = np.unique(np.round(values / INTENSITY_RESOLUTION).astype(np.int64), return_counts=True)
+
+        return cls(
+            duration=context.duration,
+            pitch_count=int(voiced.size),
+            pitch_sum=float(voiced.sum()),
+            pitch_sq_sum=float(np.square(voiced).sum()),
+            intensity_bins=bins,
+            intensity_counts=counts,
+            intensity_values=values.astype(np.float32),
+            intensity_t0=intensity.x1,
+            intensity_dt=intensity.dx,
+        )
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate=ANALYSIS_SAMPLE_RATE):
+        """Summarizes a chunk of mono PCM samples at `sample_rate`."""
+        sound = parselmouth.Sound(np.asarray(samples, dtype=np.float64), sampling_frequency=sample_rate)
+        return cls.from_sound(sound)
+
+    def intensity_times(self, offset=0.0):
+        """Times (s) of the intensity frames, shifted by `offset` (the chunk's start within the window)."""
+        return offset + self.intensity_t0 + self.intensity_dt * np.arange(self.intensity_values.size)
+
+
+def merge_prosody(summaries):
+    """
+    Merges consecutive chunk summaries into the window's raw prosody features:
+    pitch_variability, volume, duration, word_count, appropriate_pauses and long_pauses.
+    """
+    summaries = list(summaries)
+    duration = sum(s.duration for s in summaries)
+    word_count = sum(s.word_count for s in summaries)
+
+    # Pitch: population standard deviation from the merged moments
+    pitch_count = sum(s.pitch_count for s in summaries)
+    if pitch_count:
+        pitch_mean = sum(s.pitch_sum for s in summaries) / pitch_count
+        pitch_var = sum(s.pitch_sq_sum for s in summaries) / pitch_count - pitch_mean ** 2
+        pitch_variability = float(np.sqrt(max(pitch_var, 0.0)))
+    else:
+        pitch_variability = 0
+
+    # Intensity: merge the sparse histograms and read off the percentiles
+    bins, counts = _merge_histograms(summaries)
+    volume = histogram_percentile(bins, counts, 50)
+    pause_threshold = histogram_percentile(bins, counts, PAUSE_PERCENTILE)
+
+    # Pauses: below-threshold frames of every chunk on the window's timeline
+    pause_times = []
+    offset = 0.0
+    for s in summaries:
+        below = s.intensity_values < pause_threshold
+        pause_times.append(s.intensity_times(offset)[below])
+        offset += s.duration
+    pause_times = np.concatenate(pause_times) if pause_times else np.zeros(0)
+    appropriate_pauses, long_pauses = classify_pauses(pause_times)
+
+    return {
+        "pitch_variability": pitch_variability,
+        "volume": volume,
+        "duration": duration,
+        "word_count": word_count,
+        "appropriate_pauses": appropriate_pauses,
+        "long_pauses": long_pauses,
+    }
+
+
+def pause_segments(pause_times, gap=PAUSE_GAP):
+    """
+    Run-length encodes sorted below-threshold frame times into pauses: a new pause starts
+    wherever consecutive frames are more than `gap` seconds apart. Returns (starts, ends).
+    """
+    pause_times = np.asarray(pause_times, dtype=np.float64)
+    if pause_times.size == 0:
+        return pause_times, pause_times
+    breaks = np.flatnonzero(np.diff(pause_times) > gap)
+    starts = pause_times[np.concatenate(([0], breaks + 1))]
+    ends = pause_times[np.concatenate((breaks, [pause_times.size - 1]))]
+    return starts, ends
+
+
+def classify_pauses(pause_times, min_pause_duration=MIN_PAUSE_DURATION, long_pause_duration=LONG_PAUSE_DURATION,
+                    gap=PAUSE_GAP):
+    """
+    Groups sorted below-threshold frame times into pauses and counts appropriate and long
+    pauses. Returns (1, 1) when no pauses are found, matching get_pauses.
+    """
+    starts, ends = pause_segments(pause_times, gap)
+    durations = ends - starts
+
+    appropriate_pauses = int(np.count_nonzero((durations >= min_pause_duration) & (durations < long_pause_duration)))
+    long_pauses = int(np.count_nonzero(durations >= long_pause_duration))
+
+    if appropriate_pauses == 0 and long_pauses == 0:
+        return 1, 1
+    return appropriate_pauses, long_pauses
+
+
+def find_pauses(times, values, percentile=PAUSE_PERCENTILE, **thresholds):
+    """
+    Pause counts of one intensity track: frames below the track's `percentile` intensity
+    form the pause mask, which is grouped and classified by classify_pauses.
+    """
+    values = np.asarray(values)
+    if values.size == 0:
+        return 1, 1
+    mask = values < np.percentile(values, percentile)
+    return classify_pauses(np.asarray(times)[mask], **thresholds)
+
+
+def histogram_percentile(bins, counts, q):
+    """np.percentile (linear interpolation) over the values described by a sparse histogram."""
+    total = int(counts.sum())
+    if total == 0:
+        return 0.0
+
+    rank = q / 100 * (total - 1)
+    lower, upper = int(np.floor(rank)), int(np.ceil(rank))
+    cumulative = np.cumsum(counts)
+    lower_value = bins[np.searchsorted(cumulative, lower, side="right")] * INTENSITY_RESOLUTION
+    upper_value = bins[np.searchsorted(cumulative, upper, side="right")] * INTENSITY_RESOLUTION
+    return float(lower_value + (upper_value - lower_value) * (rank - lower))
+
+
+def _merge_histograms(summaries):
+    if not summaries:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    all_bins = np.concatenate([s.intensity_bins for s in summaries])
+    all_counts = np.concatenate([s.intensity_counts for s in summaries])
+    bins, inverse = np.unique(all_bins, return_inverse=True)
+    counts = np.bincount(inverse, weights=all_counts, minlength=bins.size).astype(np.int64)
+    return bins, counts
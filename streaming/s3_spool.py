@@ -0,0 +1,329 @@
+"""
+Write-behind S3 uploads through a durable local spool.
+
+Uploading a chunk used to sit between receiving it and saving its SessionChunk row: a slow
+or failed upload held back (or lost) the row, and with it the window analysis saved
+against that row. Now a chunk is first hard-linked (or copied) into a spool directory next
+to a small JSON manifest, the row is saved straight away with upload_status "pending", and
+a dedicated uploader moves the file to S3 in the background:
+
+- A fixed set of uploader threads share one S3 client with a connection pool sized for
+  them, and a TransferConfig that switches to parallel multipart transfers for large files.
+- A failed upload is retried with exponential backoff and jitter, up to
+  S3_UPLOAD_MAX_ATTEMPTS times, after which the row is marked "failed" and the spooled file
+  is kept for the next start.
+- Spooled files survive a crash: the uploader re-queues every manifest it finds on start.
+  Several processes (daphne nodes, Celery workers) can share one spool directory: each
+  entry has a lock file that its owning process holds an flock on until the upload is
+  done, and recovery only takes entries whose lock is free, i.e. whose owner has exited.
+- When an upload completes the spooled file is removed and the row marked "uploaded".
+
+`flush(prefix)` waits until nothing under a key prefix is still queued, e.g. before a
+session's video is compiled from its uploaded chunks.
+"""
+
+import json
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; recovery then assumes one process per spool directory
+    fcntl = None
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from .metrics import observe_stage
+from .log import SAMPLED, get_logger
+
+logger = get_logger(__name__)
+
+S3_SPOOL_DIR = os.getenv("S3_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "engagex-s3-spool"))
+
+# Uploader threads, and parallel part transfers within one multipart upload
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", 4))
+S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", 4))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", 8))
+
+# Attempts per upload, and the backoff between them (base * 2^attempt seconds, capped)
+S3_UPLOAD_MAX_ATTEMPTS = int(os.getenv("S3_UPLOAD_MAX_ATTEMPTS", 8))
+S3_UPLOAD_BACKOFF_BASE = float(os.getenv("S3_UPLOAD_BACKOFF_BASE", 1.0))
+S3_UPLOAD_BACKOFF_MAX = float(os.getenv("S3_UPLOAD_BACKOFF_MAX", 60.0))
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    multipart_chunksize=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    max_concurrency=S3_MULTIPART_CONCURRENCY,
+    use_threads=True,
+)
+
+CLIENT_CONFIG = Config(
+    # Every uploader thread can run a full set of part transfers at once
+    max_pool_connections=S3_UPLOAD_WORKERS * S3_MULTIPART_CONCURRENCY,
+    connect_timeout=5,
+    read_timeout=60,
+    tcp_keepalive=True,
+    # botocore retries transient errors within an attempt; the spool retries whole uploads
+    retries={"mode": "standard", "max_attempts": 3},
+)
+
+UPLOAD_PENDING = "pending"
+UPLOAD_UPLOADED = "uploaded"
+UPLOAD_FAILED = "failed"
+
+
+@dataclass
+class SpoolEntry:
+    path: str  # spooled copy of the file
+    bucket: str
+    key: str
+    chunk_id: int = None  # SessionChunk whose upload_status follows this upload
+    attempts: int = 0
+
+    @property
+    def manifest_path(self):
+        return f"{self.path}.json"
+
+    @property
+    def lock_path(self):
+        return f"{self.path}.lock"
+
+    def save(self):
+        # Written to a temporary file and renamed, so a crash never leaves a partial manifest
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(asdict(self), file)
+        os.replace(temp_path, self.manifest_path)
+
+    @classmethod
+    def load(cls, manifest_path):
+        with open(manifest_path) as file:
+            return cls(**json.load(file))
+
+    def remove(self):
+        for path in (self.path, self.manifest_path, self.lock_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Returns the process-wide S3 client, pooled for the uploader threads and video compilation."""
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client("s3", region_name=os.environ.get("AWS_REGION"), config=CLIENT_CONFIG)
+        return _s3_client
+
+
+def update_chunk_status(entry, status):
+    """Default completion callback: records the upload outcome on the entry's SessionChunk."""
+    if entry.chunk_id is None:
+        return
+    from django.db import close_old_connections
+    from practice_sessions.models import SessionChunk
+
+    close_old_connections()
+    SessionChunk.objects.filter(id=entry.chunk_id).update(upload_status=status)
+
+
+class S3Uploader:
+    def __init__(self, spool_dir=S3_SPOOL_DIR, workers=S3_UPLOAD_WORKERS, client=None,
+                 transfer_config=TRANSFER_CONFIG, max_attempts=S3_UPLOAD_MAX_ATTEMPTS,
+                 backoff_base=S3_UPLOAD_BACKOFF_BASE, backoff_max=S3_UPLOAD_BACKOFF_MAX,
+                 on_complete=update_chunk_status):
+        self.spool_dir = spool_dir
+        self.client = client or get_s3_client()
+        self.transfer_config = transfer_config
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_complete = on_complete  # on_complete(entry, status) after the last attempt
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._pending = {}  # spooled path -> entry, from submit until the upload completes or gives up
+        self._locks = {}  # spooled path -> open lock file, flocked while this process owns the entry
+        self._condition = threading.Condition()
+        self._threads = [threading.Thread(target=self._work, name=f"s3-uploader-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def spool(self, source_path, bucket, key):
+        """Places a durable copy of `source_path` in the spool. Returns its SpoolEntry (not yet queued)."""
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}_{os.path.basename(source_path)}")
+        entry = SpoolEntry(path, bucket, key)
+        # Locked before the manifest exists, so another process's recover() never takes it
+        self._lock(entry)
+        try:
+            try:
+                os.link(source_path, path)  # no copy when the spool is on the same filesystem
+            except OSError:
+                shutil.copyfile(source_path, path)
+            entry.save()
+        except BaseException:
+            entry.remove()
+            self._unlock(path)
+            raise
+        return entry
+
+    def submit(self, entry, chunk_id=None):
+        """Queues a spooled entry for upload; `chunk_id` is the SessionChunk to mark when it completes."""
+        entry.chunk_id = chunk_id
+        entry.save()
+        with self._condition:
+            self._pending[entry.path] = entry
+        self._queue.put(entry)
+
+    def recover(self):
+        """
+        Queues every spooled entry left by a process that has exited. Entries still owned by
+        a live process (this one included) are left to it. Returns how many were queued.
+        """
+        count = 0
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(".json"):
+                continue
+            manifest_path = os.path.join(self.spool_dir, name)
+            entry_path = manifest_path[:-len(".json")]
+            if entry_path in self._locks:
+                continue
+            if not self._lock(SpoolEntry(entry_path, None, None)):
+                continue  # another live process owns it
+            try:
+                # Read once the lock is held: the previous owner may have updated it until it exited
+                entry = SpoolEntry.load(manifest_path)
+            except FileNotFoundError:
+                # Uploaded and removed meanwhile; drop the lock file opened above
+                SpoolEntry(entry_path, None, None).remove()
+                self._unlock(entry_path)
+                continue
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning("Unreadable spool manifest %s: %s", name, e)
+                self._unlock(entry_path)
+                continue
+            if not os.path.exists(entry.path):
+                entry.remove()
+                self._unlock(entry.path)
+                continue
+            entry.attempts = 0
+            self.submit(entry, entry.chunk_id)
+            count += 1
+        if count:
+            logger.info("Re-queued %s spooled uploads", count)
+        return count
+
+    @property
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self, prefix="", timeout=None):
+        """Waits until no upload with a key starting with `prefix` is pending. Returns False on timeout."""
+        def done():
+            return not any(entry.key.startswith(prefix) for entry in self._pending.values())
+
+        with self._condition:
+            return self._condition.wait_for(done, timeout)
+
+    def _work(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                self._upload(entry)
+            except Exception as e:
+                logger.exception("Unexpected error uploading %s: %s", entry.key, e)
+
+    def _upload(self, entry):
+        start_time = time.time()
+        try:
+            self.client.upload_file(entry.path, entry.bucket, entry.key, Config=self.transfer_config)
+        except FileNotFoundError:
+            # Nothing left to retry with
+            logger.warning("Spooled file for %s is missing; dropping the upload", entry.key)
+            entry.remove()
+            self._finish(entry, UPLOAD_FAILED)
+            return
+        except Exception as e:
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                logger.error("Giving up on %s after %s attempts: %s", entry.key, entry.attempts, e)
+                # The spooled file stays for the next process to retry
+                self._finish(entry, UPLOAD_FAILED)
+                return
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (entry.attempts - 1)) * random.uniform(0.5, 1.0)
+            logger.warning("Upload of %s failed (%s); retry %s in %.1fs", entry.key, e, entry.attempts, delay)
+            entry.save()
+            timer = threading.Timer(delay, self._queue.put, args=(entry,))
+            timer.daemon = True
+            timer.start()
+            return
+
+        logger.debug("Uploaded %s after %.2f seconds", entry.key, time.time() - start_time, extra=SAMPLED)
+        observe_stage("s3_upload", time.time() - start_time)
+        entry.remove()
+        self._finish(entry, UPLOAD_UPLOADED)
+
+    def _finish(self, entry, status):
+        try:
+            if self.on_complete is not None:
+                self.on_complete(entry, status)
+        except Exception as e:
+            logger.warning("Could not record %s upload of %s: %s", status, entry.key, e)
+        finally:
+            # A failed entry's files stay in the spool, free for the next process to retry
+            self._unlock(entry.path)
+            with self._condition:
+                self._pending.pop(entry.path, None)
+                self._condition.notify_all()
+
+    def _lock(self, entry):
+        """Takes the entry's lock file for this process. Returns False if another process holds it."""
+        if fcntl is None:
+            self._locks[entry.path] = None
+            return True
+        lock_file = open(entry.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._locks[entry.path] = lock_file
+        return True
+
+    def _unlock(self, path):
+        lock_file = self._locks.pop(path, None)
+        if lock_file is not None:
+            lock_file.close()  # releases the flock
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_uploader():
+    """
+    Returns the process-wide S3Uploader, re-queueing uploads spooled by a previous process on
+    first use. Scanning the spool touches the disk, so async callers use asyncio.to_thread.
+    """
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = S3Uploader()
+            _uploader.recover()
+        return _uploader
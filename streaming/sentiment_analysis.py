@@ -1,77 +1,64 @@
 import os
 import time
+import asyncio
 import json
-import math as m
-import threading
-from queue import Queue
 import numpy as np
 import pandas as pd
-import parselmouth
-import cv2
-import mediapipe as mp
-from openai import OpenAI
 import subprocess
-from deepgram import (
-    DeepgramClient,
-    PrerecordedOptions,
-    FileSource,
-)  # pip install deepgram-sdk
 
-from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from django.conf import settings
+from .clients import get_clients, deepgram_transcript, DEEPGRAM_LISTEN_URL, DEEPGRAM_OPTIONS
+from .llm_cache import get_llm_cache
+from .log import get_logger
+from .metrics import time_stage
+from .pose_analysis import summarize_posture
+from .prosody import AudioAnalysisContext, merge_prosody, find_pauses
 
-load_dotenv()
-
-# load OpenAI API Key
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-# initialize Mediapipe Pose Detection
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose()
-
-# queues for thread communication
-frame_queue = Queue(maxsize=5)
+logger = get_logger(__name__)
 
-# synchronization and STOP flag for thread termination
-stop_flag = threading.Event()
-
-results_data = {
-    "good_back_frames": 0,
-    "bad_back_frames": 0,
-    "good_neck_frames": 0,
-    "bad_neck_frames": 0,
-    "back_angles": [],
-    "neck_angles": [],
-    "back_feedback": "",
-    "neck_feedback": "",
-    "is_hand_present": "",
-}
+load_dotenv()
 
-lock = threading.Lock()
+# Shared, pooled OpenAI client (see clients.py); async callers use get_clients().async_openai()
+client = get_clients().openai()
 
 
-def ai_audience_question(transcript):
+def audience_question_request(transcript):
+    """Chat completion arguments for ai_audience_question."""
     prompt = f"""
         You are a curious audience member at a talk or presentation. Based on the following speaker transcript, ask a thoughtful and insightful question
         ONLY return the question
         Transcript:\n{transcript}\n"""
 
+    return dict(
+        model="gpt-4o",  # You can change to gpt-3.5-turbo or another if preferred
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant"},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=100,
+    )
+
+
+def ai_audience_question(transcript):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",  # You can change to gpt-3.5-turbo or another if preferred
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=100,
-        )
-        question = response.choices[0].message.content.strip()
+        # Sampled on purpose, so not served from the response cache (see llm_cache.py)
+        completion = client.chat.completions.create(**audience_question_request(transcript))
+        question = completion.choices[0].message.content.strip()
         return question
     except Exception as e:
-        print(f"Error generating audience question: {e}")
+        logger.error("Error generating audience question: %s", e)
+        return None
+
+
+async def ai_audience_question_async(transcript):
+    """ai_audience_question awaited on the event loop's AsyncOpenAI client."""
+    try:
+        completion = await get_clients().async_openai().chat.completions.create(**audience_question_request(transcript))
+        return completion.choices[0].message.content.strip()
+    except Exception as e:
+        logger.error("Error generating audience question: %s", e)
         return None
 
 
@@ -187,7 +174,7 @@ def score_posture(angle, min_value, max_value, body):
     else:
         rationale = f"Excessive {body}; suggests restlessness or discomfort."
 
-    print(f"score_posture: {body}: {angle} {rationale}")
+    logger.debug("score_posture: %s: %s %s", body, angle, rationale)
 
     return score, rationale
 
@@ -195,103 +182,71 @@ def score_posture(angle, min_value, max_value, body):
 # ---------------------- FEATURE EXTRACTION FUNCTIONS ----------------------
 
 def get_pitch_variability(audio_file):
-    """extracts pitch variability using Praat."""
-    sound = parselmouth.Sound(audio_file)
-    pitch = sound.to_pitch()
-    frequencies = pitch.selected_array["frequency"]
-    return np.std([f for f in frequencies if f > 0]) or 0
+    """extracts pitch variability using Praat. audio_file may be anything AudioAnalysisContext accepts, or a context."""
+    context = AudioAnalysisContext.of(audio_file)
+    voiced = context.voiced_frequencies
+    return np.std(voiced) if voiced.size else 0
 
 
 def get_volume(audio_file, top_db=20):
     """extracts volume (intensity in dB) using Praat."""
-    sound = parselmouth.Sound(audio_file)
-    intensity = sound.to_intensity()
-    num_low = [low for low in intensity.values[0] if low < top_db]
-    return np.median(intensity.values[0])
+    context = AudioAnalysisContext.of(audio_file)
+    return np.median(context.intensity_values)
 
 
 def get_pace(audio_file, transcript):
-    """calculates pauses."""
-    start_time = time.time()
-
-    sound = parselmouth.Sound(audio_file)
-    duration = sound.duration
-
+    """calculates pace (words per second)."""
+    context = AudioAnalysisContext.of(audio_file)
     word_count = len(transcript.split())
-
-    elapsed_time = time.time() - start_time
-    # print(f"\nElapsed time for pace: {elapsed_time:.2f} seconds")
-    return word_count / duration
+    return word_count / context.duration
 
 
 def get_pauses(audio_file):
-    import numpy as np
-    sound = parselmouth.Sound(audio_file)
-
-    # Tunable values
-    # intensity_threshold = 30
-    min_pause_duration = 0.4
-    long_pause_duration = 0.8
-
-    # Extract intensity
-    intensity = sound.to_intensity()
-    times = intensity.xs()
-    values = intensity.values[0]
-
-    print("Intensity value stats:", np.min(values), np.max(values), np.mean(values))
-
-    # Optionally use percentile threshold
-    intensity_threshold = np.percentile(values, 30)
-
-    pause_times = [times[i] for i, val in enumerate(values) if val < intensity_threshold]
-
-    if not pause_times:
-        print("NO PAUSES DETECTED")
-        return 1, 1
-
-    # Group into continuous pauses
-    pauses = []
-    start_time = pause_times[0]
-
-    for i in range(1, len(pause_times)):
-        if pause_times[i] - pause_times[i - 1] > 0.2:
-            end_time = pause_times[i - 1]
-            pauses.append((start_time, end_time))
-            start_time = pause_times[i]
-    pauses.append((start_time, pause_times[-1]))
-
-    # Print pause segments
-    print(f"Detected pause segments: {pauses}")
-
-    appropriate_pauses = sum(min_pause_duration <= (end - start) < long_pause_duration for start, end in pauses)
-    long_pauses = sum((end - start) >= long_pause_duration for start, end in pauses)
-
-    print(f"Appropriate pauses: {appropriate_pauses}, Long pauses: {long_pauses}")
-
-    if appropriate_pauses == 0 and long_pauses == 0:
-        return 1, 1
+    """
+    counts appropriate (0.4-0.8 s) and long (>= 0.8 s) pauses: intensity frames below the
+    30th percentile, grouped into pauses wherever they are more than 0.2 s apart.
+    """
+    context = AudioAnalysisContext.of(audio_file)
+    appropriate_pauses, long_pauses = find_pauses(context.intensity_times, context.intensity_values)
 
+    logger.debug("Appropriate pauses: %s, Long pauses: %s", appropriate_pauses, long_pauses)
     return appropriate_pauses, long_pauses
 
 
 # ---------------------- PROCESS AUDIO ----------------------
 
 def process_audio(audio_file, transcript):
-    """processes audio file with Praat in parallel to extract features."""
+    """processes audio (file path or PCM array) with Praat to extract features."""
     start_time = time.time()
 
-    with ThreadPoolExecutor() as executor:
-        future_pitch_variability = executor.submit(get_pitch_variability, audio_file)
-        future_volume = executor.submit(get_volume, audio_file)
-        future_pace = executor.submit(get_pace, audio_file, transcript)
-        future_pauses = executor.submit(get_pauses, audio_file)
+    # the sound is loaded once; pitch and intensity are computed once and shared by the extractors
+    context = AudioAnalysisContext(audio_file)
+    pitch_variability = get_pitch_variability(context)
+    avg_volume = get_volume(context)
+    pace = get_pace(context, transcript)
+    appropriate_pauses, long_pauses = get_pauses(context)
+
+    results = build_audio_results(pitch_variability, avg_volume, pace, appropriate_pauses, long_pauses)
+
+    elapsed_time = time.time() - start_time
+    logger.debug("Elapsed time for process_audio: %.2f seconds", elapsed_time)
+    # print(f"\nMetrics: \n", results)
+    return results
+
+
+def process_prosody(summaries):
+    """
+    same output as process_audio, merged from the window's per-chunk ProsodySummary objects
+    (see streaming/prosody.py) instead of re-running Praat over the window audio.
+    """
+    features = merge_prosody(summaries)
+    pace = features["word_count"] / features["duration"] if features["duration"] else 0
+    return build_audio_results(features["pitch_variability"], features["volume"], pace,
+                               features["appropriate_pauses"], features["long_pauses"])
 
-    # fetch results from threads
-    pitch_variability = future_pitch_variability.result()
-    avg_volume = future_volume.result()
-    pace = future_pace.result()
-    appropriate_pauses, long_pauses = future_pauses.result()
 
+def build_audio_results(pitch_variability, avg_volume, pace, appropriate_pauses, long_pauses):
+    """scores the extracted audio features and builds the Metrics/Scores dict."""
     # score dalculation
     volume_score, volume_rationale = score_volume(avg_volume)
     pitch_variability_score, pitch_variability_rationale = score_pv(pitch_variability)  # (15, 85)
@@ -318,315 +273,60 @@ def process_audio(audio_file, transcript):
             "Pause Score": pause_score,
         }
     }
-    print(F"RESULTS JSON {results} \n")
-
-    elapsed_time = time.time() - start_time
-    print(f"\nElapsed time for process_audio: {elapsed_time:.2f} seconds")
-    # print(f"\nMetrics: \n", results)
+    logger.debug("RESULTS JSON %s", results)
     return results
 
 
 # ---------------------- TRANSCRIPTION ----------------------
 
+def read_audio(audio_file):
+    # Path to the audio file, or the in-memory media bytes (webm/opus is accepted as-is)
+    if isinstance(audio_file, (bytes, bytearray, memoryview)):
+        return bytes(audio_file)
+    with open(audio_file, "rb") as file:
+        return file.read()
+
+
 # no more whisper, change transcript to contain filler words (duplicate)
 def transcribe_audio(audio_file):
-    # Path to the audio file
-    api_key = settings.DEEPGRAM_API_KEY
-
     try:
-        # STEP 1 Create a Deepgram client using the API key
-        deepgram = DeepgramClient(api_key=api_key)
-
-        with open(audio_file, "rb") as file:
-            buffer_data = file.read()
-
-        payload: FileSource = {
-            "buffer": buffer_data,
-        }
-
-        # STEP 2: Configure Deepgram options for audio analysis
-        options = PrerecordedOptions(
-            model="nova-3",
-            smart_format=True,
-            filler_words=True,
-        )
-
-        # STEP 3: Call the transcribe_file method with the text payload and options
-        response = deepgram.listen.rest.v("1").transcribe_file(payload, options)
-
-        # STEP 4: Print the response
-        transcript = response['results']['channels'][0]['alternatives'][0]['transcript']
-        return transcript
+        # Deepgram's prerecorded endpoint over the shared keep-alive pool (see clients.py)
+        response = get_clients().deepgram().post(DEEPGRAM_LISTEN_URL, params=DEEPGRAM_OPTIONS, content=read_audio(audio_file))
+        return deepgram_transcript(response)
 
     except Exception as e:
-        print(f"Exception: {e}")
-
-
-# Calculate Distance
-def find_distance(x1, y1, x2, y2):
-    return m.sqrt(((x2 - x1) ** 2) + ((y2 - y1) ** 2))
-
-
-# Calculate Angles
-def find_angle(x1, y1, x2, y2):
-    dx, dy = x2 - x1, y2 - y1
-    vertical = (0, 1)
-    dot = dy
-    norm_vector = find_distance(x1, y1, x2, y2)
-    if norm_vector == 0:
-        return 0.0
-    cos_theta = max(min(dot / norm_vector, 1.0), -1.0)
-    return m.degrees(m.acos(cos_theta))
-
-
-# Extract posture angles
-def extract_posture_angles(landmarks, image_width, image_height):
-    def to_pixel(landmark):
-        return (int(landmark.x * image_width), int(landmark.y * image_height))
+        logger.error("Exception: %s", e)
 
-    visibility_threshold = 0.5
 
-    left_pinky_present = right_pinky_present = left_index_present = right_index_present = left_thumb_present = right_thumb_present = left_wrist_present = right_wrist_present = False
-
-    left_shoulder = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value])
-    right_shoulder = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value])
-
-    left_ear = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_EAR.value])
-    right_ear = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_EAR.value])
-
-    left_hip = to_pixel(landmarks[mp_pose.PoseLandmark.LEFT_HIP.value])
-    right_hip = to_pixel(landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value])
-
-    left_wrist = landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value]
-    right_wrist = landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value]
-
-    left_pinky = (landmarks[mp_pose.PoseLandmark.LEFT_PINKY.value])
-    right_pinky = (landmarks[mp_pose.PoseLandmark.RIGHT_PINKY.value])
-
-    left_index = (landmarks[mp_pose.PoseLandmark.LEFT_INDEX.value])
-    right_index = (landmarks[mp_pose.PoseLandmark.RIGHT_INDEX.value])
-
-    left_thumb = (landmarks[mp_pose.PoseLandmark.LEFT_THUMB.value])
-    right_thumb = (landmarks[mp_pose.PoseLandmark.RIGHT_THUMB.value])
-
-    if left_wrist.visibility > visibility_threshold:
-        left_wrist_present = True
-        left_wrist = to_pixel(left_wrist)
-
-    if right_wrist.visibility > visibility_threshold:
-        right_wrist_present = True
-        right_wrist = to_pixel(right_wrist)
-
-    if left_pinky.visibility > visibility_threshold:
-        left_pinky_present = True
-        left_pinky = to_pixel(left_pinky)
-
-    if right_pinky.visibility > visibility_threshold:
-        right_pinky_present = True
-        right_pinky = to_pixel(right_pinky)
-
-    if left_index.visibility > visibility_threshold:
-        left_index_present = True
-        left_index = to_pixel(left_index)
-
-    if right_index.visibility > visibility_threshold:
-        right_index_present = True
-        right_index = to_pixel(right_index)
-
-    if left_thumb.visibility > visibility_threshold:
-        left_thumb_present = True
-        left_thumb = to_pixel(left_thumb)
-
-    if right_thumb.visibility > visibility_threshold:
-        right_thumb_present = True
-        right_thumb = to_pixel(right_thumb)
-
-    shoulder_mid = ((left_shoulder[0] + right_shoulder[0]) // 2, (left_shoulder[1] + right_shoulder[1]) // 2)
-    hip_mid = ((left_hip[0] + right_hip[0]) // 2, (left_hip[1] + right_hip[1]) // 2)
-    ear_mid = ((left_ear[0] + right_ear[0]) // 2, (left_ear[1] + right_ear[1]) // 2)
-
-    # print(f"\n left_shoulder: {left_shoulder}, right_shoulder: {right_shoulder}, left_ear: {left_ear}, right_ear: {right_ear}, left_hip: {left_hip}, right_hip: {right_hip}", flush=True)
-
-    # print(f"\n left_wrist: {left_wrist}, right_wrist: {right_wrist}, left_pinky: {left_pinky}, right_pinky: {right_pinky}, left_index: {left_index}, right_index: {right_index}", flush=True)   
-
-    # print(f"\n left_thumb: {left_thumb}, right_thumb: {right_thumb}", flush=True)
-
-    # print(f"\n shoulder_mid: {shoulder_mid}, hip_mid: {hip_mid}, ear_mid: {ear_mid}", flush=True)
-
-    neck_inclination = find_angle(ear_mid[0], ear_mid[1], shoulder_mid[0], shoulder_mid[1])
-    back_inclination = find_angle(shoulder_mid[0], shoulder_mid[1], hip_mid[0], hip_mid[1])
+async def transcribe_audio_async(audio_file):
+    """transcribe_audio awaited on the event loop's Deepgram client."""
+    try:
+        if not isinstance(audio_file, (bytes, bytearray, memoryview)):
+            audio_file = await asyncio.to_thread(read_audio, audio_file)
+        response = await get_clients().async_deepgram().post(DEEPGRAM_LISTEN_URL, params=DEEPGRAM_OPTIONS, content=bytes(audio_file))
+        return deepgram_transcript(response)
 
-    extracted_posture_angles = {
-        "neck_inclination": neck_inclination,
-        "back_inclination": back_inclination,
-        "left_wrist_present": left_wrist_present,
-        "right_wrist_present": right_wrist_present,
-        "left_pinky_present": left_pinky_present,
-        "right_pinky_present": right_pinky_present,
-        "left_index_present": left_index_present,
-        "right_index_present": right_index_present,
-        "left_thumb_present": left_thumb_present,
-        "right_thumb_present": right_thumb_present
-    }
-    print(f"\n extracted_posture_angles: {extracted_posture_angles} \n", flush=True)  # Added logging
-    return extracted_posture_angles
-
-
-# Capture Thread
-def capture_frames(video_path):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Error: Could not open video file {video_path}")
-        False
-    fps = cap.get(cv2.CAP_PROP_FPS)
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if not frame_queue.full():
-            frame_queue.put(frame)
-
-    cap.release()
-    stop_flag.set()  # signal other threads to stop
-
-
-# Processing Thread
-def process_frames():
-    posture_threshold = 5
-
-    while not stop_flag.is_set() or not frame_queue.empty():
-        if not frame_queue.empty():
-            frame = frame_queue.get()
-            image_height, image_width, _ = frame.shape
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(frame_rgb)
-
-            if results.pose_landmarks:
-                angles = extract_posture_angles(results.pose_landmarks.landmark, image_width, image_height)
-                with lock:
-                    results_data["back_angles"].append(angles['back_inclination'])
-                    results_data["neck_angles"].append(angles['neck_inclination'])
-
-                # check if any points on the hand are present
-                if (
-                        angles["left_wrist_present"] == True or
-                        angles["right_wrist_present"] == True or
-                        angles["left_pinky_present"] == True or
-                        angles["right_pinky_present"] == True or
-                        angles["left_index_present"] == True or
-                        angles["right_index_present"] == True or
-                        angles["left_thumb_present"] == True or
-                        angles["right_thumb_present"] == True
-                ):
-                    with lock:
-                        results_data["is_hand_present"] = True
-                else:
-                    with lock:
-                        results_data["is_hand_present"] = False
-
-                # calculate time in posture
-                if angles["back_inclination"] > posture_threshold:
-                    with lock:
-                        results_data["bad_back_frames"] += 1
-                        results_data["back_feedback"] = "Bad back posture"
-                else:
-                    with lock:
-                        results_data["good_back_frames"] += 1
-                        results_data["back_feedback"] = "Good back posture"
-
-                if angles["neck_inclination"] > posture_threshold:
-                    with lock:
-                        results_data["bad_neck_frames"] += 1
-                        results_data["neck_feedback"] = "Bad neck posture"
-                else:
-                    with lock:
-                        results_data["good_neck_frames"] += 1
-                        results_data["neck_feedback"] = "Good neck posture"
-
-                mp.solutions.drawing_utils.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+    except Exception as e:
+        logger.error("Exception: %s", e)
 
 
 # Main Analysis Function
 def analyze_posture(video_path):
+    """video_path is a video file path or a list of (timestamp, BGR frame) pairs from the streaming decoder."""
     start_time = time.time()
-    print(f"analyze_posture called with video_path: {video_path}", flush=True)  # Added logging
-
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_capture = executor.submit(capture_frames, video_path)
-        future_process = executor.submit(process_frames)
-
-        # Wait for both to complete
-        future_capture.result()
-        future_process.result()
-
-    # Final results calculation
-    with lock:
-        print("Inside the lock in analyze_posture", flush=True)  # Added logging
-        mean_back = np.mean(results_data["back_angles"]) if results_data["back_angles"] else 0
-        range_back = np.max(results_data["back_angles"]) - np.min(results_data["back_angles"]) if results_data[
-            "back_angles"] else 0
-
-        mean_neck = np.mean(results_data["neck_angles"]) if results_data["neck_angles"] else 0
-        range_neck = np.max(results_data["neck_angles"]) - np.min(results_data["neck_angles"]) if results_data[
-            "neck_angles"] else 0
-
-        is_hand_present = results_data["is_hand_present"] if results_data["is_hand_present"] else 0
-
-        # Normalize to match the known video length (60 seconds)
-        video_duration = 21
-
-        # Time spent in good/bad posture
-        gb_time = results_data["good_back_frames"] / 30
-        bb_time = results_data["bad_back_frames"] / 30
-
-        # Time spent in good/bad posture
-        gn_time = results_data["good_neck_frames"] / 30
-        bn_time = results_data["bad_neck_frames"] / 30
-
-        back_feedback = results_data["back_feedback"]
-        neck_feedback = results_data["neck_feedback"]
-
-        print(f"gb_time: {gb_time}, bb_time: {bb_time}, gn_time: {gn_time}, bn_time: {bn_time}",
-              flush=True)  # Added logging
-
-        # calculate normalized time
-        if (gb_time + bb_time) > 0:
-            good_back_time = (gb_time / (gb_time + bb_time)) * video_duration
-            bad_back_time = (bb_time / (gb_time + bb_time)) * video_duration
-        else:
-            good_back_time = 0
-            bad_back_time = 0
-
-        if (gn_time + bn_time) > 0:
-            good_neck_time = (gn_time / (gn_time + bn_time)) * video_duration
-            bad_neck_time = (bn_time / (gn_time + bn_time)) * video_duration
-        else:
-            good_neck_time = 0
-            bad_neck_time = 0
-
-        elapsed_time = time.time() - start_time
-        print(f"\nElapsed time for posture: {elapsed_time:.2f} seconds")
-
-        # return results in dictionary format
-        return {
-            "mean_back_inclination": mean_back,
-            "range_back_inclination": range_back,
-            "mean_neck_inclination": mean_neck,
-            "range_neck_inclination": range_neck,  # body fluidity (range)
-            "back_feedback": back_feedback,
-            "neck_feedback": neck_feedback,
-            "good_back_time": round(good_back_time, 2),  # body posture score (time)
-            "bad_back_time": round(bad_back_time, 2),
-            "good_neck_time": round(good_neck_time, 2),
-            "bad_neck_time": round(bad_neck_time, 2),
-            "is_hand_present": is_hand_present
-        }
+    logger.debug("analyze_posture called with video_path: %s", video_path if isinstance(video_path, str) else f'{len(video_path)} decoded frames')  # Added logging
+
+    posture_data = summarize_posture(video_path).to_posture_data()
+
+    elapsed_time = time.time() - start_time
+    logger.debug("Elapsed time for posture: %.2f seconds", elapsed_time)
+    return posture_data
 
 
 # ---------------------- SENTIMENT ANALYSIS ----------------------
 
-def analyze_sentiment(transcript, metrics, posture_data):
+def sentiment_request(transcript, metrics, posture_data):
+    """Chat completion arguments for analyze_sentiment, and the posture scores reported with its feedback."""
     # Get posture scores
     mean_back_score, mean_back_rationale = score_posture(posture_data["mean_back_inclination"], 0, 10, "Back Posture")
     mean_neck_score, mean_neck_rationale = score_posture(posture_data["mean_neck_inclination"], 1, 13, "Neck Posture")
@@ -682,7 +382,13 @@ def analyze_sentiment(transcript, metrics, posture_data):
     2) Each required field must appear in the JSON. Scores are numeric [1-100]
     """
 
-    completion = client.chat.completions.create(
+    posture_scores = {
+        "Posture": round(mean_body_posture),
+        "Motion": round(range_body_posture),
+        "Gestures": is_hand_present
+    }
+
+    request = dict(
         model="gpt-4o-mini",
         messages=[{
             "role": "user", "content": prompt
@@ -723,9 +429,11 @@ def analyze_sentiment(transcript, metrics, posture_data):
             }
         }
     )
+    return request, posture_scores
 
-    response = completion.choices[0].message.content
-    print(f"DATA TYPE OF RESPONSE:  {type(response)}")
+
+def parse_sentiment(response, transcript, posture_scores):
+    logger.debug("DATA TYPE OF RESPONSE:  %s", type(response))
 
     try:
 
@@ -741,18 +449,27 @@ def analyze_sentiment(transcript, metrics, posture_data):
         # Body posture score: {mean_body_posture}, Body movement score: {range_body_posture} Speaker Transcript: {transcript}\n Volume_score: {metrics["Metrics"]["Volume"]}, pitch_variability_score: {metrics["Scores"]["Pitch Variability Score"]}. pace score: {metrics["Scores"]["Pace Score"]}, pauses score: {metrics["Scores"]["Pause Score"]}, Hand Motion: {is_hand_present}"""
         # Speaker Transcript: {transcript}\n Body Language rationale: {mean_back_rationale}, {mean_neck_rationale}, {range_back_rationale}, {range_neck_rationale}. Volume rationale: {metrics['Metrics']['Volume Rationale']}. Pitch variability rationale: {metrics['Metrics']['Pitch Variability Rationale']}. Pace rationale: {metrics['Metrics']['Pace Rationale']}. Pause rationale: {metrics['Metrics']['Pause Metric Rationale']}."""
         parsed_response['Feedback']["General Feedback Summary"] = general_feedback_summary
-        parsed_response['Posture Scores'] = {
-            "Posture": round(mean_body_posture),
-            "Motion": round(range_body_posture),
-            "Gestures": is_hand_present
-        }
+        parsed_response['Posture Scores'] = posture_scores
     except json.JSONDecoder:
-        print("Invalid JSON format in response.")
+        logger.warning("Invalid JSON format in response.")
         return None
 
     return parsed_response
 
 
+def analyze_sentiment(transcript, metrics, posture_data):
+    request, posture_scores = sentiment_request(transcript, metrics, posture_data)
+    response = get_llm_cache().complete(client, request, validate=json.loads)
+    return parse_sentiment(response, transcript, posture_scores)
+
+
+async def analyze_sentiment_async(transcript, metrics, posture_data):
+    """analyze_sentiment awaited on the event loop's AsyncOpenAI client."""
+    request, posture_scores = sentiment_request(transcript, metrics, posture_data)
+    response = await get_llm_cache().acomplete(get_clients().async_openai(), request, validate=json.loads)
+    return parse_sentiment(response, transcript, posture_scores)
+
+
 # def analyze_results(video_path, audio_output_path):
 #     start_time = time.time()
 #     print(f"video_path: {video_path}, audio_output: {audio_output_path}")
@@ -800,17 +517,17 @@ def convert_webm_audio_to_mp3(webm_file_path, mp3_output_path):
         mp3_output_path
     ]
     try:
-        print(f"Attempting to convert: {' '.join(command)}", flush=True)
-        print(f"System PATH: {os.environ.get('PATH')}", flush=True)
+        logger.debug("Attempting to convert: %s", ' '.join(command))
+        logger.debug("System PATH: %s", os.environ.get('PATH'))
         subprocess.run(command, check=True, capture_output=True)
-        print(f"Successfully converted to: {mp3_output_path}", flush=True)
+        logger.debug("Successfully converted to: %s", mp3_output_path)
         return mp3_output_path
     except subprocess.CalledProcessError as e:
         error_message = f"Error converting audio: {e.stderr.decode()}"
-        print(f"FFmpeg Conversion Error: {error_message}", flush=True)
+        logger.error("FFmpeg Conversion Error: %s", error_message)
         return None
     except FileNotFoundError:
-        print("Error: ffmpeg command not found. Make sure it's installed and in your PATH.", flush=True)
+        logger.error("ffmpeg command not found. Make sure it's installed and in your PATH.")
         return None
 
 
@@ -864,37 +581,78 @@ def convert_webm_audio_to_mp3(webm_file_path, mp3_output_path):
 
 #     return final_json
 
-def analyze_results(transcript_text, video_path, audio_path_for_metrics):
+def analyze_results(transcript_text, video_path, audio_for_metrics, posture_data=None, metrics=None):
+    """
+    video_path is a video file path or decoded frames (see analyze_posture);
+    audio_for_metrics is an audio file path or a mono PCM array (see load_sound).
+    posture_data, when given (e.g. merged from per-chunk PostureSummary objects), skips pose detection.
+    metrics, when given (e.g. from process_prosody), skips the Praat analysis of audio_for_metrics.
+    """
     start_time = time.time()
-    print(f"Transcript: {transcript_text}", flush=True)
-    print(f"video_path: {video_path}, audio_path_for_metrics: {audio_path_for_metrics}", flush=True)
+    logger.debug("Transcript: %s", transcript_text)
+    logger.debug("video_path: %s, audio_for_metrics: %s", video_path, type(audio_for_metrics).__name__)
 
     try:
-        with ThreadPoolExecutor() as executor:
-            future_analyze_posture = executor.submit(analyze_posture, video_path=video_path)
+        if posture_data is None:
+            posture_data = analyze_posture(video_path)
+        logger.debug("posture_data: %s", posture_data)
+
+        if metrics is None:
+            metrics = process_audio(audio_for_metrics, transcript_text)  # Use the decoded audio for metrics calculation
+        logger.debug("process audio metrics: %s", metrics)
+        sentiment_analysis_start_time = time.time()
+        with time_stage("llm_scoring"):
+            sentiment_analysis = analyze_sentiment(transcript_text, metrics, posture_data)
+        logger.debug("sentiment_analysis after %.2f seconds", time.time() - sentiment_analysis_start_time)
+
+        final_json = build_final_results(transcript_text, sentiment_analysis, metrics, start_time)
+
+    except Exception as e:
+        logger.error("Error during analysis: %s", e)
+        return {'error': str(e)}  # Return an error dictionary
 
-        posture_data = future_analyze_posture.result()
-        print(f"posture_data: {posture_data}", flush=True)
+    return final_json
+
+
+async def analyze_results_async(transcript_text, video_path, audio_for_metrics, posture_data=None, metrics=None):
+    """
+    analyze_results for the event loop: the LLM request is awaited on the shared AsyncOpenAI client,
+    and only the pose detection / Praat fallbacks (when posture_data / metrics are missing) run in threads.
+    """
+    start_time = time.time()
+    logger.debug("Transcript: %s", transcript_text)
+
+    try:
+        if posture_data is None:
+            posture_data = await asyncio.to_thread(analyze_posture, video_path)
+        if metrics is None:
+            metrics = await asyncio.to_thread(process_audio, audio_for_metrics, transcript_text)
+        logger.debug("posture_data: %s", posture_data)
+        logger.debug("process audio metrics: %s", metrics)
 
-        metrics = process_audio(audio_path_for_metrics, transcript_text)  # Use the audio path for metrics calculation
-        print(f"process audio metrics: {metrics}", flush=True)
         sentiment_analysis_start_time = time.time()
-        sentiment_analysis = analyze_sentiment(transcript_text, metrics, posture_data)
-        print(f"WS: sentiment_analysis after {time.time() - sentiment_analysis_start_time:.2f} seconds")
-
-        final_json = {
-            'Feedback': sentiment_analysis.get('Feedback'),
-            'Posture': sentiment_analysis.get('Posture Scores'),
-            'Scores': metrics.get('Scores', {}),
-            'Transcript': transcript_text
-        }
+        with time_stage("llm_scoring"):
+            sentiment_analysis = await analyze_sentiment_async(transcript_text, metrics, posture_data)
+        logger.debug("sentiment_analysis after %.2f seconds", time.time() - sentiment_analysis_start_time)
 
-        print(f"\nSentiment Analysis for transcript:\n\n", sentiment_analysis, flush=True)
-        elapsed_time = time.time() - start_time
-        print(f"\nElapsed time for everything: {elapsed_time:.2f} seconds", flush=True)
+        final_json = build_final_results(transcript_text, sentiment_analysis, metrics, start_time)
 
     except Exception as e:
-        print(f"Error during analysis: {e}", flush=True)
+        logger.error("Error during analysis: %s", e)
         return {'error': str(e)}  # Return an error dictionary
 
     return final_json
+
+
+def build_final_results(transcript_text, sentiment_analysis, metrics, start_time):
+    final_json = {
+        'Feedback': sentiment_analysis.get('Feedback'),
+        'Posture': sentiment_analysis.get('Posture Scores'),
+        'Scores': metrics.get('Scores', {}),
+        'Transcript': transcript_text
+    }
+
+    logger.debug("Sentiment Analysis for transcript: %s", sentiment_analysis)
+    elapsed_time = time.time() - start_time
+    logger.debug("Elapsed time for everything: %.2f seconds", elapsed_time)
+    return final_json
@@ -0,0 +1,162 @@
+"""
+Incremental assembly of the session video while the session runs.
+
+MediaRecorder chunks are continuations of one WebM stream, so the session recording is
+simply every chunk's bytes in order. A SessionRecording opens an S3 multipart upload for
+the compiled video when the session starts and appends each chunk as it is ingested:
+
+- Bytes are buffered until a full part (RECORDING_PART_MB, at least S3's 5 MB minimum) is
+  available, which is then uploaded in the background while the session continues. At most
+  RECORDING_PARTS_IN_FLIGHT parts upload at once; appending waits beyond that.
+- The stream is indexed as it goes past (WebmIndex), and the first part is held back rather
+  than uploaded: MediaRecorder's WebM has no duration and no seek index (cues), and the
+  first part holds the header that has to point at them.
+- At disconnect `finish()` uploads the first part with a rebuilt header and the remaining
+  bytes plus the cues as the last part, then completes the upload, so the video is
+  available, seekable, in roughly constant time however long the session.
+
+A recording holds one MediaRecorder stream. A connection that takes a session over feeds
+a new stream, with its own header, so the replaced connection aborts its recording and
+the video is compiled at the end of the session.
+
+If a part upload fails, or the stream cannot be indexed, the recording is marked failed
+and `finish()` aborts the upload; the caller then compiles the video from the
+individually uploaded chunks instead. An
+upload abandoned by a process that died is never completed (S3 lifecycle rules reclaim
+incomplete multipart uploads), and the video can still be compiled from the chunks.
+"""
+
+import asyncio
+import os
+import time
+
+from .log import SAMPLED, get_logger
+from .webm_index import WebmIndex, WebmIndexError
+
+logger = get_logger(__name__)
+
+RECORDING_PART_MB = max(5, int(os.getenv("RECORDING_PART_MB", 5)))
+RECORDING_PARTS_IN_FLIGHT = int(os.getenv("RECORDING_PARTS_IN_FLIGHT", 2))
+
+
+class RecordingError(Exception):
+    """Raised when the incrementally assembled recording cannot be completed."""
+
+
+class SessionRecording:
+    def __init__(self, client, bucket, key, part_size=RECORDING_PART_MB * 1024 * 1024,
+                 parts_in_flight=RECORDING_PARTS_IN_FLIGHT, content_type="video/webm"):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+        self.upload_id = None
+        self.size = 0  # bytes appended so far
+        self.error = None  # first part upload failure; the recording cannot be completed after one
+        self._buffer = bytearray()
+        self._index = WebmIndex(max_head=self.part_size)
+        self._first_part = None  # held back until finish() can rewrite its header
+        self._parts = {}  # part number -> upload task resolving to {"PartNumber", "ETag"}
+        self._next_part = 2  # part 1 is the held back first part
+        self._slots = asyncio.Semaphore(max(1, parts_in_flight))
+        self._finished = False
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    async def start(self):
+        """Opens the multipart upload. Raises RecordingError if S3 refuses it."""
+        try:
+            response = await asyncio.to_thread(self.client.create_multipart_upload, Bucket=self.bucket,
+                                               Key=self.key, ContentType=self.content_type)
+        except Exception as e:
+            raise RecordingError(f"could not start multipart upload of {self.key}: {e}") from e
+        self.upload_id = response["UploadId"]
+
+    async def append(self, data):
+        """Appends the next chunk's bytes, uploading a part whenever a full one is buffered."""
+        if self._finished or self.failed:
+            return
+        self._index.feed(data)
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            if self._first_part is None:
+                self._first_part = part
+            else:
+                await self._upload(part)
+
+    async def finish(self):
+        """
+        Uploads the first part with a header giving the duration and pointing at the cues, and
+        the buffered remainder followed by the cues as the last part, then completes the upload.
+        Returns the recording's size in bytes; raises RecordingError (after aborting the upload)
+        on failure.
+        """
+        self._finished = True
+        try:
+            if self.failed:
+                raise RecordingError(f"part upload failed: {self.error}")
+            try:
+                head, cues = self._index.finalize()
+            except WebmIndexError as e:
+                raise RecordingError(f"could not index the recording: {e}") from e
+            rest, self._buffer = bytes(self._buffer), bytearray()
+            if self._first_part is None:
+                await self._upload(head + rest[self._index.first_cluster:] + cues, part_number=1)
+            else:
+                await self._upload(head + self._first_part[self._index.first_cluster:], part_number=1)
+                await self._upload(rest + cues)
+            parts = await asyncio.gather(*(self._parts[number] for number in sorted(self._parts)))
+            if self.failed:
+                raise RecordingError(f"part upload failed: {self.error}")
+            await asyncio.to_thread(self.client.complete_multipart_upload, Bucket=self.bucket, Key=self.key,
+                                    UploadId=self.upload_id, MultipartUpload={"Parts": list(parts)})
+        except RecordingError:
+            await self.abort()
+            raise
+        except Exception as e:
+            await self.abort()
+            raise RecordingError(f"could not complete {self.key}: {e}") from e
+        return self.size + len(head) - self._index.first_cluster + len(cues)
+
+    async def abort(self):
+        """Discards the upload and any parts already sent."""
+        self._finished = True
+        self._buffer = bytearray()
+        self._first_part = None
+        for task in self._parts.values():
+            task.cancel()
+        if self.upload_id is None:
+            return
+        try:
+            await asyncio.to_thread(self.client.abort_multipart_upload, Bucket=self.bucket, Key=self.key,
+                                    UploadId=self.upload_id)
+        except Exception as e:
+            logger.warning("Could not abort multipart upload of %s: %s", self.key, e)
+        self.upload_id = None
+
+    async def _upload(self, data, part_number=None):
+        await self._slots.acquire()  # waits while RECORDING_PARTS_IN_FLIGHT parts are uploading
+        if part_number is None:
+            part_number, self._next_part = self._next_part, self._next_part + 1
+        self._parts[part_number] = asyncio.create_task(self._upload_part(part_number, data))
+
+    async def _upload_part(self, part_number, data):
+        start_time = time.time()
+        try:
+            response = await asyncio.to_thread(self.client.upload_part, Bucket=self.bucket, Key=self.key,
+                                               UploadId=self.upload_id, PartNumber=part_number, Body=data)
+            logger.debug("Uploaded part %s of %s (%s bytes) after %.2f seconds", part_number, self.key, len(data), time.time() - start_time, extra=SAMPLED)
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        except Exception as e:
+            logger.warning("Part %s of %s failed: %s", part_number, self.key, e)
+            if self.error is None:
+                self.error = e
+            return None
+        finally:
+            self._slots.release()
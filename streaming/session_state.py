@@ -0,0 +1,99 @@
+"""
+Compact live-session state shared by every node.
+
+The consumer's buffers (chunk files, decoded audio, transcripts) are local to the node
+holding the socket, but the counters that order a session are not: chunk numbers, and the
+count of analysed windows that paces audience questions. They live in a session-state
+store, so a reconnect that lands on another node resumes the sequence instead of starting
+again at chunk 1 (and overwriting chunk numbers already saved).
+
+Counters are incremented atomically in the store, so two nodes briefly serving the same
+session (a reconnect while the old socket drains) never hand out the same chunk number.
+Entries expire SESSION_STATE_TTL seconds after their last update.
+
+Backends, chosen with SESSION_STATE_BACKEND:
+- "redis": a Redis hash per session at REDIS_URL (shared by all nodes; needs the redis package)
+- "memory": a dict in this process (single node, local development and tests)
+"""
+
+import os
+import time
+
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_STATE_BACKEND = os.getenv("SESSION_STATE_BACKEND", "redis" if REDIS_URL else "memory").lower()
+SESSION_STATE_TTL = int(os.getenv("SESSION_STATE_TTL", 6 * 60 * 60))
+SESSION_STATE_PREFIX = "session-state:"
+
+
+class MemorySessionStateStore:
+    def __init__(self, ttl=SESSION_STATE_TTL):
+        self.ttl = ttl
+        self._entries = {}  # session ID -> (expires at, {field: value})
+
+    def _entry(self, session_id):
+        expires_at, fields = self._entries.get(str(session_id), (0, None))
+        if fields is None or expires_at < time.monotonic():
+            self._entries.pop(str(session_id), None)
+            return {}
+        return fields
+
+    async def load(self, session_id):
+        """Returns the session's counters ({} for a new or expired session)."""
+        return dict(self._entry(session_id))
+
+    async def incr(self, session_id, field, amount=1):
+        """Adds `amount` to a counter and returns its new value."""
+        fields = self._entry(session_id)
+        fields[field] = fields.get(field, 0) + amount
+        self._entries[str(session_id)] = (time.monotonic() + self.ttl, fields)
+        return fields[field]
+
+    async def delete(self, session_id):
+        self._entries.pop(str(session_id), None)
+
+    async def close(self):
+        pass
+
+
+class RedisSessionStateStore:
+    def __init__(self, url=REDIS_URL, ttl=SESSION_STATE_TTL):
+        import redis.asyncio as redis  # optional dependency, only needed for this backend
+
+        self.ttl = ttl
+        self._redis = redis.from_url(url)
+
+    def _key(self, session_id):
+        return f"{SESSION_STATE_PREFIX}{session_id}"
+
+    async def load(self, session_id):
+        fields = await self._redis.hgetall(self._key(session_id))
+        return {field.decode(): int(value) for field, value in fields.items()}
+
+    async def incr(self, session_id, field, amount=1):
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(self._key(session_id), field, amount)
+            pipe.expire(self._key(session_id), self.ttl)
+            value, _ = await pipe.execute()
+        return value
+
+    async def delete(self, session_id):
+        await self._redis.delete(self._key(session_id))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+_store = None
+
+
+def get_session_state_store():
+    """Returns the process-wide session-state store for SESSION_STATE_BACKEND."""
+    global _store
+    if _store is None:
+        if SESSION_STATE_BACKEND == "redis":
+            _store = RedisSessionStateStore()
+        elif SESSION_STATE_BACKEND == "memory":
+            _store = MemorySessionStateStore()
+        else:
+            raise ValueError(f"Unknown SESSION_STATE_BACKEND {SESSION_STATE_BACKEND!r}")
+    return _store
@@ -0,0 +1,233 @@
+"""
+Batched persistence of a live session's SessionChunk and ChunkSentimentAnalysis rows.
+
+Saving through the DRF serializers cost about four database round trips per chunk, each
+on its own database_sync_to_async thread hop: loading the PracticeSession, validating the
+session foreign key, inserting the chunk, then validating the chunk foreign key and
+inserting the window analysis. The live path instead:
+
+- validates with small typed records (ChunkRecord, SentimentRecord), which coerce the
+  values analysis produces into what the columns accept, without touching the database;
+- uses the session ID checked once at connect, so no row is looked up before an insert;
+- queues inserts and writes them with one bulk_create per table, at most
+  SESSION_WRITE_INTERVAL seconds after the first queued row (or as soon as
+  SESSION_WRITE_BATCH rows are queued), in one transaction.
+
+`save_chunk()` and `save_analysis()` return the new row's ID once its batch is written.
+If a batch fails, its rows are retried one at a time so one bad row only fails its own save.
+"""
+
+import asyncio
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from channels.db import database_sync_to_async
+from django.db import transaction
+
+from practice_sessions.models import ChunkSentimentAnalysis, SessionChunk
+from .metrics import time_stage, track_writer
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_WRITE_INTERVAL = float(os.getenv("SESSION_WRITE_INTERVAL", 0.25))  # seconds
+SESSION_WRITE_BATCH = int(os.getenv("SESSION_WRITE_BATCH", 50))
+
+UPLOAD_STATUSES = {choice for choice, _ in SessionChunk.UPLOAD_STATUS_CHOICES}
+VIDEO_FILE_MAX_LENGTH = SessionChunk._meta.get_field("video_file").max_length
+AUDIENCE_EMOTION_MAX_LENGTH = ChunkSentimentAnalysis._meta.get_field("audience_emotion").max_length
+
+
+def _int(value, default=0):
+    """Whole number from an analysis value (int, float or numeric string); `default` if missing or invalid."""
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _score(value):
+    """0-100 score column."""
+    return min(100, max(0, _int(value)))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ChunkRecord:
+    chunk_number: int
+    video_file: str
+    upload_status: str = "uploaded"
+
+    def __post_init__(self):
+        if not self.video_file:
+            raise ValueError("video_file is required")
+        if len(self.video_file) > VIDEO_FILE_MAX_LENGTH:
+            raise ValueError(f"video_file is longer than {VIDEO_FILE_MAX_LENGTH} characters")
+        if self.upload_status not in UPLOAD_STATUSES:
+            raise ValueError(f"unknown upload_status {self.upload_status!r}")
+        self.chunk_number = int(self.chunk_number)
+
+
+@dataclass
+class SentimentRecord:
+    chunk_number: int
+    chunk_transcript: str = ""
+    audience_emotion: Optional[str] = None
+    conviction: int = 0
+    clarity: int = 0
+    impact: int = 0
+    brevity: int = 0
+    transformative_potential: int = 0
+    trigger_response: int = 0
+    filler_words: int = 0
+    grammar: int = 0
+    general_feedback_summary: str = ""
+    posture: int = 0
+    motion: int = 0
+    gestures: bool = False
+    volume: Optional[float] = None
+    pitch_variability: Optional[float] = None
+    pace: Optional[float] = None
+    pauses: int = 0
+
+    @classmethod
+    def from_analysis(cls, chunk_number, transcript, analysis_result):
+        """
+        Maps an analyze_results() result onto the ChunkSentimentAnalysis columns. An error
+        result (or None) keeps only the chunk number and transcript.
+        """
+        record = cls(chunk_number=int(chunk_number), chunk_transcript=transcript or "")
+        if not isinstance(analysis_result, dict) or 'error' in analysis_result:
+            return record
+
+        feedback_data = analysis_result.get('Feedback') or {}
+        posture_data = analysis_result.get('Posture') or {}
+        scores_data = analysis_result.get('Scores') or {}
+
+        audience_emotion = feedback_data.get('Audience Emotion')
+        record.audience_emotion = str(audience_emotion)[:AUDIENCE_EMOTION_MAX_LENGTH] if audience_emotion else None
+        record.conviction = _score(feedback_data.get('Conviction'))
+        record.clarity = _score(feedback_data.get('Clarity'))
+        record.impact = _score(feedback_data.get('Impact'))
+        record.brevity = _score(feedback_data.get('Brevity'))
+        record.transformative_potential = _score(feedback_data.get('Transformative Potential'))
+        record.trigger_response = _int(feedback_data.get('Trigger Response'))
+        record.filler_words = _int(feedback_data.get('Filler Words'))
+        record.grammar = _int(feedback_data.get('Grammar'))
+        record.general_feedback_summary = feedback_data.get('General Feedback Summary') or ''
+
+        record.posture = _score(posture_data.get('Posture'))
+        record.motion = _score(posture_data.get('Motion'))
+        record.gestures = bool(posture_data.get('Gestures') or False)
+
+        record.volume = _float(scores_data.get('Volume Score'))
+        record.pitch_variability = _float(scores_data.get('Pitch Variability Score'))
+        record.pace = _float(scores_data.get('Pace Score'))
+        record.pauses = _int(scores_data.get('Pause Score'))
+        return record
+
+
+class SessionWriter:
+    def __init__(self, session_id, interval=SESSION_WRITE_INTERVAL, batch_size=SESSION_WRITE_BATCH):
+        self.session_id = int(session_id)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._chunks = []  # (ChunkRecord, future)
+        self._analyses = []  # (chunk ID, SentimentRecord, future)
+        self._timer = None
+        self._write_lock = asyncio.Lock()  # one batch written at a time, the next one keeps queueing
+        self.batches = 0
+        self.rows = 0
+        track_writer(self)
+
+    @property
+    def pending(self):
+        return len(self._chunks) + len(self._analyses)
+
+    async def save_chunk(self, record):
+        """Queues a SessionChunk insert and returns its ID once written."""
+        future = asyncio.get_running_loop().create_future()
+        self._chunks.append((record, future))
+        self._schedule()
+        return await future
+
+    async def save_analysis(self, chunk_id, record):
+        """Queues a ChunkSentimentAnalysis insert for a saved chunk and returns its ID once written."""
+        future = asyncio.get_running_loop().create_future()
+        self._analyses.append((chunk_id, record, future))
+        self._schedule()
+        return await future
+
+    def _schedule(self):
+        if self.pending >= self.batch_size:
+            asyncio.create_task(self.flush())
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Writes everything queued so far."""
+        async with self._write_lock:
+            chunks, self._chunks = self._chunks, []
+            analyses, self._analyses = self._analyses, []
+            if not chunks and not analyses:
+                return
+            futures = [item[-1] for item in chunks + analyses]
+            try:
+                with time_stage("db_save"):
+                    results = await database_sync_to_async(self._write)(
+                        [record for record, _ in chunks], [(chunk_id, record) for chunk_id, record, _ in analyses])
+            except Exception as e:
+                logger.exception("Could not write batch for session %s: %s", self.session_id, e)
+                results = [e] * len(futures)
+            self.batches += 1
+            for future, result in zip(futures, results):
+                if future.done():  # the saving task was cancelled
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    self.rows += 1
+                    future.set_result(result)
+
+    def _chunk_row(self, record):
+        return SessionChunk(session_id=self.session_id, **asdict(record))
+
+    def _analysis_row(self, chunk_id, record):
+        return ChunkSentimentAnalysis(chunk_id=chunk_id, **asdict(record))
+
+    def _write(self, chunk_records, analysis_items):
+        """Inserts the batch; returns each row's ID, or the exception that row failed with."""
+        try:
+            with transaction.atomic():
+                chunk_rows = SessionChunk.objects.bulk_create([self._chunk_row(record) for record in chunk_records])
+                analysis_rows = ChunkSentimentAnalysis.objects.bulk_create(
+                    [self._analysis_row(chunk_id, record) for chunk_id, record in analysis_items])
+            return [row.pk for row in chunk_rows + analysis_rows]
+        except Exception as e:
+            if len(chunk_records) + len(analysis_items) == 1:
+                return [e]
+            logger.warning("Batch insert for session %s failed (%s); inserting rows one at a time.", self.session_id, e)
+
+        results = []
+        rows = ([(SessionChunk, self._chunk_row(record)) for record in chunk_records] +
+                [(ChunkSentimentAnalysis, self._analysis_row(chunk_id, record)) for chunk_id, record in analysis_items])
+        for model, row in rows:
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+                results.append(row.pk)
+            except Exception as row_error:
+                results.append(row_error)
+        return results
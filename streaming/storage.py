@@ -0,0 +1,57 @@
+"""
+Layout of session media in S3, shared by the consumer and the background jobs.
+
+Session files live under BASE_FOLDER/user_id/session_id/ in BUCKET_NAME, and are
+referenced by their regional https URL.
+"""
+
+import os
+from urllib.parse import urlparse
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+BUCKET_NAME = "engagex-user-content-1234" # Replace with your actual S3 bucket name
+BASE_FOLDER = "user-videos/" # Base folder in S3 bucket
+
+
+def session_s3_prefix(user_id, session_id):
+    """Folder of a session's files: BASE_FOLDER/user_id/session_id/."""
+    return f"{BASE_FOLDER}{user_id}/{session_id}/"
+
+
+def session_s3_key(user_id, session_id, file_name):
+    """S3 key of a session file: BASE_FOLDER/user_id/session_id/file_name."""
+    return f"{session_s3_prefix(user_id, session_id)}{file_name}"
+
+
+def compiled_video_key(user_id, session_id):
+    """S3 key of the session's compiled video."""
+    return session_s3_key(user_id, session_id, f"{session_id}_compiled.webm")
+
+
+def s3_url(s3_key):
+    """S3 URL of a key in the bucket, using the regional endpoint format."""
+    region_name = os.environ.get('AWS_S3_REGION_NAME', os.environ.get('AWS_REGION', 'us-east-1'))
+    return f"https://{BUCKET_NAME}.s3.{region_name}.amazonaws.com/{s3_key}"
+
+
+def s3_key_from_url(url):
+    """Extracts the S3 key from a URL in this bucket; returns None if it cannot be extracted."""
+    try:
+        parsed_url = urlparse(url)
+        # For regional endpoints like bucket-name.s3.region.amazonaws.com
+        # the bucket name is the first part of the hostname
+        # the key is the path part without the leading slash
+        hostname_parts = parsed_url.hostname.split('.')
+        extracted_bucket_name = hostname_parts[0] if hostname_parts else None
+        key_path = parsed_url.path.lstrip('/') if parsed_url.path else None # Get path without leading slash
+    except Exception as url_parse_error:
+        logger.error("Error parsing URL %s: %s.", url, url_parse_error)
+        return None
+
+    if extracted_bucket_name == BUCKET_NAME and key_path:
+        return key_path # This is the correct S3 key relative to the bucket root
+    logger.warning("Could not extract S3 key or bucket name from URL: %s. Extracted bucket: %s, Expected: %s, Extracted key path: %s.", url, extracted_bucket_name, BUCKET_NAME, key_path)
+    return None
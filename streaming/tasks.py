@@ -0,0 +1,84 @@
+"""
+Background jobs for session media, run by Celery workers (see practice_sessions/jobs.py).
+
+- compile_session_video: streams a session's uploaded chunks into its compiled video
+  (SessionVideoCompiler). Used when the video could not be assembled during the session.
+- cleanup_session_media: deletes every S3 object under a session's folder, e.g. after the
+  session was deleted.
+"""
+
+import os
+
+from celery import shared_task
+
+from practice_sessions.jobs import JOB_MAX_RETRIES, SessionJobTask
+from practice_sessions.models import PracticeSession, SessionChunk
+from .s3_spool import UPLOAD_FAILED, UPLOAD_PENDING, get_s3_client
+from .storage import BUCKET_NAME, compiled_video_key, s3_key_from_url, s3_url, session_s3_prefix
+from .video_compiler import SessionVideoCompiler
+
+# While chunks are still being uploaded from a WebSocket node's spool, compilation is retried
+# every COMPILE_PENDING_COUNTDOWN seconds, at most COMPILE_PENDING_RETRIES times; after that
+# the chunks uploaded so far are compiled.
+COMPILE_PENDING_RETRIES = int(os.getenv("COMPILE_PENDING_RETRIES", 10))
+COMPILE_PENDING_COUNTDOWN = int(os.getenv("COMPILE_PENDING_COUNTDOWN", 15))
+
+
+class ChunksPending(Exception):
+    """Some chunks of the session have not reached S3 yet."""
+
+
+# Also the retry limit for failed compilations, so waiting for uploads cannot exhaust it
+@shared_task(base=SessionJobTask, bind=True, name="streaming.compile_session_video",
+             max_retries=max(JOB_MAX_RETRIES, COMPILE_PENDING_RETRIES))
+def compile_session_video(self, job_id, session_id):
+    if not self.claim(job_id):
+        return None
+    user_id = PracticeSession.objects.filter(id=session_id).values_list("user_id", flat=True).first()
+    if user_id is None:
+        print(f"Jobs: PracticeSession {session_id} not found; nothing to compile.")
+        return None
+
+    chunks = list(SessionChunk.objects.filter(session_id=session_id, video_file__isnull=False)
+                  .exclude(video_file="").order_by("chunk_number").values_list("video_file", "upload_status"))
+    pending = sum(1 for _, status in chunks if status == UPLOAD_PENDING)
+    if pending and self.request.retries < COMPILE_PENDING_RETRIES:
+        raise self.retry(exc=ChunksPending(f"{pending} chunks of session {session_id} not uploaded yet"),
+                         countdown=COMPILE_PENDING_COUNTDOWN)
+
+    chunk_keys = [key for key in (s3_key_from_url(url) for url, status in chunks if status != UPLOAD_FAILED) if key]
+    if not chunk_keys:
+        print(f"Jobs: No chunks to compile for session {session_id}.")
+        return None
+
+    # CompileError propagates, so the job is retried
+    compiled_s3_key = compiled_video_key(user_id, session_id)
+    compiler = SessionVideoCompiler(get_s3_client(), BUCKET_NAME)
+    compiler.compile(chunk_keys, compiled_s3_key)
+    if compiler.skipped_keys:
+        print(f"Jobs: {len(compiler.skipped_keys)} chunks of session {session_id} could not be fetched and were left out.")
+
+    compiled_s3_url = s3_url(compiled_s3_key)
+    PracticeSession.objects.filter(id=session_id).update(compiled_video_url=compiled_s3_url)
+    print(f"Jobs: Video compilation complete for session {session_id}. URL: {compiled_s3_url}")
+    return compiled_s3_url
+
+
+@shared_task(base=SessionJobTask, bind=True, name="streaming.cleanup_session_media")
+def cleanup_session_media(self, job_id, session_id, user_id):
+    if not self.claim(job_id):
+        return 0
+    client = get_s3_client()
+    prefix = session_s3_prefix(user_id, session_id)
+    deleted = 0
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=BUCKET_NAME, Prefix=prefix):
+        keys = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+        if not keys:
+            continue
+        # A listing page holds at most 1000 keys, the delete_objects limit
+        response = client.delete_objects(Bucket=BUCKET_NAME, Delete={"Objects": keys, "Quiet": True})
+        if response.get("Errors"):
+            raise RuntimeError(f"could not delete {len(response['Errors'])} objects under {prefix}: {response['Errors'][0]}")
+        deleted += len(keys)
+    print(f"Jobs: Deleted {deleted} S3 objects under {prefix}")
+    return deleted
@@ -0,0 +1,118 @@
+import io
+
+import av
+import numpy as np
+from django.test import SimpleTestCase
+
+from streaming.audio_decoding import AudioDecodeError, StreamingDecoder, decode_audio
+
+
+def write_webm(seconds=3, sample_rate=48000, fps=10, audio=True, video=True, live=True, keyframe_every=None):
+    """
+    Encodes a small webm (vp8 + mono opus 220 Hz tone) in memory. `live` writes it the way
+    MediaRecorder does: unknown-size segment and clusters, no cues, a cluster every 500 ms.
+    `keyframe_every` forces a video keyframe every that many frames.
+    """
+    buffer = io.BytesIO()
+    options = {"live": "1", "cluster_time_limit": "500"} if live else {}
+    with av.open(buffer, mode="w", format="webm", options=options) as container:
+        if video:
+            video_stream = container.add_stream("libvpx", rate=fps)
+            video_stream.width, video_stream.height, video_stream.pix_fmt = 64, 48, "yuv420p"
+        if audio:
+            audio_stream = container.add_stream("libopus", rate=sample_rate)
+            audio_stream.layout = "mono"
+        tone = (0.3 * np.sin(2 * np.pi * 220 * np.arange(seconds * sample_rate) / sample_rate)).astype(np.float32)
+        frame_size = sample_rate // 50  # 20 ms opus frames
+        audio_position = 0
+        # Interleave: each video frame follows the audio up to its timestamp
+        for index in range(seconds * fps + 1):
+            until = min(tone.size, (index + 1) * sample_rate // fps)
+            while audio and audio_position < until:
+                samples = tone[audio_position:audio_position + frame_size].reshape(1, -1)
+                frame = av.AudioFrame.from_ndarray(samples, format="flt", layout="mono")
+                frame.sample_rate, frame.pts = sample_rate, audio_position
+                audio_position += frame_size
+                for packet in audio_stream.encode(frame):
+                    container.mux(packet)
+            if video and index < seconds * fps:
+                image = np.full((48, 64, 3), index * 8 % 255, dtype=np.uint8)
+                frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+                frame.pts = index
+                if keyframe_every and index % keyframe_every == 0:
+                    frame.pict_type = av.video.frame.PictureType.I
+                for packet in video_stream.encode(frame):
+                    container.mux(packet)
+        for stream in container.streams:
+            for packet in stream.encode():
+                container.mux(packet)
+    return buffer.getvalue()
+
+
+class DecodeAudioTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = write_webm(seconds=3)
+
+    def test_decodes_mono_float32_at_the_analysis_rate(self):
+        samples = decode_audio(self.media)
+
+        self.assertEqual(samples.dtype, np.float32)
+        self.assertEqual(samples.ndim, 1)
+        self.assertEqual(samples.size, 3 * 16000)
+        # The 0.3 amplitude tone survives encoding and resampling
+        self.assertAlmostEqual(float(np.abs(samples[8000:40000]).max()), 0.3, delta=0.05)
+
+    def test_sample_rate_is_configurable(self):
+        self.assertEqual(decode_audio(memoryview(self.media), sample_rate=8000).size, 3 * 8000)
+
+    def test_chunk_without_audio_raises(self):
+        with self.assertRaises(AudioDecodeError):
+            decode_audio(write_webm(seconds=1, audio=False))
+
+    def test_undecodable_chunk_raises(self):
+        with self.assertRaises(AudioDecodeError):
+            decode_audio(b"not a webm chunk" * 64)
+
+
+class StreamingDecoderTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = write_webm(seconds=3)
+
+    def test_chunks_decode_to_the_same_contiguous_audio(self):
+        decoder = StreamingDecoder()
+        # Chunk boundaries fall anywhere, including inside the header and inside blocks
+        chunks = [decoder.feed(self.media[start:start + 4000], timeout=5) for start in range(0, len(self.media), 4000)]
+        tail = decoder.close()
+
+        self.assertFalse(decoder._thread.is_alive())
+        self.assertFalse(decoder.failed)
+        audio = np.concatenate([chunk.audio for chunk in chunks] + [tail.audio])
+        np.testing.assert_array_equal(audio, decode_audio(self.media))
+        # Each chunk starts where the previous one ended
+        starts = [chunk.start_time for chunk in chunks + [tail]]
+        self.assertEqual(starts, sorted(starts))
+        for previous, chunk in zip(chunks, chunks[1:] + [tail]):
+            self.assertAlmostEqual(chunk.start_time, previous.start_time + previous.duration)
+        self.assertTrue(any(chunk.frames for chunk in chunks))
+
+    def test_close_without_data_ends_the_thread(self):
+        decoder = StreamingDecoder()
+        decoder.close()
+        self.assertFalse(decoder._thread.is_alive())
+
+    def test_corrupt_stream_fails(self):
+        decoder = StreamingDecoder()
+        with self.assertRaises(AudioDecodeError):
+            # More than the demuxer's probe size, so it gives up instead of waiting for more
+            decoder.feed(b"not a webm stream" * 4096, timeout=5)
+        self.assertTrue(decoder.failed)
+
+        # Later chunks are refused straight away
+        with self.assertRaises(AudioDecodeError):
+            decoder.feed(self.media, timeout=5)
+        decoder.close()
+        self.assertFalse(decoder._thread.is_alive())
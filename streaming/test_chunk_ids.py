@@ -0,0 +1,38 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from streaming.chunk_ids import ChunkIdRegistry
+
+
+class ChunkIdRegistryTest(SimpleTestCase):
+    async def test_waiters_wake_when_the_chunk_is_saved(self):
+        registry = ChunkIdRegistry()
+        registry.register("chunk_1.webm")
+        waiter = asyncio.create_task(registry.wait("chunk_1.webm", timeout=5))
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        self.assertIsNone(registry.get("chunk_1.webm"))
+
+        registry.resolve("chunk_1.webm", 42)
+
+        self.assertEqual(await waiter, 42)
+        self.assertEqual(registry.get("chunk_1.webm"), 42)
+        self.assertEqual(registry.pending(), [])
+
+    async def test_unknown_and_forgotten_chunks_return_at_once(self):
+        registry = ChunkIdRegistry()
+        self.assertIsNone(await registry.wait("chunk_1.webm", timeout=5))
+        registry.register("chunk_1.webm")
+        registry.forget("chunk_1.webm")
+        self.assertIsNone(await registry.wait("chunk_1.webm", timeout=5))
+
+    async def test_timeout_leaves_the_save_pending(self):
+        registry = ChunkIdRegistry()
+        registry.register("chunk_1.webm")
+        with self.assertRaises(asyncio.TimeoutError):
+            await registry.wait("chunk_1.webm", timeout=0.01)
+
+        registry.resolve("chunk_1.webm", None)  # the save failed
+        self.assertIsNone(await registry.wait("chunk_1.webm", timeout=5))
+        self.assertIn("chunk_1.webm", registry)
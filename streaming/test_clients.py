@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+from django.test import SimpleTestCase
+
+from streaming.clients import HTTP_CONNECT_TIMEOUT, ClientRegistry, deepgram_transcript
+
+
+class ClientRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(openai_api_key="sk-test", deepgram_api_key="dg-test", http2=False)
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_sync_clients_are_shared(self):
+        self.assertIs(self.registry.openai(), self.registry.openai())
+        self.assertIs(self.registry.deepgram(), self.registry.deepgram())
+
+    def test_deepgram_client_configuration(self):
+        deepgram = self.registry.deepgram()
+
+        self.assertEqual(deepgram.headers["Authorization"], "Token dg-test")
+        self.assertEqual(deepgram.timeout.connect, HTTP_CONNECT_TIMEOUT)
+
+    def test_async_clients_are_per_event_loop(self):
+        async def clients():
+            first, second = self.registry.async_openai(), self.registry.async_openai()
+            self.assertIs(first, second)
+            deepgram = self.registry.async_deepgram()
+            await self.registry.aclose()
+            self.assertTrue(deepgram.is_closed)
+            return first
+
+        self.assertIsNot(asyncio.run(clients()), asyncio.run(clients()))
+
+    def test_deepgram_transcript(self):
+        request = httpx.Request("POST", "https://api.deepgram.com/v1/listen")
+        body = {"results": {"channels": [{"alternatives": [{"transcript": "um hello there"}]}]}}
+
+        self.assertEqual(deepgram_transcript(httpx.Response(200, json=body, request=request)), "um hello there")
+        with self.assertRaises(httpx.HTTPStatusError):
+            deepgram_transcript(httpx.Response(401, json={}, request=request))
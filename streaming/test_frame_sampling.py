@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+import av
+import numpy as np
+from django.test import SimpleTestCase
+
+from streaming.frame_sampling import FrameSampler, sample_video_frames, sampled_duration
+
+
+def write_video(path, seconds=3, fps=30, width=1280, height=720, gop=30):
+    with av.open(path, mode="w") as container:
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width, stream.height = width, height
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.gop_size = gop
+        for i in range(seconds * fps):
+            image = np.full((height, width, 3), (i * 7) % 255, dtype=np.uint8)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+class FrameSamplerTest(SimpleTestCase):
+    def test_one_frame_per_slot(self):
+        sampler = FrameSampler(fps=5)
+        timestamps = [i / 30 for i in range(90)]
+
+        accepted = [t for t in timestamps if sampler.accept(t)]
+
+        self.assertEqual(len(accepted), 15)
+        self.assertAlmostEqual(accepted[1], 0.2)
+
+    def test_chunked_stream_samples_same_frames(self):
+        timestamps = [i / 24 for i in range(240)]
+        whole = FrameSampler(fps=5)
+        expected = [t for t in timestamps if whole.accept(t)]
+
+        # A session's chunks go through one sampler, in order, regardless of how they are cut
+        chunked = FrameSampler(fps=5)
+        sampled = []
+        for start in range(0, 240, 37):
+            sampled += [t for t in timestamps[start:start + 37] if chunked.accept(t)]
+
+        self.assertEqual(sampled, expected)
+
+    def test_sampled_duration(self):
+        self.assertAlmostEqual(sampled_duration([i / 5 for i in range(50)], fps=5), 10.0)
+        self.assertAlmostEqual(sampled_duration([3.0], fps=5), 0.2)
+        self.assertEqual(sampled_duration([]), 0.0)
+
+
+class SampleVideoFramesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.video_path = os.path.join(cls.tmpdir.name, "clip.mp4")
+        write_video(cls.video_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def test_samples_and_downscales_by_timestamp(self):
+        frames = list(sample_video_frames(self.video_path, fps=5, max_width=640))
+        timestamps = [t for t, _ in frames]
+
+        self.assertEqual(len(frames), 15)
+        self.assertEqual(frames[0][1].shape, (360, 640, 3))
+        self.assertAlmostEqual(sampled_duration(timestamps, fps=5), 3.0, places=1)
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_keyframes_only(self):
+        frames = list(sample_video_frames(self.video_path, fps=5, keyframes_only=True))
+
+        # At least one keyframe per second (gop of 30 at 30 fps), far fewer than the sampled frames
+        self.assertGreaterEqual(len(frames), 3)
+        self.assertLess(len(frames), 15)
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+from streaming.framing import (
+    FRAME_TYPE_MEDIA, HEADER_SIZE, FrameError, build_frame, parse_frame
+)
+
+
+class MediaFramingTest(SimpleTestCase):
+    def test_round_trip(self):
+        payload = b"\x1a\x45\xdf\xa3webm-bytes"
+        frame = build_frame(FRAME_TYPE_MEDIA, 42, payload)
+
+        frame_type, sequence, flags, body = parse_frame(frame)
+
+        self.assertEqual(len(frame), HEADER_SIZE + len(payload))
+        self.assertEqual(frame_type, FRAME_TYPE_MEDIA)
+        self.assertEqual(sequence, 42)
+        self.assertEqual(flags, 0)
+        self.assertEqual(bytes(body), payload)
+
+    def test_payload_is_a_view_not_a_copy(self):
+        frame = bytearray(build_frame(FRAME_TYPE_MEDIA, 1, b"abc"))
+        _, _, _, body = parse_frame(frame)
+
+        frame[HEADER_SIZE] = ord("z")
+        self.assertEqual(bytes(body), b"zbc")
+
+    def test_short_frame_is_rejected(self):
+        with self.assertRaises(FrameError):
+            parse_frame(b"\x01\x01")
+
+    def test_unknown_version_is_rejected(self):
+        frame = bytearray(build_frame(FRAME_TYPE_MEDIA, 1, b"abc"))
+        frame[0] = 99
+        with self.assertRaises(FrameError):
+            parse_frame(frame)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import tempfile
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from streaming.llm_cache import DjangoCacheBackend, FileBackend, LLMCache, MemoryBackend, request_key
+
+
+def request(prompt="Rate this talk", model="gpt-4o-mini", schema="Feedback"):
+    return {"model": model, "messages": [{"role": "user", "content": prompt}],
+            "response_format": {"type": "json_schema", "json_schema": {"name": schema}}}
+
+
+class FakeOpenAI:
+    """Answers every request with the next response, counting the calls."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        self.calls += 1
+        content = self.responses.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class AsyncFakeOpenAI(FakeOpenAI):
+    async def create(self, **request):
+        return FakeOpenAI.create(self, **request)
+
+
+class RequestKeyTest(SimpleTestCase):
+    def test_key_covers_model_prompt_and_schema(self):
+        keys = {request_key(request()), request_key(request(prompt="Other")),
+                request_key(request(model="gpt-4o")), request_key(request(schema="Other"))}
+
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(request_key(request()), request_key(dict(reversed(request().items()))))
+
+
+class LLMCacheTest(SimpleTestCase):
+    def test_repeated_request_is_served_from_cache(self):
+        cache = LLMCache(MemoryBackend())
+        client = FakeOpenAI('{"Conviction": 80}', '{"Conviction": 40}')
+
+        first = cache.complete(client, request(), validate=json.loads)
+        second = cache.complete(client, request(), validate=json.loads)
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_invalid_response_is_not_cached(self):
+        cache = LLMCache(MemoryBackend())
+        client = FakeOpenAI("not json", '{"Conviction": 40}')
+
+        self.assertEqual(cache.complete(client, request(), validate=json.loads), "not json")
+        self.assertEqual(cache.complete(client, request(), validate=json.loads), '{"Conviction": 40}')
+        self.assertEqual(client.calls, 2)
+
+    def test_async_complete(self):
+        cache = LLMCache(MemoryBackend())
+        client = AsyncFakeOpenAI("What inspired you?")
+
+        async def ask_twice():
+            return [await cache.acomplete(client, request()) for _ in range(2)]
+
+        self.assertEqual(asyncio.run(ask_twice()), ["What inspired you?"] * 2)
+        self.assertEqual(client.calls, 1)
+
+    def test_disabled_cache_always_calls_the_api(self):
+        cache = LLMCache(None)
+        client = FakeOpenAI("a", "b")
+
+        self.assertEqual([cache.complete(client, request()) for _ in range(2)], ["a", "b"])
+
+
+class BackendTest(SimpleTestCase):
+    def check_backend(self, backend):
+        backend.set("a", "first", ttl=60)
+        backend.set("b", "second", ttl=60)
+        self.assertEqual(backend.get("a"), "first")
+        self.assertIsNone(backend.get("missing"))
+
+        backend.set("expired", "old", ttl=-1)
+        self.assertIsNone(backend.get("expired"))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        self.check_backend(backend)
+
+        backend.get("a")
+        backend.set("c", "third", ttl=60)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), "first")
+
+    def test_file_backend_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_backend(FileBackend(directory))
+
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileBackend(directory, max_entries=2)
+            backend.set("a", "first", ttl=60)
+            backend.set("b", "second", ttl=60)
+            backend.get("a")
+            backend.set("c", "third", ttl=60)
+
+            self.assertIsNone(backend.get("b"))
+            self.assertEqual(FileBackend(directory).get("a"), "first")
+
+    def test_django_backend(self):
+        self.check_backend(DjangoCacheBackend())
@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+
+from django.test import SimpleTestCase
+
+from streaming.log import SAMPLED, QueueingHandler, SamplingFilter, StructuredFormatter, get_logger
+
+
+def make_record(msg="chunk %s saved", args=(1,), lineno=10, **extra):
+    record = logging.LogRecord("streaming.test", logging.INFO, "consumers.py", lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class SamplingFilterTest(SimpleTestCase):
+    def test_sampled_records_pass_once_every_n_per_call_site(self):
+        sampling = SamplingFilter(every=3)
+        first_site = [sampling.filter(make_record(lineno=10, **SAMPLED)) for _ in range(6)]
+        other_site = [sampling.filter(make_record(lineno=20, **SAMPLED)) for _ in range(2)]
+
+        self.assertEqual(first_site, [True, False, False, True, False, False])
+        self.assertEqual(other_site, [True, False])
+
+    def test_unsampled_records_always_pass(self):
+        sampling = SamplingFilter(every=3)
+        self.assertTrue(all(sampling.filter(make_record()) for _ in range(5)))
+
+
+class StructuredFormatterTest(SimpleTestCase):
+    def test_text_lines_carry_the_context_fields(self):
+        line = StructuredFormatter("text").format(make_record(session_id="7", user_id="3"))
+        self.assertTrue(line.endswith("INFO streaming.test session_id=7 user_id=3 chunk 1 saved"))
+
+    def test_json_lines(self):
+        line = json.loads(StructuredFormatter("json").format(make_record(session_id="7")))
+        self.assertEqual(line["level"], "INFO")
+        self.assertEqual(line["session_id"], "7")
+        self.assertEqual(line["message"], "chunk 1 saved")
+        self.assertNotIn("user_id", line)
+
+
+class SessionLoggerTest(SimpleTestCase):
+    def test_bound_fields_and_call_extra_reach_the_record(self):
+        log = get_logger("streaming.test_log", session_id="7").bind(user_id="3")
+        with self.assertLogs("streaming.test_log", level="DEBUG") as captured:
+            log.debug("chunk %s saved", 1, extra=SAMPLED)
+
+        record = captured.records[0]
+        self.assertEqual((record.session_id, record.user_id, record.sample), ("7", "3", True))
+        self.assertEqual(record.getMessage(), "chunk 1 saved")
+
+
+class QueueingHandlerTest(SimpleTestCase):
+    def test_records_are_written_by_the_background_thread(self):
+        stream = io.StringIO()
+        handler = QueueingHandler(stream)
+        handler.setFormatter(StructuredFormatter("text"))
+        buffer = ["chunk_1.webm"]
+        handler.handle(make_record("buffer: %s", (buffer,)))
+        buffer.append("chunk_2.webm")  # logged arguments are rendered when the record is queued
+        handler.close()
+
+        self.assertIn("buffer: ['chunk_1.webm']\n", stream.getvalue())
+
+    def test_records_are_dropped_when_the_queue_is_full(self):
+        stream = io.StringIO()
+        handler = QueueingHandler(stream, queue_size=1)
+        handler.listener.stop()
+        handler.listener = None  # nothing drains the queue
+
+        for number in range(3):
+            handler.handle(make_record(args=(number,)))
+
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "chunk 0 saved")
+        handler.close()
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from streaming import metrics
+from streaming.metrics import Counter, Gauge, Histogram, Registry
+from streaming.pipeline import Pipeline, Stage
+
+
+class MetricsTest(SimpleTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("stage_seconds", "Stage durations.", labelnames=("stage",), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 3):
+            histogram.observe(value, "decode")
+
+        lines = histogram.render()
+
+        self.assertIn('stage_seconds_bucket{stage="decode",le="0.1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="decode",le="1"} 2', lines)
+        self.assertIn('stage_seconds_bucket{stage="decode",le="+Inf"} 3', lines)
+        self.assertIn('stage_seconds_sum{stage="decode"} 3.55', lines)
+        self.assertIn('stage_seconds_count{stage="decode"} 3', lines)
+        self.assertEqual(histogram.count("decode"), 3)
+
+    def test_time_observes_failed_blocks_too(self):
+        histogram = Histogram("stage_seconds", "Stage durations.", labelnames=("stage",))
+        with self.assertRaises(ValueError):
+            with histogram.time("prosody"):
+                raise ValueError("praat failed")
+        self.assertEqual(histogram.count("prosody"), 1)
+
+    def test_registry_renders_every_metric(self):
+        registry = Registry()
+        registry.register(Counter("windows_skipped_total", "Skipped windows.")).inc(2)
+        registry.register(Gauge("queue_depth", "Queued chunks.", labelnames=("stage",),
+                                collect=lambda: {("decode",): 3}))
+
+        text = registry.render()
+
+        self.assertIn("# TYPE windows_skipped_total counter\nwindows_skipped_total 2\n", text)
+        self.assertIn('queue_depth{stage="decode"} 3\n', text)
+
+    async def test_queue_depths_are_summed_over_live_pipelines(self):
+        pipelines = [Pipeline([Stage("decode", None)]) for _ in range(2)]
+        for pipeline in pipelines:
+            metrics.track_pipeline(pipeline)
+            await pipeline.stages[0].put("chunk")
+
+        self.assertEqual(metrics._pipeline_gauge("depth")()[("decode",)], 2)
+
+    def test_endpoint(self):
+        request = RequestFactory().get("/metrics/")
+        response = metrics.metrics_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE engagex_stage_seconds histogram", response.content)
+        self.assertIn(b"engagex_active_sessions ", response.content)
+
+        with mock.patch.object(metrics, "METRICS_TOKEN", "secret"):
+            self.assertEqual(metrics.metrics_view(request).status_code, 401)
+            request = RequestFactory().get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+            self.assertEqual(metrics.metrics_view(request).status_code, 200)
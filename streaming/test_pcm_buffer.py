@@ -0,0 +1,63 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from streaming.pcm_buffer import PCMRingBuffer
+
+
+class PCMRingBufferTest(SimpleTestCase):
+    def setUp(self):
+        # Tiny allocation so appends exercise relocation
+        self.buffer = PCMRingBuffer(window_chunks=2, chunk_seconds=1, sample_rate=4)
+
+    def test_window_is_concatenation_of_chunks(self):
+        self.buffer.append("a", np.arange(3))
+        self.buffer.append("b", np.arange(3, 7))
+        self.buffer.append("c", np.arange(7, 9))
+
+        np.testing.assert_array_equal(self.buffer.window(["a", "b", "c"]), np.arange(9))
+        np.testing.assert_array_equal(self.buffer.window(["b", "c"]), np.arange(3, 9))
+
+    def test_window_is_a_view(self):
+        self.buffer.append("a", np.ones(4))
+        window = self.buffer.window(["a"])
+
+        self.assertFalse(window.flags.owndata)
+
+    def test_missing_or_non_consecutive_chunks_return_none(self):
+        self.buffer.append("a", np.ones(2))
+        self.buffer.append("b", np.ones(2))
+        self.buffer.append("c", np.ones(2))
+
+        self.assertIsNone(self.buffer.window(["a", "missing"]))
+        self.assertIsNone(self.buffer.window(["a", "c"]))
+
+    def test_evict_drops_oldest_and_keeps_views_valid(self):
+        self.buffer.append("a", np.full(4, 1.0))
+        self.buffer.append("b", np.full(4, 2.0))
+        window = self.buffer.window(["a", "b"])
+
+        self.assertTrue(self.buffer.evict("a"))
+        for i in range(5):
+            self.buffer.append(f"new{i}", np.full(4, 9.0))
+
+        self.assertNotIn("a", self.buffer)
+        np.testing.assert_array_equal(window, [1.0] * 4 + [2.0] * 4)
+        np.testing.assert_array_equal(self.buffer.window(["b"]), [2.0] * 4)
+
+    def test_evict_unknown_key(self):
+        self.assertFalse(self.buffer.evict("missing"))
+
+    def test_views_survive_emptying_the_buffer(self):
+        self.buffer.append("a", np.ones(3))
+        window = self.buffer.window(["a"])
+
+        # The only chunk is evicted (the next ones failed to decode), then a new chunk arrives
+        self.buffer.evict("a")
+        self.buffer.append("b", np.full(3, 7.0))
+        np.testing.assert_array_equal(window, np.ones(3))
+
+        window = self.buffer.window(["b"])
+        self.buffer.clear()  # disconnect while the window is analysed
+        self.buffer.append("c", np.full(3, 9.0))
+        np.testing.assert_array_equal(window, np.full(3, 7.0))
+        np.testing.assert_array_equal(self.buffer.window(["c"]), np.full(3, 9.0))
@@ -0,0 +1,90 @@
+import asyncio
+import random
+
+from django.test import SimpleTestCase
+
+from streaming.pipeline import Pipeline, PipelineClosed, Stage
+
+
+class PipelineTest(SimpleTestCase):
+    async def test_ordered_stage_passes_items_on_in_order(self):
+        output = []
+
+        async def jittered(item):
+            await asyncio.sleep(random.uniform(0, 0.01))
+            return item
+
+        async def collect(item):
+            output.append(item)
+
+        pipeline = Pipeline([Stage("transcribe", jittered, concurrency=4, ordered=True), Stage("collect", collect)])
+        pipeline.start()
+        for item in range(20):
+            await pipeline.put(item)
+        await pipeline.close(timeout=5)
+
+        self.assertEqual(output, list(range(20)))
+        self.assertEqual(pipeline.metrics()["collect"]["processed"], 20)
+
+    async def test_full_queue_blocks_the_producer(self):
+        release = asyncio.Event()
+
+        async def slow(item):
+            await release.wait()
+
+        pipeline = Pipeline([Stage("persist", slow, queue_size=2)])
+        pipeline.start()
+        for item in range(3):  # one taken by the worker, two queued
+            await pipeline.put(item)
+        await asyncio.sleep(0)
+
+        self.assertTrue(pipeline.full)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(pipeline.put(3), 0.05)
+        self.assertEqual(pipeline.metrics()["persist"]["depth"], 2)
+
+        release.set()
+        await pipeline.close(timeout=5)
+        with self.assertRaises(PipelineClosed):
+            await pipeline.put(4)
+
+    async def test_failed_and_dropped_items_stop_at_their_stage(self):
+        output = []
+
+        async def decode(item):
+            if item == 1:
+                raise ValueError("corrupt chunk")
+            return None if item == 2 else item
+
+        async def collect(item):
+            output.append(item)
+
+        dropped = []
+        pipeline = Pipeline([Stage("decode", decode, concurrency=2, ordered=True), Stage("collect", collect)],
+                            on_drop=dropped.append)
+        pipeline.start()
+        for item in range(4):
+            await pipeline.put(item)
+        await pipeline.close(timeout=5)
+
+        self.assertEqual(output, [0, 3])
+        self.assertEqual(pipeline.metrics()["decode"]["failed"], 1)
+        # Returning None stops an item on purpose; only the failed one counts as dropped
+        self.assertEqual(dropped, [1])
+
+    async def test_items_left_when_close_gives_up_are_dropped(self):
+        release = asyncio.Event()
+
+        async def stuck(item):
+            await release.wait()
+            return item
+
+        dropped = []
+        pipeline = Pipeline([Stage("stuck", stuck)], on_drop=dropped.append)
+        pipeline.start()
+        for item in range(3):
+            await pipeline.put(item)
+        await pipeline.close(timeout=0.05)
+        await asyncio.sleep(0)  # let the cancelled worker drop its item
+
+        self.assertEqual(sorted(dropped), [0, 1, 2])
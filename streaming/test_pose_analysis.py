@@ -0,0 +1,96 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from streaming.pose_analysis import PosePool, PosePoolExhausted
+
+
+class FakePose:
+    """Stands in for a MediaPipe graph: the back leans well forward when the frame is bright."""
+
+    def __init__(self):
+        self.resets = 0
+        self.widths = set()
+        self.in_use = threading.Lock()
+
+    def reset(self):
+        self.resets += 1
+
+    def process(self, frame_rgb):
+        assert self.in_use.acquire(blocking=False), "graph used by two analyses at once"
+        try:
+            self.widths.add(frame_rgb.shape[1])
+            lean = 0.1 if frame_rgb.mean() > 127 else 0.0
+            landmarks = [SimpleNamespace(x=0.5, y=0.5, visibility=0.0) for _ in range(33)]
+            for i in (7, 8):  # ears
+                landmarks[i] = SimpleNamespace(x=0.5, y=0.1, visibility=1.0)
+            for i in (11, 12):  # shoulders
+                landmarks[i] = SimpleNamespace(x=0.5, y=0.3, visibility=1.0)
+            for i in (23, 24):  # hips
+                landmarks[i] = SimpleNamespace(x=0.5 + lean, y=0.4, visibility=1.0)
+            return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+        finally:
+            self.in_use.release()
+
+
+def frames(value, count=20, fps=5, width=100):
+    return [(i / fps, np.full((width * 9 // 16, width, 3), value, dtype=np.uint8)) for i in range(count)]
+
+
+class PosePoolTest(SimpleTestCase):
+    def test_concurrent_analyses_do_not_share_state(self):
+        pool = PosePool(size=2, factory=FakePose)
+        results = {}
+
+        def analyze(name, value):
+            with pool.analyzer() as analyzer:
+                results[name] = analyzer.summarize(frames(value))
+
+        threads = [threading.Thread(target=analyze, args=("upright", 0)),
+                   threading.Thread(target=analyze, args=("leaning", 255))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreater(results["upright"].frames, 0)
+        self.assertGreater(results["leaning"].frames, 0)
+        self.assertEqual(results["upright"].back_max, 0)
+        self.assertEqual(results["upright"].bad_back_frames, 0)
+        self.assertGreater(results["leaning"].back_min, 45)
+        self.assertEqual(results["leaning"].good_back_frames, 0)
+
+    def test_each_analysis_starts_fresh(self):
+        pool = PosePool(size=1, factory=FakePose)
+
+        with pool.analyzer() as analyzer:
+            first = analyzer.summarize(frames(0, count=3))
+        with pool.analyzer() as analyzer:
+            second = analyzer.summarize(frames(0, count=3))
+            self.assertEqual(analyzer.pose.resets, 2)
+
+        self.assertEqual(first.frames, 3)
+        self.assertEqual(second.frames, 3)
+
+    def test_every_sampled_frame_is_analyzed_downscaled(self):
+        pool = PosePool(size=1, factory=FakePose)
+
+        with pool.analyzer(fps=5, max_width=640) as analyzer:
+            summary = analyzer.summarize(frames(0, count=60, fps=30, width=1280))
+            self.assertEqual(analyzer.pose.widths, {640})
+
+        self.assertEqual(summary.frames, 10)
+        self.assertAlmostEqual(summary.duration, 2.0, places=1)
+        self.assertAlmostEqual(summary.to_posture_data()["good_back_time"], 2.0, places=1)
+
+    def test_pool_is_bounded(self):
+        pool = PosePool(size=1, factory=FakePose)
+
+        with pool.analyzer():
+            with self.assertRaises(PosePoolExhausted):
+                with pool.analyzer(timeout=0.05):
+                    pass
+        with pool.analyzer(timeout=0.05):
+            pass
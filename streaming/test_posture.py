@@ -0,0 +1,54 @@
+import random
+
+from django.test import SimpleTestCase
+
+from streaming.posture import PostureSummary
+
+
+def summarize(frames, fps=5):
+    summary = PostureSummary(duration=len(frames) / fps)
+    for back, neck, hand in frames:
+        summary.add(back, neck, hand)
+    return summary
+
+
+class PostureSummaryTest(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.frames = [(rng.uniform(0, 12), rng.uniform(0, 20), rng.random() < 0.3) for _ in range(150)]
+
+    def test_merged_chunks_equal_whole_window(self):
+        chunks = [self.frames[:40], self.frames[40:100], self.frames[100:]]
+
+        merged = PostureSummary.merge_all(summarize(chunk) for chunk in chunks)
+        whole = summarize(self.frames)
+
+        merged_data = merged.to_posture_data()
+        for key, value in whole.to_posture_data().items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(merged_data[key], value, places=9)
+            else:
+                self.assertEqual(merged_data[key], value)
+        self.assertAlmostEqual(merged.back_std, whole.back_std, places=9)
+
+    def test_matches_list_based_statistics(self):
+        data = summarize(self.frames).to_posture_data()
+        backs = [back for back, _, _ in self.frames]
+
+        self.assertAlmostEqual(data["mean_back_inclination"], sum(backs) / len(backs))
+        self.assertAlmostEqual(data["range_back_inclination"], max(backs) - min(backs))
+        self.assertEqual(data["is_hand_present"], self.frames[-1][2] or 0)
+
+    def test_posture_time_splits_real_duration(self):
+        data = summarize(self.frames).to_posture_data()
+        good = sum(back <= 5 for back, _, _ in self.frames)
+
+        self.assertAlmostEqual(data["good_back_time"] + data["bad_back_time"], 30, places=1)
+        self.assertAlmostEqual(data["good_back_time"], round(good / 5, 2))
+
+    def test_empty_summary(self):
+        data = PostureSummary.merge_all([None, PostureSummary()]).to_posture_data()
+
+        self.assertEqual(data["mean_back_inclination"], 0)
+        self.assertEqual(data["good_back_time"], 0)
+        self.assertEqual(data["back_feedback"], "")
@@ -0,0 +1,138 @@
+import numpy as np
+import parselmouth
+from django.test import SimpleTestCase
+
+from streaming.prosody import (
+    AudioAnalysisContext, ProsodySummary, classify_pauses, find_pauses, histogram_percentile, merge_prosody, INTENSITY_RESOLUTION
+)
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 10
+
+
+def synthesize_speech(seconds=30, seed=3):
+    """Voiced bursts with gliding pitch separated by near-silent gaps of varying length."""
+    rng = np.random.default_rng(seed)
+    pieces, total = [], 0
+    while total < seconds * SAMPLE_RATE:
+        n = int(rng.uniform(0.6, 2.5) * SAMPLE_RATE)
+        t = np.arange(n) / SAMPLE_RATE
+        f0 = rng.uniform(110, 230) * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voiced = 0.2 * sum(np.sin(k * phase) / k for k in range(1, 6)) * np.hanning(n) ** 0.3
+        gap = int(rng.uniform(0.15, 1.3) * SAMPLE_RATE)
+        pieces += [voiced, rng.normal(0, 0.002, gap)]
+        total += n + gap
+    return np.concatenate(pieces)[:seconds * SAMPLE_RATE]
+
+
+def whole_window_features(samples):
+    """The features as get_pitch_variability / get_volume / get_pauses compute them over the whole window."""
+    sound = parselmouth.Sound(samples, sampling_frequency=SAMPLE_RATE)
+    frequencies = sound.to_pitch().selected_array["frequency"]
+    intensity = sound.to_intensity()
+    values = intensity.values[0]
+    pause_times = intensity.xs()[values < np.percentile(values, 30)]
+    return {
+        "pitch_variability": np.std(frequencies[frequencies > 0]),
+        "volume": np.median(values),
+        "duration": sound.duration,
+        "pauses": classify_pauses(pause_times),
+    }
+
+
+class MergeProsodyTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.samples = synthesize_speech()
+        chunk = CHUNK_SECONDS * SAMPLE_RATE
+        cls.summaries = [ProsodySummary.from_samples(cls.samples[i:i + chunk]) for i in range(0, cls.samples.size, chunk)]
+
+    def test_merged_chunks_match_whole_window(self):
+        merged = merge_prosody(self.summaries)
+        whole = whole_window_features(self.samples)
+
+        self.assertAlmostEqual(merged["duration"], whole["duration"], places=6)
+        # Praat frames near a chunk edge see slightly different context than in the whole window
+        self.assertLess(abs(merged["pitch_variability"] - whole["pitch_variability"]) / whole["pitch_variability"], 0.02)
+        self.assertLess(abs(merged["volume"] - whole["volume"]), 0.5)
+        appropriate, long = whole["pauses"]
+        self.assertLessEqual(abs(merged["appropriate_pauses"] - appropriate), 1)
+        self.assertLessEqual(abs(merged["long_pauses"] - long), 1)
+
+    def test_merge_sums_word_counts(self):
+        for i, summary in enumerate(self.summaries):
+            summary.word_count = 10 + i
+        self.assertEqual(merge_prosody(self.summaries)["word_count"], 33)
+
+    def test_histogram_percentile_matches_numpy(self):
+        rng = np.random.default_rng(11)
+        values = np.round(rng.normal(60, 8, 5000) / INTENSITY_RESOLUTION) * INTENSITY_RESOLUTION
+        bins, counts = np.unique(np.round(values / INTENSITY_RESOLUTION).astype(np.int64), return_counts=True)
+
+        for q in (10, 30, 50, 90):
+            self.assertAlmostEqual(histogram_percentile(bins, counts, q), np.percentile(values, q), places=6)
+
+    def test_pause_straddling_chunk_boundary_is_counted_once(self):
+        # Frames every 10 ms from 9.7 s to 10.3 s: one 0.6 s pause split across two chunks
+        pause_times = np.arange(970, 1031) / 100
+        self.assertEqual(classify_pauses(pause_times), (1, 0))
+        self.assertEqual(classify_pauses(np.zeros(0)), (1, 1))
+
+
+class AudioAnalysisContextTest(SimpleTestCase):
+    def test_tracks_are_computed_once(self):
+        context = AudioAnalysisContext(synthesize_speech(seconds=3))
+
+        self.assertIs(context.pitch, context.pitch)
+        self.assertIs(context.intensity, context.intensity)
+        self.assertIs(AudioAnalysisContext.of(context), context)
+        self.assertAlmostEqual(context.duration, 3.0)
+
+    def test_summary_matches_direct_praat(self):
+        samples = synthesize_speech(seconds=5)
+        sound = parselmouth.Sound(samples, sampling_frequency=SAMPLE_RATE)
+        frequencies = sound.to_pitch().selected_array["frequency"]
+
+        summary = ProsodySummary.from_sound(AudioAnalysisContext(samples))
+
+        self.assertEqual(summary.pitch_count, np.count_nonzero(frequencies > 0))
+        np.testing.assert_allclose(summary.intensity_values, sound.to_intensity().values[0], rtol=1e-6)
+
+
+def loop_pauses(times, values):
+    """The original get_pauses grouping loop, kept as the reference for find_pauses."""
+    intensity_threshold = np.percentile(values, 30)
+    pause_times = [times[i] for i, val in enumerate(values) if val < intensity_threshold]
+    if not pause_times:
+        return 1, 1
+
+    pauses = []
+    start_time = pause_times[0]
+    for i in range(1, len(pause_times)):
+        if pause_times[i] - pause_times[i - 1] > 0.2:
+            pauses.append((start_time, pause_times[i - 1]))
+            start_time = pause_times[i]
+    pauses.append((start_time, pause_times[-1]))
+
+    appropriate_pauses = sum(0.4 <= (end - start) < 0.8 for start, end in pauses)
+    long_pauses = sum((end - start) >= 0.8 for start, end in pauses)
+    if appropriate_pauses == 0 and long_pauses == 0:
+        return 1, 1
+    return appropriate_pauses, long_pauses
+
+
+class FindPausesTest(SimpleTestCase):
+    def test_matches_loop_on_random_intensity_tracks(self):
+        rng = np.random.default_rng(2024)
+        for _ in range(300):
+            n = int(rng.integers(1, 4000))
+            dt = rng.choice([0.01, 0.016, 0.032])
+            times = 0.03 + dt * np.arange(n)
+            # Alternating loud/quiet runs of random length, with noise and occasional flat tracks
+            levels = np.repeat(rng.choice([45.0, 70.0], size=n), rng.integers(1, 120, size=n))[:n]
+            values = levels + rng.normal(0, rng.choice([0.0, 3.0]), size=n)
+
+            with self.subTest(n=n, dt=dt):
+                self.assertEqual(find_pauses(times, values), loop_pauses(times, values))
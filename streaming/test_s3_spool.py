@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from streaming.s3_spool import UPLOAD_FAILED, UPLOAD_UPLOADED, S3Uploader, SpoolEntry
+
+
+class FakeS3:
+    """upload_file() stand-in that fails the first `failures` calls per key."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = {}
+        self.objects = {}
+        self.release = threading.Event()
+        self.release.set()
+
+    def upload_file(self, path, bucket, key, Config=None):
+        self.release.wait(5)
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] <= self.failures:
+            raise ConnectionError("connection reset")
+        with open(path, "rb") as file:
+            self.objects[(bucket, key)] = file.read()
+
+
+class S3UploaderTest(SimpleTestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.source_dir = tempfile.mkdtemp()
+        self.completed = []
+
+    def uploader(self, client, **kwargs):
+        kwargs.setdefault("backoff_base", 0.01)
+        return S3Uploader(self.spool_dir, workers=2, client=client,
+                          on_complete=lambda entry, status: self.completed.append((entry.chunk_id, status)), **kwargs)
+
+    def chunk(self, name, data=b"webm"):
+        path = os.path.join(self.source_dir, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_retries_with_backoff_then_clears_the_spool(self):
+        client = FakeS3(failures=2)
+        uploader = self.uploader(client)
+        source = self.chunk("chunk_1.webm", b"chunk one")
+        entry = uploader.spool(source, "bucket", "user-videos/1/2/chunk_1.webm")
+        os.remove(source)  # the spooled copy outlives the session's temporary file
+
+        uploader.submit(entry, chunk_id=7)
+
+        self.assertTrue(uploader.flush("user-videos/1/2/", timeout=5))
+        self.assertEqual(client.attempts["user-videos/1/2/chunk_1.webm"], 3)
+        self.assertEqual(client.objects[("bucket", "user-videos/1/2/chunk_1.webm")], b"chunk one")
+        self.assertEqual(self.completed, [(7, UPLOAD_UPLOADED)])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_gives_up_after_max_attempts_and_keeps_the_file(self):
+        uploader = self.uploader(FakeS3(failures=10), max_attempts=2)
+        entry = uploader.spool(self.chunk("chunk_1.webm"), "bucket", "a/chunk_1.webm")
+        uploader.submit(entry, chunk_id=3)
+
+        self.assertTrue(uploader.flush(timeout=5))
+        self.assertEqual(self.completed, [(3, UPLOAD_FAILED)])
+        self.assertTrue(os.path.exists(entry.path))
+        self.assertEqual(SpoolEntry.load(entry.manifest_path).attempts, 1)
+
+    def test_flush_only_waits_for_its_prefix(self):
+        client = FakeS3()
+        client.release.clear()
+        uploader = self.uploader(client)
+        uploader.submit(uploader.spool(self.chunk("a.webm"), "bucket", "session-a/a.webm"))
+
+        self.assertTrue(uploader.flush("session-b/", timeout=0))
+        self.assertFalse(uploader.flush("session-a/", timeout=0.05))
+        client.release.set()
+        self.assertTrue(uploader.flush("session-a/", timeout=5))
+
+    def test_recover_requeues_entries_spooled_by_a_previous_process(self):
+        client = FakeS3()
+        previous = self.uploader(FakeS3())
+        for n in (1, 2):
+            # Spooled and recorded, but the process stopped before uploading them
+            entry = previous.spool(self.chunk(f"chunk_{n}.webm"), "bucket", f"s/chunk_{n}.webm")
+            entry.chunk_id = n
+            entry.save()
+            previous._unlock(entry.path)  # what exiting does to the process's locks
+        uploader = self.uploader(client)
+
+        self.assertEqual(uploader.recover(), 2)
+        self.assertTrue(uploader.flush(timeout=5))
+
+        self.assertEqual(sorted(key for _, key in client.objects), ["s/chunk_1.webm", "s/chunk_2.webm"])
+        self.assertEqual(sorted(self.completed), [(1, UPLOAD_UPLOADED), (2, UPLOAD_UPLOADED)])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_recover_leaves_entries_owned_by_a_live_process(self):
+        other_process = self.uploader(FakeS3())
+        owned = other_process.spool(self.chunk("chunk_1.webm"), "bucket", "s/chunk_1.webm")
+        client = FakeS3()
+        uploader = self.uploader(client)
+
+        self.assertEqual(uploader.recover(), 0)
+        self.assertEqual(uploader.recover(), 0)  # its own spooled entries are not taken either
+        own = uploader.spool(self.chunk("chunk_2.webm"), "bucket", "s/chunk_2.webm")
+        self.assertEqual(uploader.recover(), 0)
+
+        uploader.submit(own)
+        self.assertTrue(uploader.flush(timeout=5))
+        self.assertEqual(list(client.objects), [("bucket", "s/chunk_2.webm")])
+        self.assertTrue(os.path.exists(owned.manifest_path))
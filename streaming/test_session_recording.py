@@ -0,0 +1,134 @@
+import asyncio
+import io
+import threading
+
+import av
+from django.test import SimpleTestCase
+
+from streaming.session_recording import RecordingError, SessionRecording
+from streaming.test_audio_decoding import write_webm
+
+
+class FakeS3:
+    """Multipart upload stand-in; part uploads block while `release` is clear."""
+
+    def __init__(self, fail_part=None):
+        self.fail_part = fail_part
+        self.parts = {}
+        self.completed = None
+        self.aborted = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.release.wait(5)
+        if PartNumber == self.fail_part:
+            raise ConnectionError("connection reset")
+        self.parts[PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(self.parts), numbers
+        self.completed = b"".join(self.parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = True
+
+
+class SessionRecordingTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = write_webm(seconds=3, keyframe_every=10)
+
+    def chunks(self, size=3000):
+        return [self.media[start:start + size] for start in range(0, len(self.media), size)]
+
+    async def test_parts_upload_during_the_session_and_finish_sends_the_rest(self):
+        client = FakeS3()
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=4096)
+        await recording.start()
+
+        for chunk in self.chunks():
+            await recording.append(chunk)
+        await asyncio.gather(*recording._parts.values())
+        full_parts = len(self.media) // 4096
+        # Uploaded before the session ended, except the first part, whose header is rewritten
+        self.assertEqual(sorted(client.parts), list(range(2, full_parts + 1)))
+        self.assertIsNone(client.completed)
+
+        size = await recording.finish()
+        self.assertEqual(sorted(client.parts), list(range(1, full_parts + 2)))
+        self.assertEqual(size, len(client.completed))
+        self.assertEqual([len(client.parts[n]) for n in range(2, full_parts + 1)], [4096] * (full_parts - 1))
+        self.assertGreaterEqual(len(client.parts[1]), 4096)
+        # The stream is kept as it is from the first cluster on; the video now has a duration
+        self.assertIn(self.media[recording._index.first_cluster:], client.completed)
+        with av.open(io.BytesIO(client.completed)) as container:
+            self.assertAlmostEqual(container.duration / av.time_base, 3, delta=0.1)
+
+    async def test_short_recording_is_a_single_part(self):
+        client = FakeS3()
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=len(self.media) + 1)
+        await recording.start()
+        await recording.append(self.media)
+
+        await recording.finish()
+        self.assertEqual(list(client.parts), [1])
+        self.assertIn(self.media[recording._index.first_cluster:], client.completed)
+
+    async def test_failed_part_aborts_the_upload(self):
+        client = FakeS3(fail_part=2)
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=4096)
+        await recording.start()
+        await recording.append(self.media)
+
+        with self.assertRaises(RecordingError):
+            await recording.finish()
+        self.assertTrue(recording.failed)
+        self.assertTrue(client.aborted)
+        self.assertIsNone(client.completed)
+
+    async def test_unindexable_stream_aborts_the_upload(self):
+        client = FakeS3()
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=4096)
+        await recording.start()
+        await recording.append(b"not a webm stream")
+
+        with self.assertRaises(RecordingError):
+            await recording.finish()
+        self.assertTrue(client.aborted)
+        self.assertIsNone(client.completed)
+
+    async def test_append_waits_while_parts_are_in_flight(self):
+        client = FakeS3()
+        client.release.clear()
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=4096, parts_in_flight=1)
+        await recording.start()
+        await recording.append(self.media[:8192])  # the first part is held, the second starts uploading
+
+        append = asyncio.create_task(recording.append(self.media[8192:12288]))
+        await asyncio.sleep(0.05)
+        self.assertFalse(append.done())
+        client.release.set()
+        await append
+        await recording.append(self.media[12288:])
+        await recording.finish()
+        self.assertIn(self.media[recording._index.first_cluster:], client.completed)
+
+    async def test_second_stream_fails_the_recording(self):
+        # A connection taking the session over feeds a new MediaRecorder stream, with its own header
+        client = FakeS3()
+        recording = SessionRecording(client, "bucket", "compiled.webm", part_size=4096)
+        await recording.start()
+        await recording.append(self.media)
+        await recording.append(write_webm(seconds=1, keyframe_every=10))
+
+        with self.assertRaises(RecordingError):
+            await recording.finish()
+        self.assertTrue(client.aborted)
+        self.assertIsNone(client.completed)
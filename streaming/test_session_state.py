@@ -0,0 +1,47 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from streaming import session_state
+from streaming.session_state import MemorySessionStateStore
+
+
+class MemorySessionStateStoreTest(SimpleTestCase):
+    def test_counters_are_incremented_per_session(self):
+        store = MemorySessionStateStore()
+
+        async def run():
+            values = [await store.incr("1", "chunk_counter") for _ in range(3)]
+            await store.incr("1", "analysis_window_counter", 2)
+            await store.incr("2", "chunk_counter")
+            return values, await store.load("1"), await store.load("2")
+
+        values, first, second = asyncio.run(run())
+        self.assertEqual(values, [1, 2, 3])
+        self.assertEqual(first, {"chunk_counter": 3, "analysis_window_counter": 2})
+        self.assertEqual(second, {"chunk_counter": 1})
+
+    def test_state_expires_after_ttl(self):
+        store = MemorySessionStateStore(ttl=60)
+        with mock.patch.object(session_state.time, "monotonic", return_value=1000):
+            asyncio.run(store.incr(7, "chunk_counter"))
+        with mock.patch.object(session_state.time, "monotonic", return_value=1059):
+            self.assertEqual(asyncio.run(store.load("7")), {"chunk_counter": 1})
+            asyncio.run(store.incr(7, "chunk_counter"))  # refreshes the TTL
+        with mock.patch.object(session_state.time, "monotonic", return_value=1118):
+            self.assertEqual(asyncio.run(store.load(7)), {"chunk_counter": 2})
+        with mock.patch.object(session_state.time, "monotonic", return_value=1120):
+            self.assertEqual(asyncio.run(store.load(7)), {})
+
+    def test_delete(self):
+        store = MemorySessionStateStore()
+        asyncio.run(store.incr(3, "chunk_counter"))
+        asyncio.run(store.delete(3))
+        self.assertEqual(asyncio.run(store.load(3)), {})
+
+    def test_unknown_backend(self):
+        with mock.patch.object(session_state, "SESSION_STATE_BACKEND", "etcd"), \
+                mock.patch.object(session_state, "_store", None):
+            with self.assertRaises(ValueError):
+                session_state.get_session_state_store()
@@ -0,0 +1,88 @@
+import asyncio
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+
+from practice_sessions.models import ChunkSentimentAnalysis, PracticeSession, SessionChunk
+from streaming.session_writer import ChunkRecord, SentimentRecord, SessionWriter
+
+
+class RecordsTest(SimpleTestCase):
+    def test_chunk_record_validates(self):
+        with self.assertRaises(ValueError):
+            ChunkRecord(chunk_number=1, video_file="")
+        with self.assertRaises(ValueError):
+            ChunkRecord(chunk_number=1, video_file="https://bucket/chunk_1.webm", upload_status="lost")
+        self.assertEqual(ChunkRecord(chunk_number="2", video_file="https://bucket/chunk_2.webm").chunk_number, 2)
+
+    def test_sentiment_record_from_analysis(self):
+        record = SentimentRecord.from_analysis(4, "hello", {
+            "Feedback": {"Audience Emotion": "thinking", "Conviction": 87.6, "Clarity": "120", "Impact": None,
+                         "Filler Words": "3", "General Feedback Summary": "Good"},
+            "Posture": {"Posture": 70, "Motion": -5, "Gestures": 1},
+            "Scores": {"Volume Score": 55.5, "Pace Score": "n/a", "Pause Score": 101.2},
+        })
+        self.assertEqual((record.audience_emotion, record.conviction, record.clarity, record.impact), ("thinking", 88, 100, 0))
+        self.assertEqual((record.filler_words, record.general_feedback_summary), (3, "Good"))
+        self.assertEqual((record.posture, record.motion, record.gestures), (70, 0, True))
+        self.assertEqual((record.volume, record.pace, record.pauses), (55.5, None, 101))
+
+    def test_error_result_keeps_transcript_only(self):
+        record = SentimentRecord.from_analysis(4, "hello", {"error": "timeout"})
+        self.assertEqual(record, SentimentRecord(chunk_number=4, chunk_transcript="hello"))
+
+
+# Rows are written from database_sync_to_async threads, so the test data has to be committed
+class SessionWriterTest(TransactionTestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="speaker@example.com", password="pass")
+        self.session = PracticeSession.objects.create(user=user, session_name="Pitch", session_type="pitch")
+
+    def test_rows_are_written_in_batches(self):
+        writer = SessionWriter(self.session.id, interval=0.05)
+
+        async def run():
+            chunk_ids = await asyncio.gather(*(
+                writer.save_chunk(ChunkRecord(chunk_number=n, video_file=f"https://bucket/chunk_{n}.webm"))
+                for n in range(1, 6)))
+            analysis_ids = await asyncio.gather(*(
+                writer.save_analysis(chunk_id, SentimentRecord(chunk_number=n, chunk_transcript=f"window {n}"))
+                for n, chunk_id in enumerate(chunk_ids[2:], start=3)))
+            return chunk_ids, analysis_ids
+
+        chunk_ids, analysis_ids = asyncio.run(run())
+
+        self.assertEqual(writer.batches, 2)
+        chunks = SessionChunk.objects.filter(session=self.session)
+        self.assertEqual(sorted(chunks.values_list("id", flat=True)), sorted(chunk_ids))
+        self.assertEqual(list(chunks.order_by("chunk_number").values_list("chunk_number", flat=True)), [1, 2, 3, 4, 5])
+        analysis = ChunkSentimentAnalysis.objects.get(id=analysis_ids[-1])
+        self.assertEqual((analysis.chunk_id, analysis.chunk_transcript), (chunk_ids[-1], "window 5"))
+
+    def test_full_batch_is_written_without_waiting(self):
+        writer = SessionWriter(self.session.id, interval=60, batch_size=2)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(*(
+                writer.save_chunk(ChunkRecord(chunk_number=n, video_file=f"https://bucket/chunk_{n}.webm"))
+                for n in (1, 2))), timeout=5)
+
+        self.assertEqual(len(asyncio.run(run())), 2)
+
+    def test_a_failing_row_only_fails_its_own_save(self):
+        writer = SessionWriter(self.session.id, interval=0.05)
+        chunk = SessionChunk.objects.create(session=self.session, chunk_number=1, video_file="https://bucket/chunk_1.webm")
+        ChunkSentimentAnalysis.objects.create(chunk=chunk, chunk_number=1)
+
+        async def run():
+            return await asyncio.gather(
+                writer.save_analysis(chunk.id, SentimentRecord(chunk_number=1)),  # one analysis per chunk
+                writer.save_chunk(ChunkRecord(chunk_number=2, video_file="https://bucket/chunk_2.webm")),
+                return_exceptions=True)
+
+        with mock.patch("builtins.print"):
+            duplicate, chunk_id = asyncio.run(run())
+
+        self.assertIsInstance(duplicate, Exception)
+        self.assertTrue(SessionChunk.objects.filter(id=chunk_id, chunk_number=2).exists())
@@ -0,0 +1,146 @@
+from unittest import mock
+
+from celery import current_app
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from practice_sessions.jobs import JobEnqueueError, enqueue_job
+from practice_sessions.models import PracticeSession, SessionChunk, SessionJob
+from streaming import tasks
+from streaming.storage import s3_url, session_s3_key
+from streaming.test_video_compiler import CAT_COMMAND, FakeS3
+from streaming.video_compiler import SessionVideoCompiler
+
+
+class FakeS3Listing(FakeS3):
+    """Adds list_objects_v2 pagination and delete_objects to the compiler's fake."""
+
+    def __init__(self, objects, fail_completes=0):
+        super().__init__(objects)
+        self.fail_completes = fail_completes
+        self.deleted = []
+
+    def complete_multipart_upload(self, **kwargs):
+        if self.fail_completes:
+            self.fail_completes -= 1
+            raise ConnectionError("connection reset")
+        super().complete_multipart_upload(**kwargs)
+
+    def get_paginator(self, operation):
+        objects = self.objects
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(key for key in objects if key.startswith(Prefix))
+                for start in range(0, len(keys), 2):
+                    yield {"Contents": [{"Key": key} for key in keys[start:start + 2]]}
+
+        return Paginator()
+
+    def delete_objects(self, Bucket, Delete):
+        self.deleted.extend(item["Key"] for item in Delete["Objects"])
+        return {}
+
+
+class SessionJobsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Local stand-in for the broker: tasks run in-process, retries immediately, and a
+        # failing task is recorded on its SessionJob instead of raising out of apply_async.
+        # The project's app reads CELERY_-prefixed keys (namespace="CELERY" in EngageX/celery.py).
+        overrides = {"task_always_eager": True, "task_eager_propagates": False, "broker_url": "memory://"}
+        if current_app.namespace:
+            overrides = {f"{current_app.namespace}_{key}".upper(): value for key, value in overrides.items()}
+        cls._celery_conf = {key: current_app.conf.get(key) for key in overrides}
+        current_app.conf.update(overrides)
+
+    @classmethod
+    def tearDownClass(cls):
+        current_app.conf.update(cls._celery_conf)
+        super().tearDownClass()
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="speaker@example.com", password="pass")
+        self.session = PracticeSession.objects.create(user=user, session_name="Pitch", session_type="pitch")
+        self.keys = [session_s3_key(user.id, self.session.id, f"chunk_{n}.webm") for n in range(3)]
+        for n, key in enumerate(self.keys):
+            SessionChunk.objects.create(session=self.session, chunk_number=n, video_file=s3_url(key))
+        self.client = FakeS3Listing({key: f"chunk{n}".encode() for n, key in enumerate(self.keys)})
+
+        patches = [
+            mock.patch.object(tasks, "get_s3_client", return_value=self.client),
+            # `cat` stands in for the ffmpeg remux
+            mock.patch.object(tasks, "SessionVideoCompiler",
+                              lambda client, bucket: SessionVideoCompiler(client, bucket, command=CAT_COMMAND)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def enqueue_compile(self):
+        return enqueue_job(tasks.compile_session_video, self.session.id)
+
+    def compile_job(self):
+        return SessionJob.objects.get(session_id=self.session.id, task=tasks.compile_session_video.name)
+
+    def test_compile_job_runs_once_per_key(self):
+        job = self.enqueue_compile()
+        self.enqueue_compile()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 1))
+        self.assertEqual(len(self.client.completed), 1)
+        compiled = next(iter(self.client.completed.values()))
+        self.assertEqual(compiled, b"chunk0chunk1chunk2")
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.compiled_video_url.endswith(f"{self.session.id}_compiled.webm"))
+
+    def test_failures_are_retried(self):
+        self.client.fail_completes = 1
+
+        self.enqueue_compile()
+
+        job = self.compile_job()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 2))
+        self.assertEqual(len(self.client.aborted), 1)
+
+    def test_exhausted_job_fails_and_can_be_enqueued_again(self):
+        self.client.fail_completes = 10
+        with mock.patch.object(tasks.compile_session_video, "max_retries", 1):
+            self.enqueue_compile()
+        job = self.compile_job()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIn("connection reset", job.error)
+
+        self.client.fail_completes = 0
+        self.enqueue_compile()
+        self.assertEqual(self.compile_job().status, "succeeded")
+
+    def test_compile_waits_for_pending_uploads(self):
+        SessionChunk.objects.filter(chunk_number=2).update(upload_status="pending")
+        with mock.patch.object(tasks, "COMPILE_PENDING_RETRIES", 2):
+            self.enqueue_compile()
+
+        # Retried while the chunk was pending, then compiled what was there
+        job = self.compile_job()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 3))
+
+    def test_deleting_a_session_cleans_up_its_media(self):
+        other_key = session_s3_key(999, 1, "chunk_0.webm")
+        self.client.objects[other_key] = b"other"
+        session_id = self.session.id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session.delete()
+
+        self.assertEqual(sorted(self.client.deleted), sorted(self.keys))
+        job = SessionJob.objects.get(session_id=session_id, task=tasks.cleanup_session_media.name)
+        self.assertEqual(job.status, "succeeded")
+
+    def test_unreachable_broker_marks_the_job_failed(self):
+        with mock.patch.object(tasks.compile_session_video, "apply_async", side_effect=ConnectionError("refused")):
+            with self.assertRaises(JobEnqueueError) as raised:
+                self.enqueue_compile()
+        raised.exception.job.refresh_from_db()
+        self.assertEqual(raised.exception.job.status, "failed")
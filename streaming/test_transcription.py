@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+from django.test import SimpleTestCase
+from websockets.asyncio.server import serve
+
+from streaming.transcription import ChunkTranscript, LiveTranscriber
+
+SAMPLE_RATE = 16000
+
+
+class FakeDeepgram:
+    """
+    Minimal live transcription server: counts the audio it receives and answers each
+    Finalize with an interim and a final result covering the audio not yet finalized.
+    """
+
+    def __init__(self, answer_finalize=True):
+        self.answer_finalize = answer_finalize
+        self.headers = None
+        self.keepalives = 0
+
+    async def handler(self, connection):
+        self.headers = connection.request.headers
+        received = finalized = 0.0
+        segment = 0
+        async for message in connection:
+            if isinstance(message, bytes):
+                received += len(message) / 2 / SAMPLE_RATE
+                continue
+            kind = json.loads(message)["type"]
+            if kind == "KeepAlive":
+                self.keepalives += 1
+            elif kind == "CloseStream":
+                return
+            elif kind == "Finalize" and self.answer_finalize:
+                segment += 1
+                for is_final, text in ((False, f"segment {segment}"), (True, f"segment {segment} final")):
+                    await connection.send(json.dumps({
+                        "type": "Results", "is_final": is_final, "from_finalize": is_final,
+                        "start": finalized, "duration": received - finalized,
+                        "channel": {"alternatives": [{"transcript": text}]},
+                    }))
+                finalized = received
+
+
+class LiveTranscriberTest(SimpleTestCase):
+    async def run_session(self, server, chunks, timeout=5.0):
+        updates = []
+        async with serve(server.handler, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            transcriber = LiveTranscriber("test-key", on_update=lambda *update: updates.append(update),
+                                          url=f"ws://127.0.0.1:{port}/v1/listen")
+            await transcriber.start()
+            texts = []
+            for i, seconds in enumerate(chunks):
+                await transcriber.feed(f"chunk{i}", np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32))
+            for i in range(len(chunks)):
+                texts.append(await transcriber.transcript(f"chunk{i}", timeout=timeout))
+            await transcriber.close()
+        return texts, updates
+
+    async def test_segments_land_in_their_chunks(self):
+        server = FakeDeepgram()
+        texts, updates = await self.run_session(server, [2.0, 1.5])
+
+        self.assertEqual(texts, ["segment 1 final", "segment 2 final"])
+        self.assertEqual(updates[0], ("chunk0", "segment 1", False))
+        self.assertEqual(updates[1], ("chunk0", "segment 1 final", True))
+        self.assertEqual(server.headers["Authorization"], "Token test-key")
+
+    async def test_partial_transcript_after_timeout(self):
+        texts, updates = await self.run_session(FakeDeepgram(answer_finalize=False), [1.0], timeout=0.2)
+
+        self.assertEqual(texts, [""])
+        self.assertEqual(updates, [])
+
+    def test_interim_then_final_message_handling(self):
+        transcriber = LiveTranscriber("test-key")
+        transcriber.chunks["a"] = ChunkTranscript(0.0, 10.0)
+
+        def result(text, is_final, start, duration):
+            return json.dumps({"type": "Results", "is_final": is_final, "start": start, "duration": duration,
+                               "channel": {"alternatives": [{"transcript": text}]}})
+
+        transcriber.handle_message(result("hello", True, 0.0, 4.0))
+        transcriber.handle_message(result("there wor", False, 4.0, 3.0))
+        self.assertEqual(transcriber.chunks["a"].text, "hello there wor")
+        self.assertFalse(transcriber.chunks["a"].done.is_set())
+
+        transcriber.handle_message(result("there world", True, 4.0, 6.0))
+        self.assertEqual(transcriber.chunks["a"].text, "hello there world")
+        self.assertTrue(transcriber.chunks["a"].done.is_set())
@@ -0,0 +1,109 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from streaming.video_compiler import CompileError, SessionVideoCompiler
+
+
+class FakeS3:
+    """Ranged get_object and multipart upload stand-in."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = []
+        self.uploads = {}
+        self.completed = {}
+        self.aborted = []
+        self.lock = threading.Lock()
+
+    def get_object(self, Bucket, Key, Range):
+        if Key not in self.objects:
+            raise KeyError(f"NoSuchKey: {Key}")
+        data = self.objects[Key]
+        start, end = (int(n) for n in Range.split("=")[1].split("-"))
+        body = data[start:end + 1]
+        with self.lock:
+            self.gets.append((Key, start))
+        return {"Body": io.BytesIO(body), "ContentRange": f"bytes {start}-{start + len(body) - 1}/{len(data)}"}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.uploads[Key] = {}
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.uploads[Key][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = MultipartUpload["Parts"]
+        assert [part["PartNumber"] for part in parts] == list(range(1, len(parts) + 1))
+        self.completed[Key] = b"".join(self.uploads[Key][part["PartNumber"]] for part in parts)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(Key)
+
+
+# `cat` stands in for the ffmpeg remux: the output file is the chunks' bytes in order
+CAT_COMMAND = ["sh", "-c", 'cat > "$0"', "{output}"]
+
+
+def compiler(client, **kwargs):
+    kwargs.setdefault("range_size", 7)
+    kwargs.setdefault("part_size", 16)
+    return SessionVideoCompiler(client, "bucket", fetch_concurrency=3, command=CAT_COMMAND, **kwargs)
+
+
+class SessionVideoCompilerTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_streams_chunks_in_order_into_a_multipart_upload(self):
+        objects = {f"chunk_{n}.webm": bytes([65 + n]) * (n * 5 + 1) for n in range(12)}
+        client = FakeS3(objects)
+
+        size = compiler(client, tmp_dir=self.tmp_dir).compile(list(objects), "compiled.webm")
+
+        expected = b"".join(objects.values())
+        self.assertEqual(client.completed["compiled.webm"], expected)
+        self.assertEqual(size, len(expected))
+        self.assertEqual(len(client.uploads["compiled.webm"]), -(-len(expected) // 16))
+        # Larger chunks were fetched as several ranges
+        self.assertEqual([start for key, start in client.gets if key == "chunk_11.webm"],
+                         [0, 7, 14, 21, 28, 35, 42, 49])
+        self.assertEqual(os.listdir(self.tmp_dir), [])  # the remuxed file is removed once uploaded
+
+    def test_missing_chunks_are_skipped(self):
+        client = FakeS3({"a": b"aaaa", "c": b"cccc"})
+        video = compiler(client)
+
+        video.compile(["a", "b", "c"], "compiled.webm")
+
+        self.assertEqual(client.completed["compiled.webm"], b"aaaacccc")
+        self.assertEqual(video.skipped_keys, ["b"])
+
+    def test_failed_remux_uploads_nothing(self):
+        client = FakeS3({"a": b"aaaa"})
+        video = SessionVideoCompiler(client, "bucket", command=["sh", "-c", "cat >/dev/null; exit 3"],
+                                     tmp_dir=self.tmp_dir)
+
+        with self.assertRaises(CompileError):
+            video.compile(["a"], "compiled.webm")
+        self.assertNotIn("compiled.webm", client.uploads)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_failed_upload_is_aborted(self):
+        client = FakeS3({"a": b"aaaa"})
+        client.upload_part = mock.Mock(side_effect=ConnectionError("reset"))
+
+        with self.assertRaises(ConnectionError):
+            compiler(client, tmp_dir=self.tmp_dir).compile(["a"], "compiled.webm")
+        self.assertEqual(client.aborted, ["compiled.webm"])
+        self.assertNotIn("compiled.webm", client.completed)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
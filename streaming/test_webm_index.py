@@ -0,0 +1,105 @@
+import io
+
+import av
+from django.test import SimpleTestCase
+
+from streaming.test_audio_decoding import write_webm
+from streaming.webm_index import (
+    CLUSTER_ID, CUE_CLUSTER_POSITION_ID, CUE_TRACK_POSITIONS_ID, CUES_ID, INFO_ID, SEEK_HEAD_ID, SEGMENT_ID,
+    TRACKS_ID, WebmIndex, WebmIndexError, iter_children, read_element_header, read_uint,
+)
+
+
+def index(media, chunk_size=777, **kwargs):
+    webm_index = WebmIndex(**kwargs)
+    for start in range(0, len(media), chunk_size):
+        webm_index.feed(media[start:start + chunk_size])
+    return webm_index
+
+
+def element_id_at(data, offset):
+    return read_element_header(data, offset)[0]
+
+
+class WebmIndexTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = write_webm(seconds=3, keyframe_every=10)
+
+    def rebuild(self, webm_index):
+        head, cues = webm_index.finalize()
+        return head, head + self.media[webm_index.first_cluster:] + cues
+
+    def test_clusters_and_keyframes_are_indexed_across_chunk_boundaries(self):
+        webm_index = index(self.media)
+
+        self.assertIsNone(webm_index.error)
+        self.assertEqual(len(webm_index.clusters), 7)  # one every 500 ms
+        self.assertTrue(all(element_id_at(self.media, offset) == CLUSTER_ID for offset, _, _ in webm_index.clusters))
+        keyframes = [cluster[2][0] for cluster in webm_index.clusters if cluster[2] and cluster[2][1]]
+        self.assertEqual(keyframes, [0, 1000, 2000])
+        self.assertAlmostEqual(webm_index.max_timecode, 3000, delta=20)
+
+    def test_rebuilt_head_points_at_info_tracks_and_cues(self):
+        webm_index = index(self.media)
+        head, video = self.rebuild(webm_index)
+
+        self.assertGreaterEqual(len(head), webm_index.first_cluster)
+        ebml_header = read_element_header(video)
+        segment = read_element_header(video, ebml_header[2] + ebml_header[1])
+        self.assertEqual(segment[0], SEGMENT_ID)
+        data_start = ebml_header[2] + ebml_header[1] + segment[2]
+        self.assertEqual(data_start + segment[1], len(video))
+
+        seek_head = read_element_header(video, data_start)
+        self.assertEqual(seek_head[0], SEEK_HEAD_ID)
+        seeks = {}
+        for _, seek in iter_children(video[data_start + seek_head[2]:data_start + seek_head[2] + seek_head[1]]):
+            (_, target), (_, position) = iter_children(seek)
+            seeks[read_uint(target)] = read_uint(position)
+        self.assertEqual(sorted(seeks), sorted([INFO_ID, TRACKS_ID, CUES_ID]))
+        for element_id, position in seeks.items():
+            self.assertEqual(element_id_at(video, data_start + position), element_id)
+
+        cues = read_element_header(video, data_start + seeks[CUES_ID])
+        cue_points = list(iter_children(video[data_start + seeks[CUES_ID] + cues[2]:]))
+        self.assertEqual(len(cue_points), 3)
+        for _, cue_point in cue_points:
+            positions = dict(iter_children(cue_point))[CUE_TRACK_POSITIONS_ID]
+            position = read_uint(dict(iter_children(positions))[CUE_CLUSTER_POSITION_ID])
+            self.assertEqual(element_id_at(video, data_start + position), CLUSTER_ID)
+
+    def test_rebuilt_video_has_a_duration_and_seeks_to_keyframes(self):
+        _, video = self.rebuild(index(self.media))
+
+        with av.open(io.BytesIO(video)) as container:
+            self.assertAlmostEqual(container.duration / av.time_base, 3, delta=0.1)
+            container.seek(2 * av.time_base)
+            frame = next(container.decode(video=0))
+        self.assertEqual(frame.time, 2)
+        self.assertTrue(frame.key_frame)
+
+    def test_stream_that_is_not_webm_fails(self):
+        webm_index = index(b"not a webm stream" * 100)
+
+        self.assertTrue(webm_index.failed)
+        with self.assertRaises(WebmIndexError):
+            webm_index.finalize()
+
+    def test_second_stream_header_fails(self):
+        webm_index = index(self.media + write_webm(seconds=1))
+
+        self.assertTrue(webm_index.failed)
+        self.assertIn("0x1a45dfa3", str(webm_index.error))
+
+    def test_head_larger_than_max_head_fails(self):
+        with self.assertRaises(WebmIndexError):
+            index(self.media, max_head=256).finalize()
+
+    def test_stream_without_clusters_fails(self):
+        webm_index = index(self.media[:300])
+
+        self.assertFalse(webm_index.failed)
+        with self.assertRaises(WebmIndexError):
+            webm_index.finalize()
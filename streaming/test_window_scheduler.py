@@ -0,0 +1,121 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from streaming.window_scheduler import WindowScheduler
+
+
+class ControlledAnalysis:
+    """analyze() callable whose windows finish only when released."""
+
+    def __init__(self):
+        self.started = []
+        self.releases = {}
+
+    async def __call__(self, paths, chunk_number):
+        self.started.append(chunk_number)
+        self.releases[chunk_number] = asyncio.Event()
+        await self.releases[chunk_number].wait()
+
+    async def finish(self, chunk_number):
+        self.releases[chunk_number].set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+
+def window(chunk_number, size=3):
+    return [f"chunk{n}" for n in range(chunk_number - size + 1, chunk_number + 1)]
+
+
+class WindowSchedulerTest(SimpleTestCase):
+    async def test_skips_stale_windows_and_runs_the_newest(self):
+        analysis, reports = ControlledAnalysis(), []
+
+        async def on_report(report):
+            reports.append(report)
+
+        scheduler = WindowScheduler(analysis, max_in_flight=1, on_report=on_report)
+
+        self.assertEqual(scheduler.submit(window(3), 3), "started")
+        for chunk_number in (4, 5, 6):
+            self.assertEqual(scheduler.submit(window(chunk_number), chunk_number), "queued")
+        await asyncio.sleep(0)
+        self.assertEqual(analysis.started, [3])
+        self.assertEqual(scheduler.skipped, 2)
+
+        await analysis.finish(3)
+        self.assertEqual(analysis.started, [3, 6])
+        self.assertEqual([report.chunk_number for report in reports], [3])
+        self.assertEqual(reports[0].skipped, 2)
+
+        await analysis.finish(6)
+        self.assertGreater(reports[1].queued, 0)
+        self.assertGreaterEqual(reports[1].lag, reports[1].queued)
+        self.assertEqual(scheduler.in_flight, {})
+
+    async def test_bounded_concurrency(self):
+        analysis = ControlledAnalysis()
+        scheduler = WindowScheduler(analysis, max_in_flight=2)
+
+        statuses = [scheduler.submit(window(n), n) for n in (3, 4, 5)]
+        await asyncio.sleep(0)
+
+        self.assertEqual(statuses, ["started", "started", "queued"])
+        self.assertEqual(analysis.started, [3, 4])
+        await analysis.finish(4)
+        self.assertEqual(analysis.started, [3, 4, 5])
+
+    async def test_protected_paths_cover_other_windows(self):
+        analysis = ControlledAnalysis()
+        scheduler = WindowScheduler(analysis, max_in_flight=1)
+        scheduler.submit(window(3), 3)
+        scheduler.submit(window(4), 4)
+        running = next(iter(scheduler.in_flight)).paths
+
+        self.assertEqual(scheduler.protected_paths(running), set(window(4)))
+        self.assertEqual(scheduler.protected_paths(), set(window(3)) | set(window(4)))
+
+        await scheduler.close(timeout=0)
+        self.assertEqual(scheduler.submit(window(5), 5), "closed")
+        await analysis.finish(3)
+        self.assertEqual(analysis.started, [3, 4])
+
+    async def test_close_can_drop_the_pending_window(self):
+        analysis = ControlledAnalysis()
+        scheduler = WindowScheduler(analysis, max_in_flight=1)
+        scheduler.submit(window(3), 3)
+        scheduler.submit(window(4), 4)
+
+        await scheduler.close(timeout=0, drop_pending=True)
+        await analysis.finish(3)
+
+        self.assertEqual(analysis.started, [3])
+        self.assertEqual(scheduler.skipped, 1)
+
+    async def test_close_waits_for_the_pending_window(self):
+        analysis = ControlledAnalysis()
+        scheduler = WindowScheduler(analysis, max_in_flight=1)
+        scheduler.submit(window(3), 3)
+        scheduler.submit(window(4), 4)
+
+        close = asyncio.create_task(scheduler.close(timeout=5))
+        await asyncio.sleep(0)
+        await analysis.finish(3)
+        self.assertEqual(analysis.started, [3, 4])
+        self.assertFalse(close.done())  # the pending window started after close() was called
+
+        await analysis.finish(4)
+        self.assertTrue(await close)
+        self.assertEqual(scheduler.in_flight, {})
+        self.assertIsNone(scheduler.pending)
+
+    async def test_close_gives_up_after_the_timeout(self):
+        analysis = ControlledAnalysis()
+        scheduler = WindowScheduler(analysis, max_in_flight=1)
+        scheduler.submit(window(3), 3)
+        scheduler.submit(window(4), 4)
+
+        self.assertFalse(await scheduler.close(timeout=0.05))
+        self.assertIsNotNone(scheduler.pending)
+        await analysis.finish(3)
+        await analysis.finish(4)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from streaming.prosody import ProsodySummary
+from streaming.workers import CPUTaskTimeout, CPUWorkerPool, SharedArray
+
+
+def tone(seconds=2, sample_rate=16000):
+    t = np.arange(seconds * sample_rate) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 180 * t) * (t % 1 < 0.6)).astype(np.float32)
+
+
+class SharedArrayTest(SimpleTestCase):
+    def test_round_trip(self):
+        array = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+        block, handle = SharedArray.create(array)
+        try:
+            attached, view = handle.open()
+            np.testing.assert_array_equal(view, array)
+            del view
+            attached.close()
+        finally:
+            block.close()
+            block.unlink()
+
+
+class CPUWorkerPoolTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pool = CPUWorkerPool(max_workers=1, preload=["numpy", "parselmouth", "streaming.prosody"])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        super().tearDownClass()
+
+    def test_prosody_in_worker_matches_in_process(self):
+        samples = tone()
+
+        summary = asyncio.run(self.pool.summarize_prosody(samples))
+        expected = ProsodySummary.from_samples(samples)
+
+        self.assertTrue(self.pool.uses_processes)
+        self.assertEqual(summary.pitch_count, expected.pitch_count)
+        self.assertAlmostEqual(summary.pitch_sum, expected.pitch_sum)
+        np.testing.assert_array_equal(summary.intensity_values, expected.intensity_values)
+
+    def test_task_timeout(self):
+        async def run():
+            with self.assertRaises(CPUTaskTimeout):
+                await self.pool.run(time.sleep, 1, timeout=0.1)
+
+            # The only worker is still sleeping, so the next task waits for its slot
+            # instead of queueing in the executor and using up its timeout there
+            start = time.monotonic()
+            await self.pool.run(time.sleep, 0, timeout=0.5)
+            self.assertGreater(time.monotonic() - start, 0.5)
+
+        asyncio.run(run())
+
+    def test_thread_fallback(self):
+        pool = CPUWorkerPool(max_workers=0)
+        summary = asyncio.run(pool.summarize_prosody(tone(seconds=1)))
+
+        self.assertFalse(pool.uses_processes)
+        self.assertAlmostEqual(summary.duration, 1.0)
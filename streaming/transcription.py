@@ -0,0 +1,246 @@
+"""
+Streaming (live) transcription for live sessions.
+
+In the default "prerecorded" mode every 10 s chunk is sent to Deepgram's REST API on its
+own, so a chunk's transcript arrives a full request round trip after the chunk, and the
+request grows with the chunk. In "streaming" mode a session keeps one live connection open
+and sends the decoded PCM of each chunk as soon as it is decoded. Deepgram transcribes it
+incrementally and sends back interim and final segments; each segment is attributed to the
+chunk whose audio it covers and written into the session's transcript buffer through the
+`on_update` callback.
+
+The connection goes through a transport object (`connect(url, headers)` returning a
+connection with async `send`, `recv` and `close`), so tests can run against a local fake
+server or swap the websocket client entirely.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+import numpy as np
+
+from .audio_decoding import ANALYSIS_SAMPLE_RATE
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# "prerecorded" (one REST request per chunk) or "streaming" (one live connection per session)
+TRANSCRIPTION_MODE = os.getenv("TRANSCRIPTION_MODE", "prerecorded")
+STREAMING_TRANSCRIPTION = "streaming"
+
+DEEPGRAM_LIVE_URL = "wss://api.deepgram.com/v1/listen"
+
+# Same model and formatting as the prerecorded requests in transcribe_audio
+LIVE_OPTIONS = {
+    "model": "nova-3",
+    "smart_format": "true",
+    "filler_words": "true",
+    "interim_results": "true",
+    "encoding": "linear16",
+    "channels": 1,
+}
+
+# Audio is sent in blocks of this many seconds
+SEND_BLOCK_SECONDS = 0.5
+
+# Deepgram closes idle connections after ~10 s without audio; chunks arrive every ~10 s
+KEEPALIVE_INTERVAL = 4.0
+
+# How long a window waits for a chunk's final transcript before using what it has
+FINAL_TRANSCRIPT_TIMEOUT = 10.0
+
+# A chunk is final once final segments cover its audio up to this many seconds from its end
+COVERAGE_TOLERANCE = 0.1
+
+
+class TranscriptionError(Exception):
+    """Raised when the live transcription connection cannot be used."""
+
+
+class WebSocketTransport:
+    """Default transport: a websocket client connection."""
+
+    async def connect(self, url, headers):
+        from websockets.asyncio.client import connect
+        return await connect(url, additional_headers=headers, max_size=None)
+
+
+def to_linear16(samples):
+    """Converts float PCM in [-1, 1] to little-endian 16-bit PCM bytes."""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+@dataclass
+class ChunkTranscript:
+    start: float  # stream time (s) of the chunk's first sample
+    end: float  # stream time (s) just after its last sample
+    finals: list = field(default_factory=list)
+    interim: str = ""
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def text(self):
+        return " ".join(part for part in self.finals + [self.interim] if part)
+
+
+class LiveTranscriber:
+    """One live transcription connection for one session."""
+
+    def __init__(self, api_key, on_update=None, transport=None, url=DEEPGRAM_LIVE_URL, options=None,
+                 sample_rate=ANALYSIS_SAMPLE_RATE):
+        self.api_key = api_key
+        self.on_update = on_update  # on_update(key, text, is_final) for every segment
+        self.transport = transport or WebSocketTransport()
+        self.sample_rate = sample_rate
+        self.url = f"{url}?{urlencode({**LIVE_OPTIONS, **(options or {}), 'sample_rate': sample_rate})}"
+
+        self.chunks = {}  # key -> ChunkTranscript, in stream order
+        self.error = None
+        self._connection = None
+        self._send_lock = asyncio.Lock()
+        self._sent_seconds = 0.0
+        self._last_send = 0.0
+        self._tasks = []
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    async def start(self):
+        """Opens the connection. Raises TranscriptionError if it cannot be established."""
+        try:
+            self._connection = await self.transport.connect(self.url, {"Authorization": f"Token {self.api_key}"})
+        except Exception as e:
+            raise TranscriptionError(f"Could not open live transcription connection: {e}") from e
+        self._last_send = time.monotonic()
+        self._tasks = [asyncio.create_task(self._receive_loop()), asyncio.create_task(self._keepalive_loop())]
+
+    async def feed(self, key, samples):
+        """Sends one chunk's decoded audio. Its transcript becomes available through transcript(key)."""
+        if self.failed or self._connection is None:
+            raise TranscriptionError(f"Live transcription unavailable: {self.error}")
+
+        duration = samples.size / self.sample_rate
+        self.chunks[key] = ChunkTranscript(self._sent_seconds, self._sent_seconds + duration)
+        self._sent_seconds += duration
+
+        block = int(SEND_BLOCK_SECONDS * self.sample_rate)
+        try:
+            async with self._send_lock:
+                for offset in range(0, samples.size, block):
+                    await self._connection.send(to_linear16(samples[offset:offset + block]))
+                # Ask for everything sent so far to be finalized instead of waiting for an endpoint
+                await self._connection.send(json.dumps({"type": "Finalize"}))
+                self._last_send = time.monotonic()
+        except Exception as e:
+            self._fail(e)
+            raise TranscriptionError(f"Live transcription connection lost: {e}") from e
+
+    async def transcript(self, key, timeout=FINAL_TRANSCRIPT_TIMEOUT):
+        """Returns the chunk's transcript once final, or whatever has arrived after `timeout` seconds."""
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return None
+        try:
+            await asyncio.wait_for(chunk.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Transcript for %s not final after %ss; using partial transcript", key, timeout)
+        return chunk.text
+
+    def forget(self, key):
+        self.chunks.pop(key, None)
+
+    async def close(self):
+        """Flushes and closes the connection."""
+        if self._connection is not None and not self.failed:
+            try:
+                async with self._send_lock:
+                    await self._connection.send(json.dumps({"type": "CloseStream"}))
+                await asyncio.wait_for(asyncio.shield(self._tasks[0]), 2.0)
+            except Exception:
+                pass
+        for task in self._tasks:
+            task.cancel()
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+        self._release_waiters()
+
+    # ---------------------- internals ----------------------
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                message = await self._connection.recv()
+                self.handle_message(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The connection closed (normally after CloseStream) or broke
+            if self.error is None:
+                self.error = e
+            self._release_waiters()
+
+    async def _keepalive_loop(self):
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL / 2)
+            if time.monotonic() - self._last_send < KEEPALIVE_INTERVAL:
+                continue
+            try:
+                async with self._send_lock:
+                    await self._connection.send(json.dumps({"type": "KeepAlive"}))
+                    self._last_send = time.monotonic()
+            except Exception as e:
+                self._fail(e)
+                return
+
+    def handle_message(self, message):
+        """Applies one server message (a JSON string) to the chunk transcripts."""
+        data = json.loads(message)
+        if data.get("type") != "Results":
+            return
+
+        alternatives = data.get("channel", {}).get("alternatives") or [{}]
+        text = (alternatives[0].get("transcript") or "").strip()
+        start = float(data.get("start", 0.0))
+        end = start + float(data.get("duration", 0.0))
+        is_final = bool(data.get("is_final"))
+
+        key, chunk = self._chunk_at((start + end) / 2)
+        if chunk is not None:
+            if is_final:
+                if text:
+                    chunk.finals.append(text)
+                chunk.interim = ""
+            else:
+                chunk.interim = text
+            if self.on_update is not None:
+                self.on_update(key, chunk.text, is_final)
+
+        if is_final:
+            # Final segments are contiguous: every chunk whose audio ends before this one is complete
+            for other in self.chunks.values():
+                if other.end <= end + COVERAGE_TOLERANCE:
+                    other.done.set()
+
+    def _chunk_at(self, t):
+        for key, chunk in self.chunks.items():
+            if chunk.start <= t < chunk.end:
+                return key, chunk
+        return None, None
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+            logger.warning("Connection failed: %s", error)
+        self._release_waiters()
+
+    def _release_waiters(self):
+        for chunk in self.chunks.values():
+            chunk.done.set()
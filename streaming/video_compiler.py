@@ -0,0 +1,210 @@
+"""
+Streaming compilation of a session's chunks into one video.
+
+MediaRecorder chunks are continuations of a single WebM stream, so the session video is
+the chunks' bytes in order, remuxed. Instead of downloading every chunk to disk one at a
+time, concatenating them with ffmpeg and uploading the result, the compiler streams:
+
+- Chunks are fetched with ranged GETs (COMPILE_RANGE_MB per request) on a small thread
+  pool. At most COMPILE_FETCH_CONCURRENCY ranges are in flight or waiting to be written,
+  so memory stays bounded however long the session is.
+- The ranges are written in order into ffmpeg's stdin, which remuxes them (-c copy) into
+  a temporary file under COMPILE_TMP_DIR.
+- The file is sent to S3 as a multipart upload of COMPILE_PART_MB parts, with up to
+  COMPILE_UPLOAD_CONCURRENCY parts in flight, and deleted.
+
+The chunks never touch the disk, only the remuxed video does (once), and wall time is
+bounded by S3 and ffmpeg throughput rather than by one round trip per chunk. ffmpeg
+writes to a seekable file so that it can go back and fill in the duration and append the
+seek index (cues) that MediaRecorder's recordings lack; players need both to seek.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import observe_stage
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+COMPILE_FETCH_CONCURRENCY = int(os.getenv("COMPILE_FETCH_CONCURRENCY", 4))
+COMPILE_UPLOAD_CONCURRENCY = int(os.getenv("COMPILE_UPLOAD_CONCURRENCY", 2))
+COMPILE_RANGE_MB = int(os.getenv("COMPILE_RANGE_MB", 8))
+# S3 requires every part but the last to be at least 5 MB
+COMPILE_PART_MB = max(5, int(os.getenv("COMPILE_PART_MB", 8)))
+COMPILE_TMP_DIR = os.getenv("COMPILE_TMP_DIR") or tempfile.gettempdir()
+
+# "{output}" is replaced with the path of the temporary output file
+FFMPEG_REMUX_COMMAND = [
+    "ffmpeg", "-hide_banner", "-loglevel", "error",
+    "-f", "matroska", "-i", "pipe:0",
+    "-c", "copy", "-f", "webm", "-y", "{output}",
+]
+
+
+class CompileError(Exception):
+    """Raised when the session video could not be produced or uploaded."""
+
+
+class SessionVideoCompiler:
+    def __init__(self, client, bucket, fetch_concurrency=COMPILE_FETCH_CONCURRENCY,
+                 upload_concurrency=COMPILE_UPLOAD_CONCURRENCY, range_size=COMPILE_RANGE_MB * 1024 * 1024,
+                 part_size=COMPILE_PART_MB * 1024 * 1024, command=FFMPEG_REMUX_COMMAND,
+                 tmp_dir=COMPILE_TMP_DIR):
+        self.client = client
+        self.bucket = bucket
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.upload_concurrency = max(1, upload_concurrency)
+        self.range_size = range_size
+        self.part_size = part_size
+        self.command = command
+        self.tmp_dir = tmp_dir
+        self.skipped_keys = []  # chunks that could not be fetched, left out of the video
+
+    def compile(self, keys, output_key, content_type="video/webm"):
+        """
+        Streams the objects at `keys`, in order, through the remuxer into a temporary file and
+        uploads it to `output_key`. Blocking; returns the number of bytes uploaded. Raises
+        CompileError.
+        """
+        start_time = time.time()
+        fd, output_path = tempfile.mkstemp(prefix="compile-", suffix=".webm", dir=self.tmp_dir)
+        os.close(fd)
+        try:
+            command = [arg.replace("{output}", output_path) for arg in self.command]
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE)
+            stderr_tail = deque(maxlen=20)
+            stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+            stderr_reader.start()
+
+            feed_errors = []
+            feeder = threading.Thread(target=self._feed, args=(keys, process.stdin, feed_errors), daemon=True)
+            feeder.start()
+            try:
+                feeder.join()
+                returncode = process.wait()
+            except BaseException:
+                process.kill()
+                raise
+            stderr_reader.join(timeout=1)
+            if feed_errors:
+                raise CompileError(f"fetching chunks failed: {feed_errors[0]}")
+            if returncode != 0:
+                raise CompileError(f"remuxer exited with code {returncode}: {b''.join(stderr_tail).decode(errors='replace')}")
+            if not os.path.getsize(output_path):
+                raise CompileError("remuxer produced no output")
+
+            with open(output_path, "rb") as output:
+                size, parts = self._upload(output, output_key, content_type)
+        finally:
+            os.remove(output_path)
+
+        logger.info("Compiled %s/%s chunks into %s (%s bytes, %s parts) after %.2f seconds", len(keys) - len(self.skipped_keys), len(keys), output_key, size, len(parts), time.time() - start_time)
+        observe_stage("compile", time.time() - start_time)
+        return size
+
+    def _upload(self, output, key, content_type):
+        """Uploads the remuxed file as a multipart upload. Returns (bytes, completed part list)."""
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type)["UploadId"]
+        try:
+            size, parts = self._upload_parts(output, key, upload_id)
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except Exception as e:
+                logger.warning("Could not abort multipart upload of %s: %s", key, e)
+            raise
+        return size, parts
+
+    def _fetch_range(self, key, start):
+        """Returns (body, total object size) of one range of an object."""
+        response = self.client.get_object(Bucket=self.bucket, Key=key,
+                                          Range=f"bytes={start}-{start + self.range_size - 1}")
+        body = response["Body"].read()
+        content_range = response.get("ContentRange")  # "bytes start-end/total"
+        total = int(content_range.rsplit("/", 1)[1]) if content_range else start + len(body)
+        return body, total
+
+    def _ranges(self, keys, pool):
+        """
+        Yields the bodies of every range of every key, in order. Keeps up to `fetch_concurrency`
+        ranges fetching ahead of the one being yielded. An object's size is only known from its
+        first range, so its later ranges are queued once that one arrives.
+        """
+        keys = iter(keys)
+        window = deque()  # [key, start, future or None], in output order
+
+        def fill():
+            while len(window) < self.fetch_concurrency:
+                key = next(keys, None)
+                if key is None:
+                    break
+                window.append([key, 0, None])
+            for unit in list(window)[:self.fetch_concurrency]:
+                if unit[2] is None:
+                    unit[2] = pool.submit(self._fetch_range, unit[0], unit[1])
+
+        fill()
+        while window:
+            key, start, future = window.popleft()
+            try:
+                body, total = future.result()
+            except Exception as e:
+                if start:
+                    raise  # part of the chunk was already written; a gap would corrupt the stream
+                logger.warning("Skipping %s: %s", key, e)
+                self.skipped_keys.append(key)
+                fill()
+                continue
+            if start == 0:
+                window.extendleft(reversed([[key, offset, None]
+                                            for offset in range(start + len(body), total, self.range_size)]))
+            fill()
+            yield body
+
+    def _feed(self, keys, stdin, errors):
+        """Writes every chunk, in order, into the remuxer's stdin, then closes it."""
+        try:
+            with ThreadPoolExecutor(self.fetch_concurrency, thread_name_prefix="compile-fetch") as pool:
+                for body in self._ranges(keys, pool):
+                    stdin.write(body)
+        except BrokenPipeError:
+            pass  # the remuxer exited; its return code says why
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _upload_parts(self, output, key, upload_id):
+        """Uploads `output` in `part_size` parts, `upload_concurrency` at a time."""
+        size, parts, in_flight = 0, [], deque()
+        with ThreadPoolExecutor(self.upload_concurrency, thread_name_prefix="compile-upload") as pool:
+            part_number = 1
+            while True:
+                data = output.read(self.part_size)
+                if not data:
+                    break
+                if len(in_flight) >= self.upload_concurrency:
+                    parts.append(in_flight.popleft().result())
+                in_flight.append(pool.submit(self._upload_part, key, upload_id, part_number, data))
+                size += len(data)
+                part_number += 1
+            parts.extend(future.result() for future in in_flight)
+        return size, parts
+
+    def _upload_part(self, key, upload_id, part_number, data):
+        response = self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                           PartNumber=part_number, Body=data)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
@@ -0,0 +1,343 @@
+"""
+Incremental seek index for a live WebM stream.
+
+MediaRecorder writes WebM for live streaming: the Segment and its Clusters have unknown
+sizes, Info carries no Duration and there are no Cues, so players can neither show the
+length of a recording nor seek in it. A WebmIndex is fed the stream as it is recorded and
+keeps what is needed to fix that at the end without reading the stream again:
+
+- the bytes of every element before the first Cluster (the "head": EBML header, Info,
+  Tracks, Tags, ...), which are small;
+- the offset and timecode of every Cluster, and whether its first block on the cue track
+  (the video track, else the first track) is a keyframe;
+- the latest block timestamp, for the Duration.
+
+Only element headers and the first bytes of each block are parsed; block payloads are
+skipped as they go past. `finalize()` then returns a new head (Segment of known size, a
+SeekHead, Info with Duration) that replaces the bytes before the first Cluster, and the
+Cues element to append after the last one. The Clusters themselves are kept byte for byte.
+"""
+
+import struct
+
+EBML_HEADER_ID = 0x1A45DFA3
+SEGMENT_ID = 0x18538067
+SEEK_HEAD_ID = 0x114D9B74
+SEEK_ID = 0x4DBB
+SEEK_ID_ID = 0x53AB
+SEEK_POSITION_ID = 0x53AC
+INFO_ID = 0x1549A966
+DURATION_ID = 0x4489
+TRACKS_ID = 0x1654AE6B
+TRACK_ENTRY_ID = 0xAE
+TRACK_NUMBER_ID = 0xD7
+TRACK_TYPE_ID = 0x83
+CLUSTER_ID = 0x1F43B675
+CLUSTER_TIMECODE_ID = 0xE7
+SIMPLE_BLOCK_ID = 0xA3
+BLOCK_GROUP_ID = 0xA0
+BLOCK_ID = 0xA1
+CUES_ID = 0x1C53BB6B
+CUE_POINT_ID = 0xBB
+CUE_TIME_ID = 0xB3
+CUE_TRACK_POSITIONS_ID = 0xB7
+CUE_TRACK_ID = 0xF7
+CUE_CLUSTER_POSITION_ID = 0xF1
+VOID_ID = 0xEC
+
+# Children of a Segment; seeing one inside a Cluster of unknown size ends the Cluster
+SEGMENT_CHILD_IDS = {SEEK_HEAD_ID, INFO_ID, TRACKS_ID, CLUSTER_ID, CUES_ID, 0x1941A469, 0x1043A770, 0x1254C367}
+# Elements before the first Cluster that the rebuilt head leaves out
+DROPPED_HEAD_IDS = {SEEK_HEAD_ID, VOID_ID, CUES_ID}
+
+VIDEO_TRACK_TYPE = 1
+# A SimpleBlock's track number (up to 8 bytes), timecode (2 bytes) and flags (1 byte)
+BLOCK_HEADER_MAX = 11
+SIZE_WIDTH = 8  # bytes used for sizes the rebuilt head has to know in advance
+
+
+class WebmIndexError(ValueError):
+    """Raised when the stream is not WebM the index can rebuild."""
+
+
+def read_vint(data, offset, keep_marker=False):
+    """
+    Reads an EBML variable-size integer at `offset`. Returns (value, length), or None if `data`
+    ends before it does. Element IDs keep their length marker; sizes do not.
+    """
+    if offset >= len(data):
+        return None
+    first = data[offset]
+    if not first:
+        raise WebmIndexError(f"invalid variable-size integer at byte {offset}")
+    length = 9 - first.bit_length()
+    if offset + length > len(data):
+        return None
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def read_element_header(data, offset=0):
+    """Returns (element id, size or None if unknown, header length), or None if incomplete."""
+    element_id = read_vint(data, offset, keep_marker=True)
+    if element_id is None:
+        return None
+    size = read_vint(data, offset + element_id[1])
+    if size is None:
+        return None
+    unknown = size[0] == (1 << (7 * size[1])) - 1
+    return element_id[0], None if unknown else size[0], element_id[1] + size[1]
+
+
+def iter_children(payload):
+    """Yields (element id, payload) of the known-size elements in a master element's payload."""
+    offset = 0
+    while offset < len(payload):
+        header = read_element_header(payload, offset)
+        if header is None or header[1] is None or offset + header[2] + header[1] > len(payload):
+            raise WebmIndexError("truncated element")
+        element_id, size, header_length = header
+        yield element_id, payload[offset + header_length:offset + header_length + size]
+        offset += header_length + size
+
+
+def encode_size(size, width=None):
+    if width is None:
+        width = 1
+        while size >= (1 << (7 * width)) - 1:
+            width += 1
+    return ((1 << (7 * width)) | size).to_bytes(width, "big")
+
+
+def encode_element(element_id, payload, size_width=None):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + encode_size(len(payload), size_width) + payload
+
+
+def encode_uint(element_id, value, width=None):
+    return encode_element(element_id, value.to_bytes(width or max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def read_uint(payload):
+    return int.from_bytes(payload, "big")
+
+
+class WebmIndex:
+    def __init__(self, max_head=8 * 1024 * 1024):
+        self.max_head = max_head  # the head must be complete within this many bytes
+        self.error = None  # first parse failure; the index cannot be finalized after one
+        self.size = 0  # bytes fed so far
+        self.segment_data_start = None
+        self.first_cluster = None  # offset of the first Cluster, where the head ends
+        self.clusters = []  # [offset, timecode, first cue track block is a keyframe or None]
+        self.max_timecode = None
+        self._head = []  # (element id, bytes) of the elements before the first Cluster
+        self._pending = bytearray()  # unparsed bytes, starting at offset `self.size - len(self._pending)`
+        self._skip = 0  # bytes of the current element still to go past unparsed
+        self._level = "top"  # "top", "segment" or "cluster"
+        self._cluster_end = None
+        self._cue_track = None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def feed(self, data):
+        """Indexes the next bytes of the stream. A parse failure is kept in `error`, not raised."""
+        if self.failed:
+            return
+        view = memoryview(data)
+        self.size += view.nbytes
+        skipped = min(self._skip, view.nbytes)
+        self._skip -= skipped
+        self._pending += view[skipped:]
+        try:
+            self._parse()
+        except WebmIndexError as e:
+            self.error = e
+            self._pending = bytearray()
+
+    def _parse(self):
+        pending = self._pending
+        consumed = 0
+        offset = self.size - len(pending)  # stream offset of pending[0]
+        try:
+            while True:
+                if self._skip:
+                    step = min(self._skip, len(pending) - consumed)
+                    self._skip -= step
+                    consumed += step
+                    if self._skip:
+                        return
+                position = offset + consumed
+                if self._level == "cluster" and self._cluster_end is not None and position >= self._cluster_end:
+                    self._level = "segment"
+                header = read_element_header(pending, consumed)
+                if header is None:
+                    return
+                element_id, size, header_length = header
+                if self._level == "cluster" and element_id in SEGMENT_CHILD_IDS:
+                    self._level = "segment"  # the end of a Cluster of unknown size
+                complete = size is not None and len(pending) - consumed >= header_length + size
+                element = pending[consumed + header_length:consumed + header_length + size] if complete else None
+
+                if self._level == "top":
+                    if element_id == EBML_HEADER_ID and size is not None:
+                        if not complete:
+                            return
+                        self._head.append((element_id, bytes(pending[consumed:consumed + header_length + size])))
+                        consumed += header_length + size
+                    elif element_id == SEGMENT_ID and self._head:
+                        self.segment_data_start = position + header_length
+                        self._level = "segment"
+                        consumed += header_length
+                    else:
+                        raise WebmIndexError(f"expected an EBML header and a Segment, found element {element_id:#x}")
+                elif self._level == "segment":
+                    if element_id == CLUSTER_ID:
+                        if self.first_cluster is None:
+                            self._start_clusters(position)
+                        self.clusters.append([position, None, None])
+                        self._cluster_end = None if size is None else position + header_length + size
+                        self._level = "cluster"
+                        consumed += header_length
+                    elif size is None or element_id in (EBML_HEADER_ID, SEGMENT_ID):
+                        raise WebmIndexError(f"unexpected element {element_id:#x} in the Segment")
+                    elif self.first_cluster is not None:
+                        self._skip = header_length + size  # Cues, Tags, ... after the Clusters are kept as they are
+                    elif position + header_length + size > self.max_head:
+                        raise WebmIndexError(f"no Cluster in the first {self.max_head} bytes")
+                    elif not complete:
+                        return
+                    else:
+                        if element_id not in DROPPED_HEAD_IDS:
+                            self._head.append((element_id, bytes(pending[consumed:consumed + header_length + size])))
+                        consumed += header_length + size
+                else:
+                    if size is None:
+                        raise WebmIndexError(f"unexpected element {element_id:#x} of unknown size in a Cluster")
+                    if element_id == CLUSTER_TIMECODE_ID:
+                        if not complete:
+                            return
+                        self.clusters[-1][1] = read_uint(element)
+                        consumed += header_length + size
+                    elif element_id == BLOCK_GROUP_ID:
+                        consumed += header_length  # its Block is indexed, the rest skipped
+                    elif element_id in (SIMPLE_BLOCK_ID, BLOCK_ID):
+                        available = len(pending) - consumed - header_length
+                        if available < min(size, BLOCK_HEADER_MAX):
+                            return
+                        self._index_block(pending[consumed + header_length:consumed + header_length + min(size, BLOCK_HEADER_MAX)],
+                                          keyframe=element_id == SIMPLE_BLOCK_ID)
+                        self._skip = header_length + size
+                    else:
+                        self._skip = header_length + size
+        finally:
+            del pending[:consumed]
+
+    def _start_clusters(self, position):
+        self.first_cluster = position
+        for element_id, element in self._head:
+            if element_id == TRACKS_ID:
+                self._cue_track = self._pick_cue_track(element)
+        if self._cue_track is None:
+            raise WebmIndexError("no Tracks before the first Cluster")
+
+    @staticmethod
+    def _pick_cue_track(tracks):
+        header = read_element_header(tracks)
+        numbers = []
+        for element_id, entry in iter_children(tracks[header[2]:]):
+            if element_id != TRACK_ENTRY_ID:
+                continue
+            fields = dict(iter_children(entry))
+            if TRACK_NUMBER_ID not in fields:
+                continue
+            number = read_uint(fields[TRACK_NUMBER_ID])
+            if TRACK_TYPE_ID in fields and read_uint(fields[TRACK_TYPE_ID]) == VIDEO_TRACK_TYPE:
+                return number
+            numbers.append(number)
+        return numbers[0] if numbers else None
+
+    def _index_block(self, header, keyframe):
+        cluster = self.clusters[-1]
+        if cluster[1] is None:
+            raise WebmIndexError(f"block before the Timecode of the Cluster at byte {cluster[0]}")
+        track = read_vint(header, 0)
+        if track is None or track[1] + 3 > len(header):
+            raise WebmIndexError("truncated block header")
+        relative_timecode, flags = struct.unpack_from(">hB", header, track[1])
+        timecode = cluster[1] + relative_timecode
+        self.max_timecode = timecode if self.max_timecode is None else max(self.max_timecode, timecode)
+        if track[0] == self._cue_track and cluster[2] is None:
+            cluster[2] = (timecode, keyframe and bool(flags & 0x80))
+
+    def finalize(self):
+        """
+        Returns (head, cues) for the stream fed so far: `head` replaces its first
+        `first_cluster` bytes and `cues` is appended to it. `head` is never shorter than the
+        bytes it replaces. Raises WebmIndexError.
+        """
+        if self.failed:
+            raise self.error
+        cue_points = [(cluster[0], cluster[2][0]) for cluster in self.clusters if cluster[2] and cluster[2][1]]
+        if not cue_points:
+            raise WebmIndexError("no keyframes to index" if self.clusters else "no Clusters")
+
+        ebml_header = self._head[0][1]
+        info, others, tracks_at = None, b"", None
+        for element_id, element in self._head[1:]:
+            if element_id == INFO_ID:
+                info = self._info_with_duration(element)
+                continue
+            if element_id == TRACKS_ID and tracks_at is None:
+                tracks_at = len(others)
+            others += element
+        if info is None:
+            raise WebmIndexError("no Info before the first Cluster")
+
+        # Positions are relative to the start of the Segment's data; every element in the
+        # new head has a size known in advance, so they can be computed before it is built
+        segment_header_length = len(encode_element(SEGMENT_ID, b"", SIZE_WIDTH))
+        seek_head_length = len(self._seek_head({INFO_ID: 0, TRACKS_ID: 0, CUES_ID: 0}))
+        head_length = len(ebml_header) + segment_header_length + seek_head_length + len(info) + len(others)
+        void = b""
+        if head_length < self.first_cluster:
+            padding = max(self.first_cluster - head_length, 1 + SIZE_WIDTH)
+            void = encode_element(VOID_ID, bytes(padding - 1 - SIZE_WIDTH), SIZE_WIDTH)
+            head_length += len(void)
+        data_start = len(ebml_header) + segment_header_length
+        shift = head_length - self.first_cluster  # how far the Clusters move
+        cues_position = self.size + shift - data_start
+
+        cues = encode_element(CUES_ID, b"".join(
+            encode_element(CUE_POINT_ID, encode_uint(CUE_TIME_ID, timecode) + encode_element(
+                CUE_TRACK_POSITIONS_ID, encode_uint(CUE_TRACK_ID, self._cue_track)
+                + encode_uint(CUE_CLUSTER_POSITION_ID, offset + shift - data_start)))
+            for offset, timecode in cue_points))
+        seek_head = self._seek_head({
+            INFO_ID: seek_head_length,
+            TRACKS_ID: seek_head_length + len(info) + tracks_at,
+            CUES_ID: cues_position,
+        })
+        segment_header = encode_element(SEGMENT_ID, b"", SIZE_WIDTH)[:-SIZE_WIDTH] + encode_size(
+            cues_position + len(cues), SIZE_WIDTH)
+        head = ebml_header + segment_header + seek_head + info + others + void
+        assert len(head) == head_length
+        return head, cues
+
+    def _info_with_duration(self, info):
+        header = read_element_header(info)
+        kept = b"".join(encode_element(element_id, payload) for element_id, payload in iter_children(info[header[2]:])
+                        if element_id != DURATION_ID)
+        # Duration is a float in TimecodeScale units, which block timecodes already are in
+        duration = encode_element(DURATION_ID, struct.pack(">d", float(self.max_timecode or 0)))
+        return encode_element(INFO_ID, kept + duration, SIZE_WIDTH)
+
+    @staticmethod
+    def _seek_head(positions):
+        return encode_element(SEEK_HEAD_ID, b"".join(
+            encode_element(SEEK_ID, encode_element(SEEK_ID_ID, element_id.to_bytes(4, "big"))
+                           + encode_uint(SEEK_POSITION_ID, position, SIZE_WIDTH))
+            for element_id, position in positions.items()), SIZE_WIDTH)
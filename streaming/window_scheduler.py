@@ -0,0 +1,141 @@
+"""
+Per-session scheduling of window analyses.
+
+A window is submitted for every chunk once the session has a full window. Analysing one
+takes a few seconds (transcript wait, posture/prosody merge, LLM round trip), and when that
+exceeds the chunk interval, starting a task per window lets them pile up, so feedback
+arrives later and later.
+
+The scheduler runs at most `max_in_flight` windows at a time. While all slots are busy it
+keeps a single pending window, the newest: a newer submission replaces the pending one,
+which is skipped (its chunks are covered by the newer, overlapping window). When a slot
+frees up the pending window starts, so the session always ends up analysing its most
+recent audio rather than working through a backlog.
+
+After every window the scheduler reports its lag (seconds from the window being submitted,
+once its last chunk has been decoded and transcribed, to its feedback being ready) and how
+many windows have been skipped so far. The time from the chunk's arrival is measured by the
+consumer (engagex_chunk_to_feedback_seconds, see metrics.py).
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+from .metrics import WINDOWS_SKIPPED
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Windows of one session analysed concurrently
+WINDOW_MAX_IN_FLIGHT = int(os.getenv("WINDOW_MAX_IN_FLIGHT", 1))
+
+
+@dataclass(eq=False)  # compared and hashed by identity, as keys of WindowScheduler.in_flight
+class Window:
+    paths: list  # media paths of the window's chunks, oldest first
+    chunk_number: int  # number of the window's last chunk
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: float = None
+
+
+@dataclass
+class WindowReport:
+    chunk_number: int
+    lag: float  # seconds from submission to the end of the analysis
+    queued: float  # seconds spent waiting for a free slot
+    skipped: int  # windows skipped so far in this session
+    in_flight: int  # windows still running after this one
+
+
+class WindowScheduler:
+    def __init__(self, analyze, max_in_flight=WINDOW_MAX_IN_FLIGHT, on_report=None):
+        self.analyze = analyze  # async analyze(paths, chunk_number)
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_report = on_report  # async on_report(WindowReport), awaited after every analysed window
+        self.in_flight = {}  # Window -> task
+        self.pending = None
+        self.skipped = 0
+        self.closed = False
+
+    def submit(self, paths, chunk_number):
+        """Schedules the window ending with `chunk_number`; returns "started", "queued" or "closed"."""
+        if self.closed:
+            return "closed"
+        window = Window(list(paths), chunk_number)
+        if len(self.in_flight) < self.max_in_flight:
+            self._start(window)
+            return "started"
+        if self.pending is not None:
+            logger.debug("Skipping stale window ending with chunk %s", self.pending.chunk_number)
+            self.skipped += 1
+            WINDOWS_SKIPPED.inc()
+        self.pending = window
+        return "queued"
+
+    def protected_paths(self, window_paths=None):
+        """
+        Media paths still needed by pending or running windows, other than the window whose
+        path list is `window_paths`. Buffer cleanup must not evict these chunks.
+        """
+        windows = [w for w in self.in_flight if w.paths is not window_paths]
+        if self.pending is not None:
+            windows.append(self.pending)
+        return {path for window in windows for path in window.paths}
+
+    @property
+    def lag(self):
+        """Seconds the oldest unfinished window has been waiting for its feedback."""
+        windows = list(self.in_flight) + ([self.pending] if self.pending is not None else [])
+        if not windows:
+            return 0.0
+        return time.monotonic() - min(window.submitted_at for window in windows)
+
+    async def close(self, timeout=None, drop_pending=False):
+        """
+        Stops taking windows and waits up to `timeout` seconds for the running ones and the
+        pending one, which starts once a slot frees up, unless `drop_pending`. Returns whether
+        every window finished in time.
+        """
+        self.closed = True
+        if drop_pending and self.pending is not None:
+            self.skipped += 1
+            WINDOWS_SKIPPED.inc()
+            self.pending = None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.in_flight or self.pending is not None:
+            if not self.in_flight:
+                pending, self.pending = self.pending, None
+                self._start(pending)
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            # A finishing window starts the pending one, so wait again on whatever is then running
+            done, _ = await asyncio.wait(list(self.in_flight.values()), timeout=remaining,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return False
+        return True
+
+    def _start(self, window):
+        window.started_at = time.monotonic()
+        self.in_flight[window] = asyncio.create_task(self._run(window))
+
+    async def _run(self, window):
+        try:
+            await self.analyze(window.paths, window.chunk_number)
+        except Exception as e:
+            logger.error("Analysis of window ending with chunk %s failed: %s", window.chunk_number, e)
+        finally:
+            del self.in_flight[window]
+            if self.pending is not None:
+                pending, self.pending = self.pending, None
+                self._start(pending)
+
+        if self.on_report is not None:
+            now = time.monotonic()
+            report = WindowReport(window.chunk_number, now - window.submitted_at,
+                                  window.started_at - window.submitted_at, self.skipped, len(self.in_flight))
+            try:
+                await self.on_report(report)
+            except Exception as e:
+                logger.warning("Could not report lag: %s", e)
@@ -0,0 +1,234 @@
+"""
+Process pool for the CPU-bound analysis stages (pose detection and Praat prosody).
+
+Running MediaPipe and Praat in threads of the ASGI process competes with the event loop
+for the GIL, so they run in a pool of worker processes instead:
+
+- Workers are forked from a forkserver that has already imported numpy, Praat, OpenCV and
+  MediaPipe, so each worker starts with the libraries loaded (shared copy-on-write), then
+  builds its own pose graph in the initializer before taking any work. All workers are
+  started when the pool is created, not on the first chunk.
+- At most `max_workers` tasks are in flight; further callers wait on a semaphore in the
+  event loop instead of piling up in the executor queue.
+- Every task has a timeout, after which the awaiting coroutine gets CPUTaskTimeout. The
+  task's slot stays taken until the worker actually finishes it.
+- Frame batches and PCM are passed through shared memory instead of being pickled, and the
+  results (PostureSummary, ProsodySummary) are a few KB.
+
+The consumer awaits `get_cpu_pool().run(...)` like any other future. With CPU_WORKERS=0,
+or where forkserver is unavailable, tasks run in threads of the current process.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Number of worker processes (0 runs tasks in threads of the current process)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+
+# Seconds a single task may take before its caller gives up on it
+CPU_TASK_TIMEOUT = float(os.getenv("CPU_TASK_TIMEOUT", 60))
+
+# Modules imported once in the forkserver, before any worker is forked from it
+PRELOAD_MODULES = ["numpy", "parselmouth", "cv2", "mediapipe", "streaming.pose_analysis", "streaming.prosody"]
+
+
+class CPUTaskTimeout(Exception):
+    """Raised when a CPU task does not finish within its timeout."""
+
+
+# ---------------------- SHARED MEMORY ----------------------
+
+class SharedArray(NamedTuple):
+    """Picklable handle to a numpy array placed in a shared memory block."""
+    name: str
+    shape: tuple
+    dtype: str
+
+    @classmethod
+    def create(cls, array):
+        """Copies `array` into a new shared memory block. Returns (block, handle); the caller unlinks the block."""
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return block, cls(block.name, array.shape, array.dtype.str)
+
+    def open(self):
+        """Attaches to the block. Returns (block, array view); close the block once the view is no longer used."""
+        block = shared_memory.SharedMemory(name=self.name)
+        return block, np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=block.buf)
+
+
+def _pack_frames(frames):
+    """
+    Packs [(timestamp, BGR frame), ...] of one size into a shared (n, h, w, 3) block.
+    Returns (block, (timestamps, handle)), or (None, frames) when frames differ in size.
+    """
+    if not frames or len({frame.shape for _, frame in frames}) != 1:
+        return None, frames
+    block, handle = SharedArray.create(np.stack([frame for _, frame in frames]))
+    return block, ([timestamp for timestamp, _ in frames], handle)
+
+
+# ---------------------- TASKS (run in the worker processes) ----------------------
+
+def _init_worker():
+    # One pose graph per worker process, built before the worker takes any task
+    from .pose_analysis import get_pose_pool
+    get_pose_pool(size=1)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def posture_task(video_source):
+    """Pose detection over a chunk: a video file path, frames, or (timestamps, SharedArray) of packed frames."""
+    from .pose_analysis import summarize_posture
+
+    if isinstance(video_source, tuple):
+        timestamps, handle = video_source
+        block, packed = handle.open()
+        try:
+            return summarize_posture([(timestamp, packed[i]) for i, timestamp in enumerate(timestamps)])
+        finally:
+            del packed
+            block.close()
+    return summarize_posture(video_source)
+
+
+def prosody_task(samples):
+    """Praat pitch/intensity summary of one chunk's PCM (an ndarray or a SharedArray)."""
+    from .prosody import ProsodySummary
+
+    if isinstance(samples, SharedArray):
+        block, pcm = samples.open()
+        try:
+            return ProsodySummary.from_samples(pcm)
+        finally:
+            del pcm
+            block.close()
+    return ProsodySummary.from_samples(samples)
+
+
+# ---------------------- POOL ----------------------
+
+class CPUWorkerPool:
+    def __init__(self, max_workers=CPU_WORKERS, task_timeout=CPU_TASK_TIMEOUT, preload=PRELOAD_MODULES):
+        self.max_workers = max_workers
+        self.task_timeout = task_timeout
+        self.preload = preload
+        self._executor = None
+        self._semaphore = None
+        if max_workers > 0 and "forkserver" in multiprocessing.get_all_start_methods():
+            self._start()
+        elif max_workers > 0:
+            logger.warning("Forkserver is not available; running CPU tasks in threads")
+
+    @property
+    def uses_processes(self):
+        return self._executor is not None
+
+    def _start(self):
+        start_time = time.time()
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(self.preload)
+        self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context, initializer=_init_worker)
+        # Submitting one task per worker forks them all now rather than on the first chunk
+        pids = {future.result() for future in [self._executor.submit(_warm_up) for _ in range(self.max_workers)]}
+        logger.info("%s worker processes ready after %.2f seconds", len(pids), time.time() - start_time)
+
+    async def run(self, fn, *args, timeout=None):
+        """Runs fn(*args) in a worker and returns its result. Raises CPUTaskTimeout after `timeout` seconds."""
+        timeout = self.task_timeout if timeout is None else timeout
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(self.max_workers, 1))
+
+        await self._semaphore.acquire()
+        executor = self._executor
+        try:
+            if executor is None:
+                call = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            else:
+                call = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # The slot is held until the worker is done with the task, not until the caller stops
+        # waiting, so a timed-out task still counts against max_workers while it runs
+        call.add_done_callback(self._task_done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), timeout)
+        except asyncio.TimeoutError:
+            raise CPUTaskTimeout(f"{fn.__name__} did not finish within {timeout}s")
+        except BrokenProcessPool:
+            # Only the first caller to see this executor break replaces it
+            if executor is self._executor:
+                logger.warning("A worker process died; restarting the pool")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None  # callers run in threads until the new workers are up
+                await asyncio.to_thread(self._start)
+            raise
+
+    def _task_done(self, call):
+        self._semaphore.release()
+        if not call.cancelled():
+            call.exception()  # retrieved here when the caller stopped waiting, so it is not reported as unhandled
+
+    async def summarize_posture(self, video_source, timeout=None):
+        """PostureSummary of one chunk (video file path or decoded frames)."""
+        if not self.uses_processes or not isinstance(video_source, list):
+            return await self.run(posture_task, video_source, timeout=timeout)
+
+        block, packed = _pack_frames(video_source)
+        try:
+            return await self.run(posture_task, packed, timeout=timeout)
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+    async def summarize_prosody(self, samples, timeout=None):
+        """ProsodySummary of one chunk's PCM samples."""
+        if not self.uses_processes:
+            return await self.run(prosody_task, samples, timeout=timeout)
+
+        block, handle = SharedArray.create(samples)
+        try:
+            return await self.run(prosody_task, handle, timeout=timeout)
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_cpu_pool():
+    """
+    Returns the process-wide CPUWorkerPool, starting its workers on first use. Starting the
+    workers blocks for a few seconds, so async callers should call this via asyncio.to_thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CPUWorkerPool()
+        return _pool